@@ -0,0 +1,98 @@
+"""Latency and payload of fixed vs adaptive Reddit fetch sizing.
+
+Runs the graph against the fake Bright Data server and chat model with
+each --configs entry, a REDDIT_DISCOVERY_POSTS list and a
+REDDIT_COMMENT_BUDGET (0: every thread whole), on two sets of questions:
+ones whose words appear in the recorded post titles ("on-topic") and
+ones that match few titles ("off-topic", where the wider search is
+tried as well). The fake server makes snapshots take longer the more
+posts or comments they are asked for.
+
+    python benchmarks/adaptive_fetch.py --configs "75:0,25/75:0,25/75:100"
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+from run_benchmark import QUESTIONS, load_research, percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+ON_TOPIC = [
+    f"How is the Framework 13 {topic} after a year?"
+    for topic in ("battery life", "keyboard", "display", "linux support", "thermals", "speakers", "webcam", "ports")
+]
+
+
+async def one(research, question):
+    started = time.perf_counter()
+    with research.trace_question(question) as trace:
+        state = await research.graph.ainvoke(research.build_initial_state(question))
+    nodes = {span.name: span.duration for span in trace.node_spans()}
+    comments = len((state.get("reddit_post_data") or {}).get("comments") or [])
+    return time.perf_counter() - started, nodes.get("reddit_search", 0.0), comments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--configs", default="75:0,25/75:0,25/75:100",
+        help="comma-separated DISCOVERY_SIZES:COMMENT_BUDGET, sizes separated by /",
+    )
+    parser.add_argument("--runs", type=int, default=8, help="questions per set and config")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    with FakeBrightDataServer(recordings, latency) as server:
+        research, reset = load_research(model, server.url)
+        import snapshot_operations
+
+        print(f"{args.runs} runs per set and config, concurrency 1 (latency scale {args.scale})\n")
+        print(
+            f"{'config':>12} {'questions':>10} {'e2e p50':>8} {'search p50':>11} {'searches':>9} "
+            f"{'posts KiB':>10} {'comments':>9} {'comments KiB':>13} {'comments s':>11}"
+        )
+        with asyncio.Runner() as runner:
+            for config in args.configs.split(","):
+                sizes, _, budget = config.partition(":")
+                research.REDDIT_DISCOVERY_POSTS = [int(size) for size in sizes.split("/")]
+                research.REDDIT_COMMENT_BUDGET = int(budget or 0)
+                for name, questions in (("on-topic", ON_TOPIC), ("off-topic", QUESTIONS)):
+                    snapshot_operations.snapshot_stats = snapshot_operations.SnapshotStats()
+                    totals, searches, comments = [], [], []
+                    for i in range(args.runs):
+                        reset()
+                        question = f"{questions[i % len(questions)]} (run {i})"
+                        total, search, count = runner.run(one(research, question))
+                        totals.append(total)
+                        searches.append(search)
+                        comments.append(count)
+                    stats = snapshot_operations.snapshot_stats.stats()
+                    posts = stats.get("reddit", {})
+                    threads = stats.get("reddit comments", {})
+                    print(
+                        f"{config:>12} {name:>10} {percentile(totals, 50):7.2f}s {percentile(searches, 50):10.2f}s "
+                        f"{posts.get('snapshots', 0):>9} {posts.get('bytes', 0) / 1024 / args.runs:10.1f} "
+                        f"{sum(comments) / args.runs:9.0f} {threads.get('bytes', 0) / 1024 / args.runs:13.1f} "
+                        f"{threads.get('mean_seconds', 0.0):10.2f}s"
+                    )
+
+
+if __name__ == "__main__":
+    main()
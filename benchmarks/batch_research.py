@@ -0,0 +1,89 @@
+"""Wall time and Bright Data usage of N questions run one by one vs as one batch.
+
+Runs the same questions against the fake Bright Data server and chat model
+three ways: sequentially with aresearch(), concurrently with aresearch(),
+and with aresearch_batch(), which shares one Reddit discovery snapshot and
+one comments snapshot between all of them. Thread selection is local, so
+each question picks threads by title.
+
+    python benchmarks/batch_research.py --questions 8
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+from run_benchmark import load_research
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+TOPICS = [
+    "battery life", "build quality", "display", "keyboard", "linux support",
+    "ports", "price", "speakers", "thermals", "webcam",
+]
+
+
+async def run_sequential(research, questions):
+    return [await research.aresearch(question) for question in questions]
+
+
+async def run_concurrent(research, questions):
+    return await asyncio.gather(*(research.aresearch(question) for question in questions))
+
+
+async def run_batched(research, questions):
+    return await research.aresearch_batch(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+    questions = [
+        f"How is the Framework 13 {TOPICS[i % len(TOPICS)]} after a few months? ({i})"
+        for i in range(args.questions)
+    ]
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    with FakeBrightDataServer(recordings, latency) as server:
+        research, reset = load_research(model, server.url)
+        research.REDDIT_URL_SELECTION = "local"
+
+        print(f"{args.questions} questions (latency scale {args.scale})\n")
+        print(
+            f"{'mode':<12} {'wall':>7} {'triggers':>9} {'keywords':>9} {'threads':>8} "
+            f"{'downloads':>10} {'polls':>6} {'comments':>9}"
+        )
+        with asyncio.Runner() as runner:
+            for label, run in (("sequential", run_sequential), ("concurrent", run_concurrent), ("batched", run_batched)):
+                reset()
+                server.request_counts.clear()
+                started = time.perf_counter()
+                states = runner.run(run(research, questions))
+                wall = time.perf_counter() - started
+                counts = server.request_counts
+                comments = sum(len((state.get("reddit_post_data") or {}).get("comments") or []) for state in states)
+                print(
+                    f"{label:<12} {wall:6.2f}s {counts.get('trigger', 0):>9} {counts.get('trigger_keywords', 0):>9} "
+                    f"{counts.get('trigger_urls', 0):>8} {counts.get('download', 0):>10} "
+                    f"{counts.get('progress', 0):>6} {comments:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Kill a durable research run while it polls a Reddit snapshot, then resume it.
+
+The run (main.aresearch with a thread_id) executes in a subprocess against
+the fake Bright Data server and is SIGKILLed once the comments snapshot has
+been triggered. A second process resumes it from the SQLite checkpoint.
+Exits non-zero if the resumed run triggered a snapshot again or repeated
+a search that had already finished.
+
+    python benchmarks/checkpoint_resume.py
+"""
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+QUESTION = "Is the Framework 13 worth it?"
+
+
+def run_child(base_url: str, checkpoint_path: str):
+    from run_benchmark import load_research
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+    model = FakeChatModel(recordings=recordings, latency=LatencyProfile(scale=0.01))
+    research, reset = load_research(model, base_url)
+    reset()
+    from checkpoint import SQLiteCheckpointSaver, configure_checkpointer
+
+    configure_checkpointer(SQLiteCheckpointSaver(checkpoint_path))
+    research.REDDIT_URL_SELECTION = "local"
+    state = asyncio.run(research.aresearch(QUESTION, thread_id="resume-check"))
+    comments = (state.get("reddit_post_data") or {}).get("comments") or []
+    print(json.dumps({"answered": bool(state.get("final_answer")), "comments": len(comments)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments-ready", type=float, default=4.0, help="seconds the comments snapshot takes")
+    parser.add_argument("--child", nargs=2, metavar=("URL", "CHECKPOINT_PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+    fast = {"median": 0.05, "sigma": 0.0}
+    latency = LatencyProfile({
+        "serp": fast, "trigger": fast, "progress": fast, "download": fast, "reddit_search_ready": fast,
+        "reddit_comments_ready": {"median": args.comments_ready, "sigma": 0.0},
+    })
+
+    with tempfile.TemporaryDirectory() as directory, FakeBrightDataServer(recordings, latency) as server:
+        checkpoint_path = os.path.join(directory, "checkpoints.sqlite3")
+        command = [sys.executable, __file__, "--child", server.url, checkpoint_path]
+
+        first = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while not server.request_counts.get("trigger_urls"):
+            if first.poll() is not None:
+                sys.exit("The first run exited before triggering the comments snapshot")
+            time.sleep(0.05)
+        time.sleep(0.5)
+        first.send_signal(signal.SIGKILL)
+        first.wait()
+        killed = dict(server.request_counts)
+        print(f"killed mid-poll:  {killed}")
+
+        started = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        resumed = dict(server.request_counts)
+        print(f"after resume:     {resumed}")
+        print(
+            f"resumed run took {time.perf_counter() - started:.2f}s: "
+            f"answered={result['answered']}, {result['comments']} comments"
+        )
+
+    problems = []
+    if resumed.get("trigger") != killed.get("trigger"):
+        problems.append(f"snapshots triggered again ({killed.get('trigger')} -> {resumed.get('trigger')})")
+    if resumed.get("serp") != killed.get("serp"):
+        problems.append(f"searches repeated ({killed.get('serp')} -> {resumed.get('serp')})")
+    if not result["answered"]:
+        problems.append("no final answer")
+    if problems:
+        sys.exit("FAILED: " + "; ".join(problems))
+    print("OK: no duplicate trigger and no repeated searches")
+
+
+if __name__ == "__main__":
+    main()
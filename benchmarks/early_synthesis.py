@@ -0,0 +1,78 @@
+"""Time to first answer with and without a synthesis deadline.
+
+Runs aiter_answers() against the fake Bright Data server and chat model,
+where Reddit (discovery plus comment snapshots) is by far the slowest
+branch, for each --deadlines value ("none" waits for every source). It
+reports when the first answer arrived, when the full answer arrived (with
+refinement on), and how often the first answer had to leave Reddit out.
+
+    python benchmarks/early_synthesis.py --deadlines none,1.0,2.0
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+from run_benchmark import QUESTIONS, load_research, percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+
+async def one(research, question, policy):
+    started = time.perf_counter()
+    first = full = None
+    missing = []
+    async for state in research.aiter_answers(question, policy):
+        if first is None:
+            first = time.perf_counter() - started
+            missing = state.get("missing_sources") or []
+        full = time.perf_counter() - started
+    return first, full, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deadlines", default="none,1.0,2.0", help="comma-separated seconds, or none")
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    with FakeBrightDataServer(recordings, latency) as server:
+        research, reset = load_research(model, server.url)
+        print(f"{args.runs} runs per deadline, concurrency 1 (latency scale {args.scale})\n")
+        print(f"{'deadline':>9} {'first p50':>10} {'first p95':>10} {'full p50':>9} {'without reddit':>15}")
+        with asyncio.Runner() as runner:
+            for value in args.deadlines.split(","):
+                deadline = None if value == "none" else float(value)
+                policy = research.AnswerPolicy(deadline=deadline, min_analyses=1, refine=True)
+                firsts, fulls, partial = [], [], 0
+                for i in range(args.runs):
+                    reset()
+                    question = f"{QUESTIONS[i % len(QUESTIONS)]} (run {i})"
+                    first, full, missing = runner.run(one(research, question, policy))
+                    firsts.append(first)
+                    fulls.append(full)
+                    partial += "reddit" in missing
+                print(
+                    f"{value:>9} {percentile(firsts, 50):9.2f}s {percentile(firsts, 95):9.2f}s "
+                    f"{percentile(fulls, 50):8.2f}s {partial:>10}/{args.runs}"
+                )
+
+
+if __name__ == "__main__":
+    main()
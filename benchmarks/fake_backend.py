@@ -0,0 +1,366 @@
+"""Fake Bright Data server and chat model that replay recorded responses.
+
+Latencies are drawn from log-normal distributions (median seconds, sigma),
+scaled by a single factor so the same profile can run quickly in CI.
+Reddit snapshots also take longer the more they are asked to collect:
+about half of their time is fixed and half in proportion to num_of_posts
+(out of 75) or to the share of each thread's comments kept by comment_limit.
+"""
+import json
+import time
+import zlib
+import random
+import asyncio
+import itertools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, convert_to_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+DEFAULT_LATENCY = {
+    "serp": {"median": 1.2, "sigma": 0.3},
+    "trigger": {"median": 0.3, "sigma": 0.2},
+    "progress": {"median": 0.1, "sigma": 0.2},
+    "download": {"median": 0.4, "sigma": 0.3},
+    "reddit_search_ready": {"median": 8.0, "sigma": 0.25},
+    "reddit_comments_ready": {"median": 12.0, "sigma": 0.25},
+    "llm_first_token": {"median": 0.6, "sigma": 0.3},
+    "llm_prefill_tokens_per_second": {"median": 10000.0, "sigma": 0.1},
+    "llm_tokens_per_second": {"median": 60.0, "sigma": 0.1},
+}
+
+REDDIT_SEARCH_DATASET = "gd_lvz8ah06191smkebj4"
+FULL_REDDIT_SEARCH = 75
+
+
+def _sized(seconds: float, fraction: float) -> float:
+    return seconds * (0.5 + 0.5 * min(fraction, 1.0))
+
+
+class LatencyProfile:
+    def __init__(self, config: Optional[Dict[str, Dict[str, float]]] = None, scale: float = 1.0, seed: int = 0):
+        self.config = {**DEFAULT_LATENCY, **(config or {})}
+        self.scale = scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, name: str) -> float:
+        spec = self.config[name]
+        with self._lock:
+            value = spec["median"] * self._random.lognormvariate(0, spec["sigma"])
+        if name.endswith("_per_second"):
+            return value / self.scale
+        return value * self.scale
+
+
+class _Server(ThreadingHTTPServer):
+    # Class attributes: the listen backlog is fixed when the constructor
+    # binds, and the default of 5 resets connections in a burst.
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeBrightDataServer:
+    """Serves /request, /datasets/v3/trigger, /progress and /snapshot from recordings.
+
+    Snapshots are returned as a JSON array, or as JSON Lines for format=jsonl.
+    """
+
+    def __init__(self, recordings: Dict[str, Any], latency: LatencyProfile):
+        self.recordings = recordings
+        self.latency = latency
+        self.request_counts: Dict[str, int] = {}
+        self._snapshots: Dict[
+            str, tuple[float, str, Optional[List[str]], Optional[List[str]], Optional[List[Optional[int]]]]
+        ] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_snapshot(
+        self,
+        kind: str,
+        ready_in: float = 0.0,
+        urls: Optional[List[str]] = None,
+        keywords: Optional[List[str]] = None,
+        limits: Optional[List[Optional[int]]] = None,
+    ) -> str:
+        """Register a snapshot serving recordings[kind] once ready_in seconds pass.
+
+        With urls given, only records whose post_url is one of them are served;
+        with keywords given, the recorded posts are served once per keyword.
+        limits, parallel to either, caps the posts per keyword or the
+        comments per thread (None: no cap).
+        """
+        snapshot_id = f"s_{next(self._ids)}"
+        with self._lock:
+            self._snapshots[snapshot_id] = (time.monotonic() + ready_in, kind, urls, keywords, limits)
+        return snapshot_id
+
+    @staticmethod
+    def _limit(value: Any) -> Optional[int]:
+        try:
+            return int(value) or None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _keyword_records(
+        records: List[Dict[str, Any]], keywords: List[str], limits: Optional[List[Optional[int]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Discovered posts for each keyword, tagged with their discovery_input.
+
+        Every third recorded post keeps its URL for every keyword (the
+        popular threads different searches share); the others get a
+        keyword-specific URL.
+        """
+        served = []
+        for keyword, limit in zip(keywords, limits or [None] * len(keywords)):
+            tag = zlib.crc32(keyword.encode()) % 10**6
+            for i, record in enumerate(records[:limit]):
+                url = record["url"] if i % 3 == 0 else f"{record['url'].rstrip('/')}_{tag}/"
+                served.append({**record, "url": url, "discovery_input": {"keyword": keyword}})
+        return served
+
+    @staticmethod
+    def _thread_records(
+        records: List[Dict[str, Any]], urls: List[str], limits: Optional[List[Optional[int]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Records for the requested threads.
+
+        A thread that isn't in the recordings gets a recorded thread's
+        comments, relabelled, so any selection yields a realistic payload.
+        """
+        by_thread: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_thread.setdefault((record.get("post_url") or "").rstrip("/"), []).append(record)
+        recorded = sorted(by_thread)
+
+        served = []
+        for url, limit in zip(urls, limits or [None] * len(urls)):
+            thread = url.rstrip("/")
+            if thread in by_thread:
+                served.extend(by_thread[thread][:limit])
+                continue
+            source = recorded[sum(map(ord, thread)) % len(recorded)]
+            served.extend(
+                {**record, "post_url": url, "url": thread + "/" + record["url"][len(source) + 1:]}
+                for record in by_thread[source][:limit]
+            )
+        return served
+
+    def _thread_size(self, url: str) -> int:
+        records = self.recordings["reddit_comments"]
+        thread = url.rstrip("/")
+        size = sum(1 for record in records if (record.get("post_url") or "").rstrip("/") == thread)
+        return size or len(records) // max(len({record.get("post_url") for record in records}), 1)
+
+    def _count(self, endpoint: str, amount: int = 1):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + amount
+
+    def _handle(self, method: str, path: str, query: Dict[str, List[str]], body: Any):
+        if method == "POST" and path == "/request":
+            self._count("serp")
+            time.sleep(self.latency.sample("serp"))
+            engine = "bing" if "bing.com" in body.get("url", "") else "google"
+            return self.recordings["serp"][engine]
+
+        if method == "POST" and path == "/datasets/v3/trigger":
+            self._count("trigger")
+            time.sleep(self.latency.sample("trigger"))
+            dataset_id = query.get("dataset_id", [""])[0]
+            if dataset_id == REDDIT_SEARCH_DATASET:
+                keywords = [item.get("keyword") for item in body]
+                limits = [self._limit(item.get("num_of_posts")) for item in body]
+                self._count("trigger_keywords", len(keywords))
+                ready_in = max(
+                    _sized(self.latency.sample("reddit_search_ready"), (limit or FULL_REDDIT_SEARCH) / FULL_REDDIT_SEARCH)
+                    for limit in limits
+                )
+                return {"snapshot_id": self.add_snapshot("reddit_posts", ready_in, keywords=keywords, limits=limits)}
+            # Every thread takes its own time; a batch is ready when its
+            # slowest thread is.
+            urls = [item.get("url") for item in body]
+            limits = [self._limit(item.get("comment_limit")) for item in body]
+            self._count("trigger_comments")
+            self._count("trigger_urls", len(urls))
+            ready_in = max(
+                _sized(self.latency.sample("reddit_comments_ready"), (limit or size) / size)
+                for limit, size in ((limit, self._thread_size(url)) for url, limit in zip(urls, limits))
+            )
+            return {"snapshot_id": self.add_snapshot("reddit_comments", ready_in, urls, limits=limits)}
+
+        if method == "GET" and path.startswith("/datasets/v3/progress/"):
+            self._count("progress")
+            time.sleep(self.latency.sample("progress"))
+            ready_at = self._snapshots[path.rsplit("/", 1)[1]][0]
+            return {"status": "ready" if time.monotonic() >= ready_at else "running"}
+
+        if method == "GET" and path.startswith("/datasets/v3/snapshot/"):
+            self._count("download")
+            time.sleep(self.latency.sample("download"))
+            _, kind, urls, keywords, limits = self._snapshots[path.rsplit("/", 1)[1]]
+            if keywords is not None:
+                return self._keyword_records(self.recordings[kind], keywords, limits)
+            if urls is None:
+                return self.recordings[kind]
+            return self._thread_records(self.recordings[kind], urls, limits)
+
+        return None
+
+    def _handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                backend._count("connections")
+
+            def _respond(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                payload = backend._handle(method, parts.path, query, body)
+                if query.get("format") == ["jsonl"] and isinstance(payload, list):
+                    self._send_lines(payload)
+                    return
+                data = json.dumps(payload).encode()
+                self.send_response(404 if payload is None else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_lines(self, records, batch: int = 500):
+                # Chunked, so the client can parse lines while later ones
+                # are still being serialized.
+                self.send_response(200)
+                self.send_header("Content-Type", "application/jsonl")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(records), batch):
+                    chunk = "".join(json.dumps(r) + "\n" for r in records[start:start + batch]).encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model replaying recorded replies with sampled latency.
+
+    Analyses get recordings["llm"]["analysis"], the streamed synthesis gets
+    recordings["llm"]["synthesis"] word by word, and structured output
+    (Reddit URL selection) is built from recordings["llm"]["url_selection"].
+    """
+
+    recordings: Dict[str, Any]
+    latency: Any
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-recorded"
+
+    def _usage(self, messages, text: str) -> Dict[str, int]:
+        prompt = sum(len(str(m.content)) for m in messages) // 4
+        completion = len(text) // 4
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    def _first_token_seconds(self, messages) -> float:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return (
+            self.latency.sample("llm_first_token")
+            + prompt_tokens / self.latency.sample("llm_prefill_tokens_per_second")
+        )
+
+    def _reply_seconds(self, messages, text: str) -> float:
+        tokens = max(1, len(text) // 4)
+        return self._first_token_seconds(messages) + tokens / self.latency.sample("llm_tokens_per_second")
+
+    def _analysis(self, messages) -> tuple[float, ChatResult]:
+        """The recorded analysis reply, and how long it takes to generate."""
+        self.calls += 1
+        text = self.recordings["llm"]["analysis"]
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return self._reply_seconds(messages, text), ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        seconds, result = self._analysis(messages)
+        time.sleep(seconds)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        seconds, result = self._analysis(messages)
+        await asyncio.sleep(seconds)
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        text = self.recordings["llm"]["synthesis"]
+        await asyncio.sleep(self._first_token_seconds(messages))
+        rate = self.latency.sample("llm_tokens_per_second")
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = word if i == 0 else " " + word
+            await asyncio.sleep(max(1, len(chunk) // 4) / rate)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text))
+        )
+
+    def with_structured_output(self, schema, include_raw=False, **kwargs):
+        def selection(messages) -> tuple[float, Any]:
+            self.calls += 1
+            messages = convert_to_messages(messages)
+            reply = " ".join(self.recordings["llm"]["url_selection"])
+            parsed = schema(selected_urls=self.recordings["llm"]["url_selection"])
+            if include_raw:
+                raw = AIMessage(content="", usage_metadata=self._usage(messages, reply))
+                parsed = {"raw": raw, "parsed": parsed, "parsing_error": None}
+            return self._reply_seconds(messages, reply), parsed
+
+        def select(messages):
+            seconds, parsed = selection(messages)
+            time.sleep(seconds)
+            return parsed
+
+        async def aselect(messages):
+            seconds, parsed = selection(messages)
+            await asyncio.sleep(seconds)
+            return parsed
+
+        return RunnableLambda(select, afunc=aselect)
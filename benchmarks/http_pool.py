@@ -0,0 +1,124 @@
+"""Request latency and connection reuse of the pooled Bright Data client.
+
+Sends SERP requests to the fake Bright Data server (a local stub that
+answers after --server-ms) in three ways and reports p50/p99 latency,
+throughput, failed requests and the TCP connections the server accepted:
+
+  per-request  a new httpx client, and so a new connection, per request
+  pooled       brightdata_client.get_client(): one keep-alive pool per loop
+  sync         web_operations._make_api_request(), one call at a time;
+               each opens and closes its own pool (run_sync)
+
+    python benchmarks/http_pool.py --requests 400 --concurrency 1,16,64
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, LatencyProfile
+from run_benchmark import percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+PAYLOAD = {"zone": "bench", "url": "https://www.google.com/search?q=framework&brd_json=1", "format": "raw"}
+
+
+async def per_request(base_url: str):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.post("/request", json=PAYLOAD)
+    response.raise_for_status()
+
+
+async def pooled(base_url: str):
+    from brightdata_client import get_client
+
+    response = await get_client().post("/request", json=PAYLOAD)
+    response.raise_for_status()
+
+
+async def run_level(send, base_url: str, requests: int, concurrency: int) -> tuple[list, int, float]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await send(base_url)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_sync_level(requests: int) -> tuple[list, int, float]:
+    from web_operations import _make_api_request
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        if _make_api_request("/request", json=PAYLOAD) is None:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - request_started)
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400, help="requests per mode and level")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--server-ms", type=float, default=2.0, help="stub server time per request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile({"serp": {"median": args.server_ms / 1000, "sigma": 0.1}})
+    with FakeBrightDataServer(recordings, latency) as server:
+        from brightdata_client import configure_client, get_client
+
+        configure_client(base_url=server.url, api_key="bench")
+        print(f"{args.requests} requests per mode and level, stub server {args.server_ms:.1f}ms\n")
+        print(f"{'mode':>12} {'conc':>5} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>7} {'connections':>12}")
+
+        def report(mode, concurrency, latencies, errors, wall, connections):
+            print(
+                f"{mode:>12} {concurrency:>5} {percentile(latencies, 50) * 1000:8.2f} "
+                f"{percentile(latencies, 99) * 1000:8.2f} {len(latencies) / wall:8.0f} {errors:>7} "
+                f"{connections:>12}"
+            )
+
+        for concurrency in [int(level) for level in args.concurrency.split(",")]:
+            for mode, send in (("per-request", per_request), ("pooled", pooled)):
+                before = server.request_counts.get("connections", 0)
+                with asyncio.Runner() as runner:
+                    latencies, errors, wall = runner.run(run_level(send, server.url, args.requests, concurrency))
+                    runner.run(get_client().aclose())
+                report(mode, concurrency, latencies, errors, wall, server.request_counts.get("connections", 0) - before)
+
+        before = server.request_counts.get("connections", 0)
+        latencies, errors, wall = run_sync_level(args.requests)
+        report("sync", 1, latencies, errors, wall, server.request_counts.get("connections", 0) - before)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Latency and tokens saved by the LLM response cache on a replayed question log.
+
+Replays a log of questions, where later entries repeat earlier ones
+verbatim or reworded, through the graph against the fake Bright Data
+server and chat model, once per cache mode:
+
+  off    no LLM response cache
+  exact  hits on identical prompts only (the default)
+  near   also near-duplicate prompts (near_duplicate_threshold)
+
+Search results are cached the same way in every mode, so the differences
+are the model calls alone. Reports latency per kind of question (new,
+verbatim repeat, reworded repeat), model calls and tokens billed, and the
+cache's own saved-seconds/saved-tokens counters.
+
+    python benchmarks/llm_cache_replay.py --unique 4 --repeats 2
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+from run_benchmark import QUESTIONS, load_research, percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+
+def question_log(unique: int, repeats: int) -> list[tuple[str, str]]:
+    """(kind, question): unique questions, then each comes back repeats times, alternately verbatim and reworded."""
+    questions = QUESTIONS[:unique]
+    log = [("new", question) for question in questions]
+    for repeat in range(repeats):
+        for i, question in enumerate(questions):
+            if (i + repeat) % 2:
+                log.append(("verbatim", question))
+            else:
+                log.append(("reworded", f"{question.rstrip('?')}, in your experience?"))
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--unique", type=int, default=4, help="distinct questions in the log")
+    parser.add_argument("--repeats", type=int, default=2, help="times each question comes back")
+    parser.add_argument("--threshold", type=float, default=0.6, help="near_duplicate_threshold for the near mode")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    log = question_log(args.unique, args.repeats)
+    with FakeBrightDataServer(recordings, latency) as server:
+        research, reset = load_research(model, server.url)
+        from cache import LLMResponseCache, MemoryLRU, ResultCache, configure_cache, configure_llm_cache
+        from models import ModelRegistry, configure_models
+
+        modes = {
+            "off": LLMResponseCache(max_entries=0),
+            "exact": LLMResponseCache(),
+            "near": LLMResponseCache(near_duplicate_threshold=args.threshold),
+        }
+        print(f"{len(log)} questions ({args.unique} distinct), concurrency 1 (latency scale {args.scale})\n")
+        print(
+            f"{'mode':>6} {'total':>7} {'new p50':>8} {'verbatim p50':>13} {'reworded p50':>13} {'calls':>6} {'tokens':>7} "
+            f"{'hits':>5} {'near':>5} {'saved s':>8} {'saved tokens':>13}"
+        )
+        with asyncio.Runner() as runner:
+            for mode, llm_cache in modes.items():
+                reset()
+                configure_cache(ResultCache(MemoryLRU()))
+                configure_llm_cache(llm_cache)
+                models = configure_models(ModelRegistry())
+                calls = model.calls
+                latencies = {"new": [], "verbatim": [], "reworded": []}
+                for kind, question in log:
+                    started = time.perf_counter()
+                    runner.run(research.graph.ainvoke(research.build_initial_state(question)))
+                    latencies[kind].append(time.perf_counter() - started)
+
+                tokens = sum(stats["input_tokens"] + stats["output_tokens"] for stats in models.stats().values())
+                stats = llm_cache.stats()
+                print(
+                    f"{mode:>6} {sum(map(sum, latencies.values())):6.2f}s {percentile(latencies['new'], 50):7.2f}s "
+                    f"{percentile(latencies['verbatim'], 50):12.2f}s {percentile(latencies['reworded'], 50):12.2f}s "
+                    f"{model.calls - calls:>6} {tokens:>7} "
+                    f"{stats['hits']:>5} {stats['near_hits']:>5} {stats['saved_seconds']:8.2f} {stats['saved_tokens']:>13}"
+                )
+
+
+if __name__ == "__main__":
+    main()
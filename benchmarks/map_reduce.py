@@ -0,0 +1,111 @@
+"""Wall time of single-shot vs map-reduce Reddit comment analysis.
+
+Builds a large synthetic comment set and analyzes it with the fake chat
+model (latency = first token + prompt tokens / prefill rate + reply tokens
+/ decode rate), either in one call with every comment in the prompt or
+through main's map-reduce path at several parallelism levels.
+
+    python benchmarks/map_reduce.py --comments 1000 --chunk-tokens 4000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeChatModel, LatencyProfile
+from run_benchmark import load_research
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+
+def synthetic_comments(count: int):
+    opinions = [
+        "The battery easily lasts a full workday, but the fan gets loud under load.",
+        "Support replaced my hinge within a week, which is why I would buy again.",
+        "Linux works out of the box; suspend was flaky until the last firmware update.",
+        "For the price you can get more performance elsewhere, repairability is the selling point.",
+    ]
+    return {
+        "comments": [
+            {
+                "comment_id": f"c{i}",
+                "content": f"#{i} " + " ".join(opinions[(i + j) % len(opinions)] for j in range(4)),
+                "date": "2025-01-10T12:00:00Z",
+            }
+            for i in range(count)
+        ]
+    }
+
+
+async def time_single_shot(research, state, reddit_post_data) -> float:
+    from compaction import compact_reddit_comments
+    from prompts import get_reddit_analysis_messages
+
+    started = time.perf_counter()
+    everything = compact_reddit_comments(reddit_post_data, budget=10**9)
+    messages = get_reddit_analysis_messages(state["user_question"], "No posts.", everything)
+    await research._acached_llm_reply(state, messages)
+    return time.perf_counter() - started
+
+
+async def time_map_reduce(research, state, reddit_post_data) -> float:
+    from prompts import get_reddit_analysis_messages
+
+    started = time.perf_counter()
+    notes = await research._areddit_comments_input(state, reddit_post_data)
+    messages = get_reddit_analysis_messages(state["user_question"], "No posts.", notes)
+    await research._acached_llm_reply(state, messages)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--chunk-tokens", type=int, default=4000)
+    parser.add_argument("--parallelism", default="1,4,8,16")
+    parser.add_argument("--reply-tokens", type=int, default=250, help="length of every fake model reply")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=0.2, help="multiplier applied to all simulated latencies")
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+    analysis = recordings["llm"]["analysis"]
+    recordings["llm"]["analysis"] = (analysis + " ") * (args.reply_tokens * 4 // (len(analysis) + 1) + 1)
+
+    model = FakeChatModel(recordings=recordings, latency=LatencyProfile(scale=args.scale, seed=1))
+    research, reset = load_research(model, "http://127.0.0.1:9")
+    from compaction import count_tokens, reddit_comment_chunks
+
+    reddit_post_data = synthetic_comments(args.comments)
+    chunks = reddit_comment_chunks(reddit_post_data, args.chunk_tokens)
+    total = sum(count_tokens(chunk) for chunk in chunks)
+    print(
+        f"{args.comments} comments, {total} tokens, {len(chunks)} chunks of <= {args.chunk_tokens} tokens "
+        f"(latency scale {args.scale})\n"
+    )
+
+    research.MAP_REDUCE_CHUNK_TOKENS = args.chunk_tokens
+    runs = [("single-shot", None)] + [(f"map-reduce x{p}", int(p)) for p in args.parallelism.split(",")]
+    with asyncio.Runner() as runner:
+        for label, parallelism in runs:
+            times = []
+            for i in range(args.repeats):
+                reset()
+                state = research.build_initial_state(f"Is the Framework 13 worth it? ({i})")
+                if parallelism is None:
+                    times.append(runner.run(time_single_shot(research, state, reddit_post_data)))
+                else:
+                    research.MAP_REDUCE_PARALLELISM = parallelism
+                    times.append(runner.run(time_map_reduce(research, state, reddit_post_data)))
+            print(f"{label:<16} median {sorted(times)[len(times) // 2]:6.2f}s  ({', '.join(f'{t:.2f}' for t in times)})")
+
+
+if __name__ == "__main__":
+    main()
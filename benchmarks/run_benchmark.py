@@ -0,0 +1,280 @@
+"""Offline benchmark for the research graph.
+
+Runs the compiled graph end to end against a local fake Bright Data server
+and a fake chat model, both replaying benchmarks/fixtures/recordings.json
+with sampled latencies, so results are reproducible without API keys or
+network access.
+
+    python benchmarks/run_benchmark.py                     # compare to baseline.json
+    python benchmarks/run_benchmark.py --update-baseline   # record a new baseline
+
+Exits with status 1 when median latency, peak memory or throughput
+regresses by more than --tolerance relative to the baseline. Per-node
+latency is gated only up to --gate-nodes-up-to concurrent runs (see
+compare()).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tracemalloc
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+QUESTIONS = [
+    "What are the best budget mechanical keyboards for programming?",
+    "Is it worth learning Rust in 2025?",
+    "How do I get started with home espresso?",
+    "Which standing desks hold up after a few years?",
+    "What do people think of the latest Kindle models?",
+    "Are heat pumps worth it in cold climates?",
+    "How do I prepare for a system design interview?",
+    "What is the best way to learn to cook as an adult?",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_research(model: FakeChatModel, base_url: str):
+    # The model registry builds every model through init_chat_model; hand it
+    # the fake one instead.
+    import langchain.chat_models
+
+    langchain.chat_models.init_chat_model = lambda *args, **kwargs: model
+
+    import main as research
+    import snapshot_operations
+    from brightdata_client import configure_client
+    from cache import ResultCache, LLMResponseCache, configure_cache, configure_llm_cache
+
+    configure_client(base_url=base_url, api_key="bench")
+
+    def reset():
+        # Fresh in-memory caches and snapshot-duration estimates so each level
+        # starts from the same state; the LLM cache is disabled so every run
+        # pays for its model calls.
+        configure_cache(ResultCache())
+        configure_llm_cache(LLMResponseCache(max_entries=0))
+        snapshot_operations.completion_estimator = snapshot_operations.CompletionEstimator()
+
+    return research, reset
+
+
+async def run_level(research, concurrency: int, runs: int) -> Dict[str, Any]:
+    node_durations: Dict[str, List[float]] = {}
+    end_to_end: List[float] = []
+    failures = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failures
+        # A distinct question per run keeps the result cache and request
+        # coalescing from short-circuiting the fetches.
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (run {i})"
+        async with slots:
+            started = time.perf_counter()
+            try:
+                with research.trace_question(question) as trace:
+                    await research.graph.ainvoke(research.build_initial_state(question))
+            except Exception as e:
+                failures += 1
+                logging.warning("Run %d failed: %s", i, e)
+                return
+            end_to_end.append(time.perf_counter() - started)
+            for node in trace.node_spans():
+                node_durations.setdefault(node.name, []).append(node.duration)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    wall = time.perf_counter() - started
+
+    return {
+        "runs": runs,
+        "failures": failures,
+        "throughput_per_s": round(len(end_to_end) / wall, 3),
+        "end_to_end": {
+            "p50": round(percentile(end_to_end, 50), 3),
+            "p95": round(percentile(end_to_end, 95), 3),
+        },
+        "nodes": {
+            name: {
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+            }
+            for name, values in sorted(node_durations.items())
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta: float,
+    gate_nodes_up_to: int,
+) -> List[str]:
+    """Return the gated metrics that got worse than the baseline.
+
+    Latency is gated on p50, which is stable across runs; p95 over a few
+    dozen runs mostly reflects which poll cycle a snapshot landed in, so it
+    is reported but not gated. Latency changes smaller than min_delta
+    seconds are ignored as scheduling noise. Per-node latency is gated only
+    at concurrency levels up to gate_nodes_up_to: with overlapping runs a
+    node's p50 depends on how they interleave (which poll cycle a snapshot
+    lands in, which runs share the event loop with it) and moves by more
+    than the tolerance between identical runs, so those levels are gated
+    on end-to-end latency, throughput and memory.
+    """
+    regressions = []
+    for level, current in results["levels"].items():
+        previous = baseline.get("levels", {}).get(level)
+        if previous is None:
+            continue
+        latencies = [("end_to_end.p50", current["end_to_end"]["p50"], previous["end_to_end"]["p50"])]
+        for name, stats in current["nodes"].items():
+            if int(level) <= gate_nodes_up_to and name in previous["nodes"]:
+                latencies.append((f"{name}.p50", stats["p50"], previous["nodes"][name]["p50"]))
+        for metric, now, before in latencies:
+            if now > before * (1 + tolerance) and now - before > min_delta:
+                regressions.append(f"concurrency {level}: {metric} {before} -> {now}")
+
+        if current["peak_memory_mb"] > previous["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(
+                f"concurrency {level}: peak_memory_mb {previous['peak_memory_mb']} -> {current['peak_memory_mb']}"
+            )
+        if current["throughput_per_s"] < previous["throughput_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"concurrency {level}: throughput_per_s {previous['throughput_per_s']} -> {current['throughput_per_s']}"
+            )
+    return regressions
+
+
+def print_report(results: Dict[str, Any]):
+    for level, stats in results["levels"].items():
+        print(
+            f"\nconcurrency {level}: {stats['runs']} runs, {stats['failures']} failed, "
+            f"{stats['throughput_per_s']} q/s, peak memory {stats['peak_memory_mb']} MB"
+        )
+        print(f"  {'end_to_end':<24} p50 {stats['end_to_end']['p50']:7.3f}s  p95 {stats['end_to_end']['p95']:7.3f}s")
+        for name, node in stats["nodes"].items():
+            print(f"  {name:<24} p50 {node['p50']:7.3f}s  p95 {node['p95']:7.3f}s")
+    print(f"\nBright Data requests: {results['requests']}  LLM calls: {results['llm_calls']}")
+    for name, stats in results.get("models", {}).items():
+        print(
+            f"  {name:<24} {stats['calls']:4d} calls  mean {stats['mean_seconds']:6.3f}s  "
+            f"{stats['input_tokens']:>8} in / {stats['output_tokens']:>7} out tokens  ${stats['cost_usd']:.4f}"
+        )
+    print_snapshot_stats(results.get("snapshots", {}))
+
+
+def print_snapshot_stats(snapshots: Dict[str, Dict[str, Any]]):
+    if snapshots:
+        print("Snapshots:")
+    for operation, stats in snapshots.items():
+        print(
+            f"  {operation:<24} {stats['snapshots']:4d} snapshots  mean {stats['mean_seconds']:6.3f}s  "
+            f"max {stats['max_seconds']:6.3f}s  {stats['items']:>6} items  {stats['mean_bytes'] / 1024:8.1f} KiB mean"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the research graph")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    # Two waves at the highest default level: a single wave's throughput is
+    # set by its one slowest run.
+    parser.add_argument("--runs", type=int, default=32, help="questions per concurrency level")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-delta", type=float, default=0.1, help="ignore latency changes below this many seconds")
+    parser.add_argument(
+        "--gate-nodes-up-to", type=int, default=1, help="gate per-node latency only at concurrency up to this"
+    )
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+
+    with FakeBrightDataServer(recordings, latency) as server:
+        research, reset = load_research(model, server.url)
+        import snapshot_operations
+        from models import ModelRegistry, configure_models, get_models
+
+        results = {"scale": args.scale, "runs": args.runs, "levels": {}}
+        with asyncio.Runner() as runner:
+            # One untimed question first, so import-time and first-call
+            # allocations don't land in the first level's numbers.
+            reset()
+            runner.run(run_level(research, 1, 1))
+            server.request_counts.clear()
+            model.calls = 0
+            configure_models(ModelRegistry())
+            snapshot_operations.snapshot_stats = snapshot_operations.SnapshotStats()
+
+            for level in (int(value) for value in args.concurrency.split(",")):
+                reset()
+                tracemalloc.start()
+                tracemalloc.reset_peak()
+                stats = runner.run(run_level(research, level, args.runs))
+                stats["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+                tracemalloc.stop()
+                results["levels"][str(level)] = stats
+        results["requests"] = dict(sorted(server.request_counts.items()))
+        results["llm_calls"] = model.calls
+        results["models"] = get_models().stats()
+        results["snapshots"] = snapshot_operations.snapshot_stats.stats()
+
+    print_report(results)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline found; run with --update-baseline to record one")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if (baseline.get("scale"), baseline.get("runs")) != (args.scale, args.runs):
+        print(
+            f"\nBaseline was recorded with --scale {baseline.get('scale')} --runs {baseline.get('runs')}; not comparing"
+        )
+        return
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta, args.gate_nodes_up_to)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
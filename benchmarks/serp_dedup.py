@@ -0,0 +1,113 @@
+"""Prompt tokens and analysis latency of the Google/Bing deduplication.
+
+Replays the recorded SERP fixtures (benchmarks/fixtures/recordings.json,
+where half of the Bing hits are also Google hits) with sampled search
+latencies and runs both analyses through the fake chat model, whose
+latency grows with the prompt. Strategies:
+
+  separate  each analysis gets its own engine's hits as they arrive
+  merged    both analyses start once both searches are in; Google gets the
+            shared hits (ranked by reciprocal rank fusion) and its own,
+            Bing only its own (what the graph does)
+
+    python benchmarks/serp_dedup.py --runs 20
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeChatModel, LatencyProfile
+from run_benchmark import QUESTIONS, load_research, percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+STRATEGIES = ("separate", "merged")
+
+
+async def analyze(research, state, source, results) -> int:
+    from compaction import SOURCE_TOKEN_BUDGETS, compact_serp_results, count_tokens
+    from prompts import get_bing_analysis_messages, get_google_analysis_messages
+
+    compact_results = compact_serp_results(results, SOURCE_TOKEN_BUDGETS[source])
+    build = get_google_analysis_messages if source == "google" else get_bing_analysis_messages
+    await research._acached_llm_reply(state, build(state["user_question"], compact_results))
+    return count_tokens(compact_results)
+
+
+async def one(research, latency, serp, strategy, question):
+    from serp_merge import merge_serp_results
+
+    state = research.build_initial_state(question)
+    started = time.perf_counter()
+
+    async def search(engine):
+        await asyncio.sleep(latency.sample("serp"))
+        return serp[engine]
+
+    google_search = asyncio.create_task(search("google"))
+    bing_search = asyncio.create_task(search("bing"))
+
+    async def google_branch():
+        google_results = await google_search
+        if strategy == "merged":
+            google_results, _ = merge_serp_results(google_results, await bing_search)
+        tokens = await analyze(research, state, "google", google_results)
+        return tokens, time.perf_counter() - started
+
+    async def bing_branch():
+        bing_results = await bing_search
+        if strategy == "merged":
+            _, bing_results = merge_serp_results(await google_search, bing_results)
+            if not bing_results.get("organic"):
+                return 0, time.perf_counter() - started
+        tokens = await analyze(research, state, "bing", bing_results)
+        return tokens, time.perf_counter() - started
+
+    (google_tokens, google_done), (bing_tokens, bing_done) = await asyncio.gather(google_branch(), bing_branch())
+    return google_tokens + bing_tokens, google_done, bing_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="questions per strategy")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    # No Bright Data requests are made; the searches are simulated here.
+    research, reset = load_research(model, "http://127.0.0.1:9")
+
+    print(f"{args.runs} runs per strategy, concurrency 1 (latency scale {args.scale})\n")
+    print(f"{'strategy':>10} {'SERP tokens':>12} {'google p50':>11} {'bing p50':>9} {'both p50':>9} {'both p95':>9}")
+    with asyncio.Runner() as runner:
+        for strategy in STRATEGIES:
+            reset()
+            tokens, google, bing, both = [], [], [], []
+            for i in range(args.runs):
+                question = f"{QUESTIONS[i % len(QUESTIONS)]} (run {i})"
+                total, google_done, bing_done = runner.run(one(research, latency, recordings["serp"], strategy, question))
+                tokens.append(total)
+                google.append(google_done)
+                bing.append(bing_done)
+                both.append(max(google_done, bing_done))
+            print(
+                f"{strategy:>10} {sum(tokens) / len(tokens):12.0f} {percentile(google, 50):10.2f}s "
+                f"{percentile(bing, 50):8.2f}s {percentile(both, 50):8.2f}s {percentile(both, 95):8.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Load test of the research service (src/server.py).
+
+Runs the ASGI app under uvicorn on a local port, with the graph against
+the fake Bright Data server and chat model, and sends --requests streamed
+research requests (POST /research?stream=true) at each --concurrency
+level. Reports p50/p99 time to the first answer token and to the end of
+the stream, throughput, failed requests, and the events the service still
+holds per finished job.
+
+    python benchmarks/server_load.py --requests 32 --concurrency 1,8,32
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+from fake_backend import FakeBrightDataServer, FakeChatModel, LatencyProfile
+from run_benchmark import QUESTIONS, load_research, percentile
+
+FIXTURES = os.path.join(HERE, "fixtures", "recordings.json")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+async def one(client: httpx.AsyncClient, question: str) -> tuple[float, float]:
+    """Seconds to the first answer token and to the end of the stream."""
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/research?stream=true", json={"question": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[len("data: "):])
+                if event["type"] in ("token", "answer") and first_token is None:
+                    first_token = time.perf_counter() - started
+                if event["type"] == "end" and event["status"] != "done":
+                    raise RuntimeError(f"job {event['status']}")
+    elapsed = time.perf_counter() - started
+    return first_token if first_token is not None else elapsed, elapsed
+
+
+async def run_level(base_url: str, requests: int, concurrency: int, offset: int):
+    slots = asyncio.Semaphore(concurrency)
+    first_tokens, latencies = [], []
+    errors = 0
+
+    async def request(i):
+        nonlocal errors
+        async with slots:
+            # Distinct questions, so concurrent requests don't share upstream calls.
+            question = f"{QUESTIONS[i % len(QUESTIONS)]} (request {offset + i})"
+            try:
+                first_token, elapsed = await one(client, question)
+            except (httpx.HTTPError, RuntimeError):
+                errors += 1
+                return
+            first_tokens.append(first_token)
+            latencies.append(elapsed)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=httpx.Limits(max_connections=None)) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(request(i) for i in range(requests)))
+        wall = time.perf_counter() - started
+    return first_tokens, latencies, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiplier applied to all simulated latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(FIXTURES, encoding="utf-8") as f:
+        recordings = json.load(f)
+
+    latency = LatencyProfile(scale=args.scale, seed=args.seed)
+    model = FakeChatModel(recordings=recordings, latency=latency)
+    with FakeBrightDataServer(recordings, latency) as backend:
+        research, reset = load_research(model, backend.url)
+        from server import MAX_CONCURRENT_JOBS, ResearchApp
+
+        app = ResearchApp()
+        port = free_port()
+        service, thread = start_service(app, port)
+        print(
+            f"{args.requests} requests per level, MAX_CONCURRENT_JOBS={MAX_CONCURRENT_JOBS} "
+            f"(latency scale {args.scale})\n"
+        )
+        print(
+            f"{'conc':>5} {'first token p50':>16} {'p99':>7} {'end p50':>8} {'p99':>7} {'req/s':>6} "
+            f"{'errors':>7} {'events/job':>11} {'tokens/job':>11}"
+        )
+        try:
+            offset = 0
+            for concurrency in [int(level) for level in args.concurrency.split(",")]:
+                reset()
+                first_tokens, latencies, errors, wall = asyncio.run(
+                    run_level(f"http://127.0.0.1:{port}", args.requests, concurrency, offset)
+                )
+                offset += args.requests
+                finished = [job for job in list(app.manager.jobs.values()) if job.finished is not None]
+                events = sum(len(job.events) for job in finished) / max(1, len(finished))
+                tokens = sum(event["type"] == "token" for job in finished for event in job.events) / max(1, len(finished))
+                print(
+                    f"{concurrency:>5} {percentile(first_tokens, 50):15.2f}s {percentile(first_tokens, 99):6.2f}s "
+                    f"{percentile(latencies, 50):7.2f}s {percentile(latencies, 99):6.2f}s "
+                    f"{len(latencies) / wall:6.2f} {errors:>7} {events:11.1f} {tokens:11.1f}"
+                )
+        finally:
+            service.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
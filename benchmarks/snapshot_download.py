@@ -0,0 +1,133 @@
+"""Compare whole-body and streaming downloads of a large comments snapshot.
+
+Serves a synthetic snapshot of --comments Reddit comment records (shaped
+like load_all_replies output, with nested replies and author metadata) from
+the fake Bright Data server. Each mode runs in its own subprocess so peak
+RSS is measured independently:
+
+    full    adownload_snapshot() (format=json), then project each record
+    stream  astream_snapshot() (format=jsonl) with on-the-fly projection
+
+    python benchmarks/snapshot_download.py --comments 100000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+
+def synthetic_comments(count: int):
+    for i in range(count):
+        thread = i % 25
+        yield {
+            "comment_id": f"t1_{i:07d}",
+            "comment": f"Comment {i}: " + "I have been using this for a while and here is my take. " * 4,
+            "date_posted": "2025-01-10T12:00:00Z",
+            "post_url": f"https://www.reddit.com/r/bench/comments/{thread:05d}/thread_{thread}/",
+            "url": f"https://www.reddit.com/r/bench/comments/{thread:05d}/thread_{thread}/c{i}/",
+            "user_posted": f"user_{i % 5000}",
+            "community_name": "bench",
+            "num_upvotes": i % 300,
+            "num_replies": 2,
+            "replies": [
+                {
+                    "comment_id": f"t1_{i:07d}_{j}",
+                    "comment": "Agreed, that matches my experience. " * 3,
+                    "user_posted": f"user_{(i + j) % 5000}",
+                    "num_upvotes": j,
+                }
+                for j in range(2)
+            ],
+            "parent_comment_id": None,
+            "is_moderator": False,
+        }
+
+
+def peak_rss_mb() -> float:
+    # VmHWM is reset on exec; ru_maxrss would carry over the parent's peak.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    scale = 2**20 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+async def measure(mode: str, base_url: str, snapshot_id: str):
+    from brightdata_client import configure_client
+    from snapshot_operations import adownload_snapshot, astream_snapshot
+    from web_operations import COMMENT_FIELDS
+
+    configure_client(base_url=base_url, api_key="bench")
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    first_record = None
+    comments = []
+
+    if mode == "full":
+        data = await adownload_snapshot(snapshot_id)
+        for record in data:
+            if first_record is None:
+                first_record = time.perf_counter() - started
+            comments.append({field: record.get(field) for field in COMMENT_FIELDS})
+        del data
+    else:
+        async for record in astream_snapshot(snapshot_id, COMMENT_FIELDS):
+            if first_record is None:
+                first_record = time.perf_counter() - started
+            comments.append(record)
+
+    return {
+        "mode": mode,
+        "records": len(comments),
+        "first_record_s": round(first_record, 3),
+        "total_s": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "URL", "SNAPSHOT_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(*args.child))))
+        return
+
+    from fake_backend import FakeBrightDataServer, LatencyProfile
+
+    latency = LatencyProfile({"download": {"median": 0.0, "sigma": 0.0}})
+    recordings = {"reddit_comments": list(synthetic_comments(args.comments))}
+    with FakeBrightDataServer(recordings, latency) as server:
+        size = len(json.dumps(recordings["reddit_comments"])) / 2**20
+        print(f"Synthetic snapshot: {args.comments} comments, {size:.1f} MB as JSON\n")
+        print(f"{'mode':<8} {'records':>8} {'first record':>13} {'total':>8} {'peak RSS':>10} {'RSS growth':>11}")
+        for mode in ("full", "stream"):
+            snapshot_id = server.add_snapshot("reddit_comments")
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, server.url, snapshot_id],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{result['mode']:<8} {result['records']:>8} {result['first_record_s']:>12.3f}s "
+                f"{result['total_s']:>7.2f}s {result['peak_rss_mb']:>8.1f}MB {result['peak_rss_growth_mb']:>9.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Memory and per-step checkpoint cost of a large Reddit comment state.
+
+Builds a State holding --comments Reddit comments in each layout, the
+dict per comment the retrieval used to return ("dicts") and the columnar
+records.CommentBatch ("batch"), each in a fresh subprocess so RSS figures
+don't mix. For each it reports the RSS and traced allocations the comments
+add, the checkpoint serializer's size and time for the state, and the
+per-step time of a pass-through graph run with and without the SQLite
+checkpointer, which writes each step's changed channels, and the longest
+the event loop went without running during an async durable run.
+
+    python benchmarks/state_memory.py --comments 100000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from typing import Any, TypedDict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+OPINIONS = [
+    "The battery easily lasts a full workday, but the fan gets loud under load.",
+    "Support replaced my hinge within a week, which is why I would buy again.",
+    "Linux works out of the box; suspend was flaky until the last firmware update.",
+    "For the price you can get more performance elsewhere, repairability is the selling point.",
+]
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def comment_rows(count: int):
+    # Distinct strings per comment, as parsed from a snapshot.
+    for i in range(count):
+        yield (
+            f"t1_{i:08x}",
+            f"#{i} {OPINIONS[i % 4]} {OPINIONS[(i + 1) % 4]}",
+            f"2025-01-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00Z",
+        )
+
+
+def build(layout: str, count: int):
+    if layout == "dicts":
+        comments = [
+            {"comment_id": comment_id, "content": content, "date": date}
+            for comment_id, content, date in comment_rows(count)
+        ]
+    else:
+        from records import CommentBatch
+
+        comments = CommentBatch.from_rows(comment_rows(count))
+    return {"comments": comments, "total_retrieved": count}
+
+
+class StepState(TypedDict):
+    reddit_post_data: Any
+    step: int
+
+
+def step_graph(steps: int, checkpointer=None):
+    from langgraph.graph import StateGraph, START, END
+
+    builder = StateGraph(StepState)
+    previous = START
+    for i in range(steps):
+        builder.add_node(f"step_{i}", lambda state: {"step": state["step"] + 1})
+        builder.add_edge(previous, f"step_{i}")
+        previous = f"step_{i}"
+    builder.add_edge(previous, END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def longest_stall(graph, state, config) -> float:
+    """Run the graph, timing the longest gap between 1ms ticks of another task."""
+    done = asyncio.Event()
+    longest = 0.0
+
+    async def tick():
+        nonlocal longest
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await graph.ainvoke(state, config)
+    done.set()
+    await ticker
+    return longest
+
+
+def measure(layout: str, count: int, steps: int) -> dict:
+    from checkpoint import SQLiteCheckpointSaver
+
+    # RSS without tracemalloc's own bookkeeping; traced size from a second copy.
+    rss_before = rss_bytes()
+    data = build(layout, count)
+    rss_after = rss_bytes()
+    tracemalloc.start()
+    copy = build(layout, count)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+
+    with tempfile.TemporaryDirectory() as directory:
+        saver = SQLiteCheckpointSaver(os.path.join(directory, "checkpoints.sqlite3"))
+        started = time.perf_counter()
+        type_, blob = saver.serde.dumps_typed(data)
+        dumps = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = saver.serde.loads_typed((type_, blob))
+        loads = time.perf_counter() - started
+        assert len(loaded["comments"]) == count
+
+        state = {"reddit_post_data": data, "step": 0}
+        started = time.perf_counter()
+        step_graph(steps).invoke(state)
+        plain = (time.perf_counter() - started) / steps
+
+        started = time.perf_counter()
+        step_graph(steps, saver).invoke(state, {"configurable": {"thread_id": layout}})
+        durable = (time.perf_counter() - started) / steps
+        stall = asyncio.run(
+            longest_stall(step_graph(steps, saver), state, {"configurable": {"thread_id": f"{layout}-async"}})
+        )
+        peak_rss = rss_bytes()
+
+    return {
+        "layout": layout,
+        "rss_mb": (rss_after - rss_before) / 2**20,
+        "traced_mb": traced / 2**20,
+        "checkpoint_mb": len(blob) / 2**20,
+        "dumps_ms": dumps * 1000,
+        "loads_ms": loads * 1000,
+        "step_ms": plain * 1000,
+        "durable_step_ms": durable * 1000,
+        "loop_stall_ms": stall * 1000,
+        "rss_after_run_mb": (peak_rss - rss_before) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=8, help="pass-through nodes in the graph")
+    parser.add_argument("--layout", choices=("dicts", "batch"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        print(json.dumps(measure(args.layout, args.comments, args.steps)))
+        return
+
+    print(f"{args.comments} comments, {args.steps}-step graph\n")
+    print(
+        f"{'layout':>7} {'RSS MB':>7} {'traced MB':>10} {'ckpt MB':>8} {'dumps ms':>9} {'loads ms':>9} "
+        f"{'step ms':>8} {'durable step ms':>16} {'loop stall ms':>14} {'RSS after run':>14}"
+    )
+    for layout in ("dicts", "batch"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--layout", layout, "--comments", str(args.comments), "--steps", str(args.steps)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{r['layout']:>7} {r['rss_mb']:7.1f} {r['traced_mb']:10.1f} {r['checkpoint_mb']:8.1f} "
+            f"{r['dumps_ms']:9.1f} {r['loads_ms']:9.1f} {r['step_ms']:8.2f} {r['durable_step_ms']:16.1f} "
+            f"{r['loop_stall_ms']:14.1f} {r['rss_after_run_mb']:13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Offline evaluation of the local Reddit thread ranker against labelled selections.
+
+Each case in benchmarks/fixtures/url_selection_cases.json holds a question,
+the posts reddit_search_api returned for it and the URLs to select
+(llm_selected, the shape the model's selection comes in). The shipped
+labels are hand-made, not the model's picks, so the eval reports recall
+of the labels; --record replaces them with live selections from the
+configured model (needs OPENAI_API_KEY), after which recall is agreement
+with the model.
+
+    python benchmarks/url_selection_eval.py [--k 5] [--record]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from ranking import select_urls
+
+CASES = os.path.join(HERE, "fixtures", "url_selection_cases.json")
+
+
+async def record_llm_selections(cases):
+    import main as research
+
+    for case in cases:
+        reddit_results = {"parsed_posts": case["posts"], "total_found": len(case["posts"])}
+        case["llm_selected"] = await research._aselect_urls_with_llm(case["question"], reddit_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--engagement-weight", type=float, default=0.5)
+    parser.add_argument("--min-margin", type=float, default=0.05, help="see ranking.select_urls")
+    parser.add_argument("--record", action="store_true", help="re-label the cases with live LLM selections")
+    args = parser.parse_args()
+
+    with open(CASES, encoding="utf-8") as f:
+        fixture = json.load(f)
+    cases = fixture["cases"]
+
+    if args.record:
+        asyncio.run(record_llm_selections(cases))
+        fixture["source"] = "recorded"
+        with open(CASES, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2)
+
+    source = fixture.get("source", "unknown")
+    labels = "the model's picks" if source == "recorded" else f"{source} picks"
+    print(f"{len(cases)} cases ({source} labels), k={args.k}\n")
+    print(f"{'question':<58} {'recall':>8} {'jaccard':>8} {'fallback':>9} {'ms':>6}")
+    totals = {"recall": 0.0, "jaccard": 0.0, "hybrid": 0.0, "fallbacks": 0}
+    for case in cases:
+        started = time.perf_counter()
+        selected, ambiguous = select_urls(
+            case["question"], case["posts"], args.k, args.engagement_weight, args.min_margin
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        local, labelled = set(selected), set(case["llm_selected"])
+        recall = len(local & labelled) / len(labelled) if labelled else 1.0
+        jaccard = len(local & labelled) / len(local | labelled) if local | labelled else 1.0
+        totals["recall"] += recall
+        totals["jaccard"] += jaccard
+        totals["fallbacks"] += ambiguous
+        # In hybrid mode an ambiguous ranking is handed to the model, which
+        # is counted as picking the labels.
+        totals["hybrid"] += 1.0 if ambiguous else recall
+        print(
+            f"{case['question'][:58]:<58} {recall:>8.2f} {jaccard:>8.2f} "
+            f"{'yes' if ambiguous else 'no':>9} {elapsed_ms:>6.2f}"
+        )
+
+    n = len(cases) or 1
+    print(
+        f"\nmean recall (share of {labels} also picked locally) {totals['recall'] / n:.2f}, "
+        f"mean Jaccard {totals['jaccard'] / n:.2f}"
+    )
+    print(
+        f"hybrid mode: LLM fallbacks {totals['fallbacks']}/{len(cases)}, "
+        f"mean recall {totals['hybrid'] / n:.2f} (fallbacks counted as matching the labels)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import asyncio
+import random
+import weakref
+import contextlib
+import httpx
+from dotenv import load_dotenv
+from typing import Optional
+
+load_dotenv()
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Errors raised before the request was sent, so retrying can't repeat it.
+# Other transport errors (a read timeout, say) may come after the server
+# acted on the request: a retried trigger would bill a second snapshot.
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+DEFAULT_BASE_URL = "https://api.brightdata.com"
+
+
+class BrightDataClient:
+    """Shared, pooled HTTP client for all Bright Data API calls.
+
+    Owns one keep-alive connection pool per event loop, the prebuilt auth
+    headers and the retry policy (jittered exponential backoff on 429/5xx
+    and transport errors; for POSTs, only errors raised before the request
+    was sent). Request paths are relative to base_url (BRIGHTDATA_BASE_URL,
+    default https://api.brightdata.com).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        api_key = api_key or os.getenv("BRIGHTDATA_API_KEY")
+        self.base_url = base_url or os.getenv("BRIGHTDATA_BASE_URL", DEFAULT_BASE_URL)
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        # Keeping fewer idle connections than max_connections makes a busy
+        # pool close and reopen connections on every request.
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections or max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        # httpx connections are bound to the loop that opened them, so each
+        # event loop gets its own pool. A loop's pool lives until aclose()
+        # is called on it; run_sync() does that for the sync wrappers.
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+            self._clients[loop] = client
+        return client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @staticmethod
+    def _retryable(method: str, error: httpx.TransportError) -> bool:
+        return method.upper() in IDEMPOTENT_METHODS or isinstance(error, NOT_SENT_ERRORS)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = self._client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries or not self._retryable(method, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Like request(), but the body is left unread for aiter_lines()/aiter_bytes().
+
+        Retries only cover getting the response headers; once the body is
+        being consumed, errors propagate to the caller.
+        """
+        client = self._client()
+        request = client.build_request(method, url, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries or not self._retryable(method, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                break
+            await response.aclose()
+            await asyncio.sleep(self._backoff(attempt, response))
+
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_client: Optional[BrightDataClient] = None
+
+
+def get_client() -> BrightDataClient:
+    global _client
+    if _client is None:
+        _client = BrightDataClient()
+    return _client
+
+
+def configure_client(**kwargs) -> BrightDataClient:
+    """Replace the shared client, e.g. to change pool size or timeouts."""
+    global _client
+    _client = BrightDataClient(**kwargs)
+    return _client
+
+
+def run_sync(coro):
+    """asyncio.run(coro), closing the Bright Data pool it opened on the way out.
+
+    Pools are per event loop and every asyncio.run() starts a new loop, so
+    without this each sync wrapper call would leave an open client behind.
+    Sync callers get no reuse across calls; use the async API for that.
+    """
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await get_client().aclose()
+
+    return asyncio.run(main())
@@ -0,0 +1,372 @@
+import os
+import re
+import json
+import time
+import queue
+import asyncio
+import atexit
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTLS = {
+    "serp": 60 * 60,
+    "reddit_search": 6 * 60 * 60,
+    "reddit_comments": 6 * 60 * 60,
+}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+
+def make_key(source: str, **params) -> str:
+    """Stable cache key for a source and its (already normalized) params."""
+    raw = json.dumps({"source": source, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class MemoryLRU:
+    """In-process LRU tier with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteStore:
+    """On-disk tier; values are stored as JSON and evicted least recently used.
+
+    Writes (new entries and last-access updates) go to a background thread
+    that commits them in batches, then drops expired rows and, past
+    max_entries, evicts the least recently used in batches of evict_batch.
+    Reads are indexed point lookups on their own connection and see writes
+    that are still queued.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, evict_batch: int = 500):
+        self.max_entries = max_entries
+        self.evict_batch = evict_batch
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        with self._writer:
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            self._writer.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._writer.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._writer.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+        self._unwritten: Dict[str, tuple[float, Any]] = {}
+        self._unwritten_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        threading.Thread(target=self._write_loop, name="cache-writer", daemon=True).start()
+        atexit.register(self.flush)
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        now = time.time()
+        with self._unwritten_lock:
+            entry = self._unwritten.get(key)
+        if entry is None:
+            with self._read_lock:
+                row = self._reader.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+            entry = row and (row[1], json.loads(row[0]))
+        # Expired rows are left to the writer's next sweep.
+        if entry is None or entry[0] <= now:
+            return None
+        self._queue.put(("touch", key, now))
+        return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        entry = (expires_at, value)
+        with self._unwritten_lock:
+            self._unwritten[key] = entry
+        self._queue.put(("set", key, entry))
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except sqlite3.Error as e:
+                logger.error("Writing %d cache entries failed: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        now = time.time()
+        written = {}
+        with self._writer:
+            for op, key, arg in batch:
+                if op == "set":
+                    written[key] = arg
+                    self._writer.execute(
+                        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", (key, json.dumps(arg[1]), arg[0], now)
+                    )
+                else:
+                    self._writer.execute("UPDATE cache SET last_access = ? WHERE key = ?", (arg, key))
+            self._writer.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            (count,) = self._writer.execute("SELECT COUNT(*) FROM cache").fetchone()
+            if count > self.max_entries:
+                self._writer.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    " SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries + self.evict_batch,),
+                )
+        with self._unwritten_lock:
+            for key, entry in written.items():
+                if self._unwritten.get(key) is entry:
+                    del self._unwritten[key]
+
+
+class ResultCache:
+    """Two-tier (memory, then disk) cache for search and snapshot results.
+
+    Either tier may be None. TTLs are per source; hit/miss counters are kept
+    per source and exposed through stats().
+    """
+
+    def __init__(
+        self,
+        memory: Optional[MemoryLRU] = None,
+        disk: Optional[SQLiteStore] = None,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.memory = memory
+        self.disk = disk
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def get(self, source: str, key: str) -> Optional[Any]:
+        entry = self.memory.get(key) if self.memory else None
+        if entry is None and self.disk:
+            entry = self._promote(key, self.disk.get(key))
+        return self._count(source, entry)
+
+    async def aget(self, source: str, key: str) -> Optional[Any]:
+        """Like get(), with the disk lookup in a worker thread, off the event loop."""
+        entry = self.memory.get(key) if self.memory else None
+        if entry is None and self.disk:
+            entry = self._promote(key, await asyncio.to_thread(self.disk.get, key))
+        return self._count(source, entry)
+
+    def _promote(self, key: str, entry: Optional[tuple[float, Any]]) -> Optional[tuple[float, Any]]:
+        if entry is not None and self.memory:
+            self.memory.set(key, entry[1], entry[0])
+        return entry
+
+    def _count(self, source: str, entry: Optional[tuple[float, Any]]) -> Optional[Any]:
+        if entry is None:
+            self._counters[source]["misses"] += 1
+            return None
+        self._counters[source]["hits"] += 1
+        return entry[1]
+
+    def set(self, source: str, key: str, value: Any):
+        if value is None:
+            return
+        expires_at = time.time() + self.ttls.get(source, 60 * 60)
+        if self.memory:
+            self.memory.set(key, value, expires_at)
+        if self.disk:
+            self.disk.set(key, value, expires_at)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {source: dict(counts) for source, counts in self._counters.items()}
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        path = os.getenv("RESEARCH_CACHE_PATH", ".cache/results.sqlite3")
+        _cache = ResultCache(MemoryLRU(), SQLiteStore(path))
+    return _cache
+
+
+def configure_cache(cache: ResultCache) -> ResultCache:
+    """Plug in a different cache, e.g. ResultCache() to disable both tiers."""
+    global _cache
+    _cache = cache
+    return _cache
+
+
+def _message_parts(message) -> tuple[str, str]:
+    if isinstance(message, dict):
+        return message.get("role", ""), str(message.get("content", ""))
+    return getattr(message, "type", ""), str(getattr(message, "content", ""))
+
+
+def llm_cache_key(model: str, messages) -> str:
+    return make_key("llm", model=model, messages=[_message_parts(m) for m in messages])
+
+
+_PROMPT_LABEL = re.compile(r"^[^:\n]*:\s*")
+_WORD = re.compile(r"\w+")
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+class LLMResponseCache:
+    """Bounded TTL cache for chat model responses.
+
+    Exact hits are keyed on the model name plus the full message list. With
+    near_duplicate_threshold set, a miss falls back to the cached response
+    with the most similar question, by token Jaccard similarity at or above
+    the threshold (e.g. a paraphrased question), provided its system prompt
+    matches and its data is the same: the rest of the user content must
+    score at least payload_threshold. The question is the first paragraph
+    of the user content, as the prompts lay it out, less its label.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 24 * 60 * 60,
+        near_duplicate_threshold: Optional[float] = None,
+        payload_threshold: float = 0.98,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.payload_threshold = payload_threshold
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "saved_seconds": 0.0,
+            "saved_tokens": 0,
+        }
+
+    @staticmethod
+    def _describe(model: str, messages) -> tuple[str, str, frozenset, frozenset]:
+        parts = [_message_parts(message) for message in messages]
+        key = llm_cache_key(model, messages)
+        system = make_key(
+            "llm_system", model=model, system=[c for r, c in parts if r == "system"]
+        )
+        user_text = "\n\n".join(c for r, c in parts if r != "system")
+        question, _, payload = user_text.partition("\n\n")
+        question = _PROMPT_LABEL.sub("", question, count=1)
+        return key, system, frozenset(_WORD.findall(question.lower())), frozenset(_WORD.findall(payload.lower()))
+
+    def get(self, model: str, messages) -> Optional[str]:
+        key, system, question, payload = self._describe(model, messages)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            counter = "hits"
+            if entry is None and self.near_duplicate_threshold is not None:
+                entry = self._nearest(system, question, payload, now)
+                counter = "near_hits"
+            if entry is None or entry["expires_at"] <= now:
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(entry["key"])
+            self._counters[counter] += 1
+            self._counters["saved_seconds"] += entry["latency"]
+            self._counters["saved_tokens"] += entry["tokens"]
+            return entry["content"]
+
+    def _nearest(self, system: str, question: frozenset, payload: frozenset, now: float) -> Optional[dict]:
+        best, best_score = None, self.near_duplicate_threshold
+        for entry in self._entries.values():
+            if entry["system"] != system or entry["expires_at"] <= now:
+                continue
+            score = _jaccard(question, entry["question"])
+            if score >= best_score and _jaccard(payload, entry["payload"]) >= self.payload_threshold:
+                best, best_score = entry, score
+        return best
+
+    def set(self, model: str, messages, content: str, latency: float = 0.0, tokens: int = 0):
+        key, system, question, payload = self._describe(model, messages)
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "system": system,
+                "question": question,
+                "payload": payload,
+                "content": content,
+                "expires_at": time.time() + self.ttl,
+                "latency": latency,
+                "tokens": tokens,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
+
+
+def configure_llm_cache(cache: LLMResponseCache) -> LLMResponseCache:
+    global _llm_cache
+    _llm_cache = cache
+    return _llm_cache
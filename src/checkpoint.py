@@ -0,0 +1,414 @@
+import os
+import time
+import asyncio
+import random
+import sqlite3
+import threading
+import contextlib
+import contextvars
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("RESEARCH_CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """LangGraph checkpointer storing checkpoints and pending writes in SQLite.
+
+    Channel values are stored apart from the checkpoint, once per channel
+    version, so a step only serializes the channels it changed rather than
+    the whole state (the Reddit comments, say) again.
+
+    Besides the graph's checkpoints it keeps a ledger of Bright Data
+    snapshots a run has triggered but not yet downloaded, so a run resumed
+    after a crash polls those snapshots instead of triggering new ones, and
+    a list of finished runs, so resuming skips them without loading their
+    state.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, **kwargs):
+        super().__init__(**kwargs)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL,"
+                " metadata_type TEXT NOT NULL, metadata BLOB NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL,"
+                " type TEXT NOT NULL, value BLOB NOT NULL, task_path TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL,"
+                " version TEXT NOT NULL, type TEXT NOT NULL, value BLOB NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, channel, version))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_snapshots ("
+                " thread_id TEXT NOT NULL, request_key TEXT NOT NULL, snapshot_id TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, request_key))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS finished_runs (thread_id TEXT PRIMARY KEY, finished_at REAL NOT NULL)"
+            )
+
+    def _tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        with self._lock:
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+                " ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        checkpoint["channel_values"] = self._load_blobs(thread_id, checkpoint_ns, checkpoint)
+
+        def config(checkpoint_id: str) -> RunnableConfig:
+            return {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            }
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, checkpoint: Checkpoint) -> Dict[str, Any]:
+        # Checkpoints written before values were split out still carry them.
+        values = dict(checkpoint.get("channel_values") or {})
+        wanted = [
+            (channel, version) for channel, version in checkpoint["channel_versions"].items()
+            if channel not in values
+        ]
+        if not wanted:
+            return values
+        with self._lock:
+            for channel, version in wanted:
+                row = self._conn.execute(
+                    "SELECT type, value FROM blobs"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    (thread_id, checkpoint_ns, channel, str(version)),
+                ).fetchone()
+                # "empty" marks a channel cleared at this version.
+                if row and row[0] != "empty":
+                    values[channel] = self.serde.loads_typed(row)
+        return values
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " type, checkpoint, metadata_type, metadata FROM checkpoints"
+            " WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " type, checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params: List[Any] = []
+        if config:
+            configurable = config["configurable"]
+            query += " AND thread_id = ?"
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            params.append(get_checkpoint_id(before))
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._tuple(row)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        values = checkpoint.get("channel_values") or {}
+        versions = dict(new_versions)
+        # Unchanged channels are normally stored already; not when the run
+        # continues from a checkpoint written before values were split out.
+        with self._lock:
+            for channel in values.keys() - versions.keys():
+                version = str(checkpoint["channel_versions"][channel])
+                if not self._conn.execute(
+                    "SELECT 1 FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                    (thread_id, checkpoint_ns, channel, version),
+                ).fetchone():
+                    versions[channel] = version
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in versions.items()
+        ]
+        type_, data = self.serde.dumps_typed({**checkpoint, "channel_values": {}})
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    data,
+                    metadata_type,
+                    metadata_data,
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        # Special channels (errors, interrupts, ...) keep their latest write;
+        # regular writes of a task are never overwritten.
+        replace, keep = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            (replace if channel in WRITES_IDX_MAP else keep).append((
+                configurable["thread_id"],
+                configurable.get("checkpoint_ns", ""),
+                configurable["checkpoint_id"],
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                data,
+                task_path,
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", replace)
+            self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", keep)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            for table in ("checkpoints", "writes", "blobs", "pending_snapshots", "finished_runs"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # The async API runs the SQLite work (and the serializer) in a worker
+    # thread, so a large state doesn't block the event loop while a step is
+    # checkpointed.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def thread_ids(self, finished: Optional[bool] = None) -> List[str]:
+        """Threads with checkpoints; finished=False leaves out runs marked finished, True keeps only those."""
+        query = "SELECT DISTINCT thread_id FROM checkpoints"
+        if finished is not None:
+            query += f" WHERE thread_id {'IN' if finished else 'NOT IN'} (SELECT thread_id FROM finished_runs)"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query)]
+
+    def mark_finished(self, thread_id: str):
+        """Record that the run on thread_id completed.
+
+        Its checkpoints stay (a finished run returns its final state), but
+        snapshots still in the ledger, such as those abandoned at the Reddit
+        comments deadline, will never be resumed and are dropped.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO finished_runs VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._conn.execute("DELETE FROM pending_snapshots WHERE thread_id = ?", (thread_id,))
+
+    def pending_snapshot(self, thread_id: str, request_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT snapshot_id FROM pending_snapshots WHERE thread_id = ? AND request_key = ?",
+                (thread_id, request_key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def remember_snapshot(self, thread_id: str, request_key: str, snapshot_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pending_snapshots VALUES (?, ?, ?)",
+                (thread_id, request_key, snapshot_id),
+            )
+
+    def forget_snapshot(self, thread_id: str, request_key: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM pending_snapshots WHERE thread_id = ? AND request_key = ?",
+                (thread_id, request_key),
+            )
+
+
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+
+
+def get_checkpointer() -> SQLiteCheckpointSaver:
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = SQLiteCheckpointSaver()
+    return _checkpointer
+
+
+def configure_checkpointer(saver: SQLiteCheckpointSaver) -> SQLiteCheckpointSaver:
+    global _checkpointer
+    _checkpointer = saver
+    return _checkpointer
+
+
+_current_run: contextvars.ContextVar[Optional[tuple[SQLiteCheckpointSaver, str]]] = contextvars.ContextVar(
+    "current_run", default=None
+)
+
+
+@contextlib.contextmanager
+def durable_run(saver: SQLiteCheckpointSaver, thread_id: str):
+    """Record snapshots triggered inside the block against thread_id."""
+    token = _current_run.set((saver, thread_id))
+    try:
+        yield
+    finally:
+        _current_run.reset(token)
+
+
+def pending_snapshot(request_key: str) -> Optional[str]:
+    """Snapshot this durable run already triggered for request_key, if any."""
+    run = _current_run.get()
+    return run[0].pending_snapshot(run[1], request_key) if run else None
+
+
+def remember_snapshot(request_key: str, snapshot_id: str):
+    run = _current_run.get()
+    if run:
+        run[0].remember_snapshot(run[1], request_key, snapshot_id)
+
+
+def forget_snapshot(request_key: str):
+    run = _current_run.get()
+    if run:
+        run[0].forget_snapshot(run[1], request_key)
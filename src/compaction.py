@@ -0,0 +1,196 @@
+import logging
+from typing import Any, Dict, List, Optional
+from tracing import set_attributes
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TOKEN_BUDGETS = {
+    "google": 2500,
+    "bing": 2500,
+    "reddit_posts": 1500,
+    "reddit_comments": 6000,
+}
+
+SNIPPET_CHARS = 300
+COMMENT_CHARS = 600
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else a ~4 chars/token estimate."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: Any, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    if len(text) <= limit:
+        return text
+    return text[: limit - 1].rstrip() + "…"
+
+
+def _fit(header: List[str], lines: List[str], budget: int, empty: str) -> tuple[str, bool]:
+    """Join lines in order, stopping before the token budget is exceeded.
+
+    Also returns whether every line fit.
+    """
+    if not header and not lines:
+        return empty, True
+    kept = list(header)
+    used = count_tokens("\n".join(kept))
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            kept.append(f"[{len(lines) - (len(kept) - len(header))} more omitted]")
+            return "\n".join(kept), False
+        kept.append(line)
+        used += cost
+    return "\n".join(kept), True
+
+
+def _fit_lines(header: List[str], lines: List[str], budget: int, empty: str) -> str:
+    return _fit(header, lines, budget, empty)[0]
+
+
+def _serp_lines(results: Dict[str, Any]) -> tuple[List[str], List[str]]:
+    header = []
+    knowledge = results.get("knowledge") or {}
+    if knowledge:
+        title = knowledge.get("name") or knowledge.get("title")
+        description = knowledge.get("description")
+        if title or description:
+            header.append(
+                "Knowledge panel: "
+                + " - ".join(_truncate(v, SNIPPET_CHARS) for v in (title, description) if v)
+            )
+
+    lines = []
+    seen = set()
+    for hit in results.get("organic") or []:
+        link = hit.get("link") or hit.get("url")
+        if not link or link in seen:
+            continue
+        seen.add(link)
+        title = _truncate(hit.get("title"), 150)
+        snippet = _truncate(hit.get("description") or hit.get("snippet"), SNIPPET_CHARS)
+        line = f"{len(lines) + 1}. {title} ({link})" if title else f"{len(lines) + 1}. {link}"
+        if snippet:
+            line += f"\n   {snippet}"
+        lines.append(line)
+    return header, lines
+
+
+def fit_serp_results(results: Optional[Dict[str, Any]], budget: int) -> tuple[str, bool]:
+    """compact_serp_results(), and whether every result fit the budget."""
+    if not results:
+        return "No results.", True
+    header, lines = _serp_lines(results)
+    return _fit(header, lines, budget, "No results.")
+
+
+def compact_serp_results(results: Optional[Dict[str, Any]], budget: int) -> str:
+    return fit_serp_results(results, budget)[0]
+
+
+def compact_reddit_posts(reddit_results: Optional[Dict[str, Any]], budget: int) -> str:
+    if not reddit_results:
+        return "No posts."
+
+    lines = []
+    seen = set()
+    for post in reddit_results.get("parsed_posts") or []:
+        url = post.get("url")
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        lines.append(f"- {_truncate(post.get('title'), 200)} ({url})")
+    return _fit_lines([], lines, budget, "No posts.")
+
+
+def _comment_lines(reddit_post_data: Any) -> List[str]:
+    comments = reddit_post_data
+    if isinstance(reddit_post_data, dict):
+        comments = reddit_post_data.get("comments")
+
+    unique = {}
+    for comment in comments or []:
+        content = " ".join(str(comment.get("content") or "").split())
+        if not content or content in ("[deleted]", "[removed]") or content in unique:
+            continue
+        unique[content] = comment
+
+    # Longer comments tend to carry the substance (experiences, advice);
+    # one-word replies are the first to go when the budget is tight.
+    ranked = sorted(
+        unique.items(), key=lambda item: min(len(item[0]), COMMENT_CHARS), reverse=True
+    )
+    lines = []
+    for content, comment in ranked:
+        date = (comment.get("date") or "")[:10] or "undated"
+        lines.append(f"- ({date}) {_truncate(content, COMMENT_CHARS)}")
+    return lines
+
+
+def fit_reddit_comments(reddit_post_data: Any, budget: int) -> tuple[str, bool]:
+    """compact_reddit_comments(), and whether every comment fit the budget."""
+    return _fit([], _comment_lines(reddit_post_data), budget, "No comments.")
+
+
+def compact_reddit_comments(reddit_post_data: Any, budget: int) -> str:
+    return fit_reddit_comments(reddit_post_data, budget)[0]
+
+
+def chunk_lines(lines: List[str], chunk_tokens: int) -> List[str]:
+    """Pack lines, in order, into texts of at most chunk_tokens tokens each.
+
+    A single line longer than chunk_tokens gets a chunk of its own.
+    """
+    chunks = []
+    current: List[str] = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if current and used + cost > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def serp_result_chunks(results: Optional[Dict[str, Any]], chunk_tokens: int) -> List[str]:
+    """The compacted SERP lines (knowledge panel first) split into chunks."""
+    if not results:
+        return []
+    header, lines = _serp_lines(results)
+    return chunk_lines(header + lines, chunk_tokens)
+
+
+def reddit_comment_chunks(reddit_post_data: Any, chunk_tokens: int) -> List[str]:
+    """All deduplicated comment lines, with nothing dropped, split into chunks."""
+    return chunk_lines(_comment_lines(reddit_post_data), chunk_tokens)
+
+
+def report(source: str, raw: Any, compacted: str):
+    after = count_tokens(compacted)
+    key = source.replace(" ", "_")
+    set_attributes(**{f"{key}_tokens": after})
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    # Rendering and tokenizing the whole raw payload can cost more than
+    # compacting it, so it is only counted when the counts are logged.
+    before = count_tokens(str(raw))
+    set_attributes(**{f"{key}_tokens_raw": before})
+    logger.info("Compacted %s: %d -> %d tokens", source, before, after)
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import contextlib
+import weakref
+from typing import Optional
+
+
+def _env_limit(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class ConcurrencyLimit:
+    """Process-wide cap on concurrent async operations.
+
+    asyncio semaphores belong to one event loop, so one is kept per loop; with
+    the sync wrappers each asyncio.run() gets its own. A limit of None means
+    unlimited.
+    """
+
+    def __init__(self, name: str, limit: Optional[int] = None):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def configure(self, limit: Optional[int]):
+        self.limit = limit
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.limit is None:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        semaphore = self._semaphore()
+        if semaphore is not None:
+            await semaphore.acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+
+llm_calls = ConcurrencyLimit("llm_calls", _env_limit("MAX_INFLIGHT_LLM_CALLS"))
+snapshots = ConcurrencyLimit("snapshots", _env_limit("MAX_INFLIGHT_SNAPSHOTS"))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it is in flight await the same task and get the same result (or
+    exception). Keys are forgotten once the task finishes, so this is
+    deduplication of in-flight work, not a cache. The task is cancelled
+    when every caller waiting on it has been.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.coalesced = 0
+        self._inflight = weakref.WeakKeyDictionary()
+        self._waiters: dict[asyncio.Future, int] = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(inflight, key, done))
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shielded so one caller being cancelled does not cancel the others.
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # Forgotten in the same step, so a caller arriving before the
+                # cancellation lands starts fresh instead of joining it.
+                self._forget(inflight, key, task)
+                task.cancel()
+
+    @staticmethod
+    def _forget(inflight: dict, key, task: asyncio.Future):
+        # The key may already belong to a newer task.
+        if inflight.get(key) is task:
+            del inflight[key]
+
+
+fetches = SingleFlight("fetches")
+llm_replies = SingleFlight("llm_replies")
@@ -1,22 +1,113 @@
+import os
+import math
+import asyncio
+import time
+import logging
 from dotenv import load_dotenv
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langchain.chat_models import init_chat_model
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import RunnableLambda
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
-from web_operations import serp_search, reddit_search_api, reddit_post_retrieval
+from limits import llm_replies
+from brightdata_client import run_sync
+from models import get_models
+from tracing import span, set_attributes, start_trace, traced_node
+from cache import get_llm_cache, llm_cache_key
+from checkpoint import get_checkpointer, durable_run
+from compaction import (
+    SOURCE_TOKEN_BUDGETS,
+    compact_reddit_posts,
+    compact_reddit_comments,
+    fit_serp_results,
+    fit_reddit_comments,
+    serp_result_chunks,
+    reddit_comment_chunks,
+    report,
+)
+from serp_merge import merge_serp_results
+from ranking import allocate_comment_budget, select_urls
+from records import CommentBatch
+from web_operations import (
+    aserp_search,
+    areddit_search_api,
+    areddit_post_retrieval,
+    aiter_reddit_post_retrieval,
+    areddit_search_batch,
+    areddit_post_retrieval_batch,
+)
 from prompts import (
     get_reddit_analysis_messages,
     get_google_analysis_messages,
     get_bing_analysis_messages,
     get_reddit_url_analysis_messages,
+    get_reddit_comments_summary_messages,
+    get_search_results_summary_messages,
     get_synthesis_messages
 )
 
 load_dotenv()
 
-llm = init_chat_model("gpt-4o")
+logger = logging.getLogger(__name__)
+
+# Progressive Reddit retrieval: with REDDIT_THREADS_PER_SNAPSHOT set, the
+# selected threads are fetched in parallel snapshots of that many threads
+# and each is condensed by the model as soon as it arrives. After
+# REDDIT_COMMENTS_DEADLINE seconds (unset: no deadline) the analysis goes
+# ahead with the threads that have arrived, once there are at least
+# REDDIT_MIN_THREADS of them. Condensing calls still running when retrieval
+# ends get REDDIT_CONDENSE_GRACE more seconds (default 2) before their
+# batches fall back to compacted comments; batches that arrive after the
+# deadline are not condensed at all.
+REDDIT_THREADS_PER_SNAPSHOT = int(os.getenv("REDDIT_THREADS_PER_SNAPSHOT", "0"))
+REDDIT_COMMENTS_DEADLINE = (
+    float(os.getenv("REDDIT_COMMENTS_DEADLINE")) if os.getenv("REDDIT_COMMENTS_DEADLINE") else None
+)
+REDDIT_MIN_THREADS = int(os.getenv("REDDIT_MIN_THREADS", "1"))
+REDDIT_CONDENSE_GRACE = float(os.getenv("REDDIT_CONDENSE_GRACE", "2"))
+
+# Reddit thread selection: "hybrid" ranks post titles locally (BM25 plus
+# comment counts) and only asks the model when the ranking is ambiguous:
+# fewer than REDDIT_TOP_K posts match the question at all, or the last pick
+# and the first left out score too close to tell apart (see select_urls());
+# "local" never asks the model, "llm" always does.
+REDDIT_URL_SELECTION = os.getenv("REDDIT_URL_SELECTION", "hybrid")
+REDDIT_TOP_K = int(os.getenv("REDDIT_TOP_K", "5"))
+
+# Reddit fetch sizing. Discovery asks for the first of the comma-separated
+# REDDIT_DISCOVERY_POSTS sizes and only repeats the search at the next size
+# while fewer than REDDIT_TOP_K post titles match the question (default
+# "75": one search of 75 posts). With REDDIT_COMMENT_BUDGET set, the
+# selected threads share that many comments between them instead of each
+# being fetched whole; see allocate_comment_budget().
+REDDIT_DISCOVERY_POSTS = [int(size) for size in os.getenv("REDDIT_DISCOVERY_POSTS", "75").split(",") if size.strip()]
+REDDIT_COMMENT_BUDGET = int(os.getenv("REDDIT_COMMENT_BUDGET", "0"))
+
+# Map-reduce for oversized inputs: with MAP_REDUCE_CHUNK_TOKENS set, search
+# results or comments that don't fit their SOURCE_TOKEN_BUDGETS entry are
+# split into chunks of that many tokens and condensed concurrently (at most
+# MAP_REDUCE_PARALLELISM calls at a time); the analysis prompt then gets the
+# notes instead of a truncated input.
+MAP_REDUCE_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", "0"))
+MAP_REDUCE_PARALLELISM = int(os.getenv("MAP_REDUCE_PARALLELISM", "4"))
+
+# Latency SLO defaults for aiter_answers(); each request can override them
+# with an AnswerPolicy. SYNTHESIS_DEADLINE (seconds from the start of the
+# run, unset: no deadline) is how long to wait for each source before
+# answering without it, provided SYNTHESIS_MIN_ANALYSES analyses are ready;
+# with SYNTHESIS_REFINE the full answer follows once the late sources finish.
+SYNTHESIS_DEADLINE = (
+    float(os.getenv("SYNTHESIS_DEADLINE")) if os.getenv("SYNTHESIS_DEADLINE") else None
+)
+SYNTHESIS_MIN_ANALYSES = int(os.getenv("SYNTHESIS_MIN_ANALYSES", "1"))
+SYNTHESIS_REFINE = os.getenv("SYNTHESIS_REFINE", "1") != "0"
+
+ANALYSIS_SOURCES = {"google": "google_analysis", "bing": "bing_analysis", "reddit": "reddit_analysis"}
+MISSING_ANALYSIS = "Not available: this source had not finished when the answer was due."
+NO_BING_RESULTS = "Bing returned no results for this question."
+NO_BING_ONLY_RESULTS = "No Bing results beyond those already covered by Google."
 
 
 class State(TypedDict):
@@ -27,130 +118,448 @@ class State(TypedDict):
     reddit_results: str | None
     selected_reddit_urls: list[str] | None
     reddit_post_data: list | None
+    reddit_comment_notes: list[str] | None
     google_analysis: str | None
     bing_analysis: str | None
     reddit_analysis: str | None
     final_answer: str | None
+    missing_sources: list[str] | None
+    bypass_llm_cache: bool | None
 
 
 class RedditURLAnalysis(BaseModel):
     selected_urls: List[str] = Field(description="List of Reddit URLs that contain valuable information for answering the user's question")
 
 
-def google_search(state: State):
+class AnswerPolicy(BaseModel):
+    """Answer quality vs. latency for one request (see aiter_answers)."""
+
+    deadline: Optional[float] = Field(
+        default=SYNTHESIS_DEADLINE,
+        description="Seconds after the start to wait for a source before answering without it; None waits for all",
+    )
+    source_deadlines: Dict[str, float] = Field(
+        default_factory=dict, description="Per-source overrides of deadline, keyed google, bing or reddit"
+    )
+    min_analyses: int = Field(
+        default=SYNTHESIS_MIN_ANALYSES, description="Analyses that must be ready for an early answer"
+    )
+    refine: bool = Field(
+        default=SYNTHESIS_REFINE, description="Also emit the full answer once the late sources finish"
+    )
+
+    def deadline_for(self, source: str) -> float:
+        deadline = self.source_deadlines.get(source, self.deadline)
+        return math.inf if deadline is None else deadline
+
+
+async def _acall_llm(role: str, messages, write=None) -> str:
+    models = get_models()
+    started = time.perf_counter()
+    reply, _ = await models.ainvoke(role, messages, write)
+    usage = getattr(reply, "usage_metadata", None) or {}
+    get_llm_cache().set(
+        models.route_key(role),
+        messages,
+        reply.content,
+        latency=time.perf_counter() - started,
+        tokens=usage.get("total_tokens", 0),
+    )
+    return reply.content
+
+
+async def _acached_llm_reply(state: State, messages, role: str = "analysis", stream: bool = False) -> str:
+    """Call the role's chat model through the response cache.
+
+    Identical in-flight calls share one model request. With stream=True each
+    chunk is also emitted on the graph's "custom" stream as
+    {"answer_token": ...}; a cache hit or a coalesced reply is emitted as a
+    single chunk.
+    """
+    write = get_stream_writer() if stream else None
+    route_key = get_models().route_key(role)
+    if not state.get("bypass_llm_cache"):
+        cached = get_llm_cache().get(route_key, messages)
+        if cached is not None:
+            set_attributes(llm_cache="hit")
+            if write:
+                write({"answer_token": cached})
+            return cached
+
+    led = []
+
+    async def call():
+        led.append(True)
+        return await _acall_llm(role, messages, write)
+
+    content = await llm_replies.do(llm_cache_key(route_key, messages), call)
+    set_attributes(llm_cache="miss" if led else "coalesced")
+    if write and not led:
+        write({"answer_token": content})
+    return content
+
+
+async def _amap_chunks(state: State, chunks, make_messages) -> str:
+    """Condense each chunk with the model, concurrently, and join the notes in order."""
+    slots = asyncio.Semaphore(MAP_REDUCE_PARALLELISM)
+
+    async def condense(chunk):
+        async with slots:
+            return await _acached_llm_reply(state, make_messages(chunk), role="condense")
+
+    with span("map_reduce.map", chunks=len(chunks), parallelism=MAP_REDUCE_PARALLELISM):
+        notes = await asyncio.gather(*(condense(chunk) for chunk in chunks))
+    return "\n\n".join(notes)
+
+
+async def _aserp_input(state: State, results, source: str) -> str:
+    """Compacted search results, or map-reduce notes when they overflow the budget."""
+    compacted, complete = fit_serp_results(results, SOURCE_TOKEN_BUDGETS[source])
+    if complete or not MAP_REDUCE_CHUNK_TOKENS:
+        return compacted
     user_question = state.get("user_question", "")
-    print(f"Searching Google for: {user_question}")
+    return await _amap_chunks(
+        state,
+        serp_result_chunks(results, MAP_REDUCE_CHUNK_TOKENS),
+        lambda chunk: get_search_results_summary_messages(user_question, chunk),
+    )
 
-    google_results = serp_search(user_question, engine="google")
+
+async def _areddit_comments_input(state: State, reddit_post_data) -> str:
+    """Compacted comments, or map-reduce notes when they overflow the budget."""
+    compacted, complete = fit_reddit_comments(reddit_post_data, SOURCE_TOKEN_BUDGETS["reddit_comments"])
+    if complete or not MAP_REDUCE_CHUNK_TOKENS:
+        return compacted
+    user_question = state.get("user_question", "")
+    return await _amap_chunks(
+        state,
+        reddit_comment_chunks(reddit_post_data, MAP_REDUCE_CHUNK_TOKENS),
+        lambda chunk: get_reddit_comments_summary_messages(user_question, chunk),
+    )
+
+
+@traced_node("google_search")
+async def agoogle_search(state: State):
+    user_question = state.get("user_question", "")
+    logger.info("Searching Google for: %s", user_question)
+
+    google_results = await aserp_search(user_question, engine="google")
+    set_attributes(items=len((google_results or {}).get("organic") or []))
 
     return {"google_results": google_results}
 
 
-def bing_search(state: State):
+def google_search(state: State):
+    return run_sync(agoogle_search(state))
+
+
+@traced_node("bing_search")
+async def abing_search(state: State):
     user_question = state.get("user_question", "")
-    print(f"Searching Bing for: {user_question}")
+    logger.info("Searching Bing for: %s", user_question)
 
-    bing_results = serp_search(user_question, engine="bing")
+    bing_results = await aserp_search(user_question, engine="bing")
+    set_attributes(items=len((bing_results or {}).get("organic") or []))
 
     return {"bing_results": bing_results}
 
 
-def reddit_search(state: State):
+def bing_search(state: State):
+    return run_sync(abing_search(state))
+
+
+@traced_node("reddit_search")
+async def areddit_search(state: State):
+    if state.get("reddit_results") is not None:
+        # Already searched as part of a batch (aresearch_batch).
+        return {}
+
     user_question = state.get("user_question", "")
-    print(f"Searching Reddit for: {user_question}")
+    logger.info("Searching Reddit for: %s", user_question)
+
+    async def search(questions, num_of_posts):
+        return [await areddit_search_api(keyword=questions[0], num_of_posts=num_of_posts)]
 
-    reddit_results = reddit_search_api(keyword=user_question)
-    print(reddit_results)
+    [reddit_results] = await _adiscover_reddit_posts([user_question], search)
+    set_attributes(items=(reddit_results or {}).get("total_found", 0))
+    logger.debug("Reddit results: %s", reddit_results)
 
     return {"reddit_results": reddit_results}
 
 
-def analyze_reddit_posts(state: State):
+def reddit_search(state: State):
+    return run_sync(areddit_search(state))
+
+
+def _too_few_relevant_posts(user_question: str, reddit_results) -> bool:
+    if not reddit_results:
+        return False
+    selected, _ = select_urls(user_question, reddit_results.get("parsed_posts") or [], REDDIT_TOP_K)
+    return len(selected) < REDDIT_TOP_K
+
+
+async def _adiscover_reddit_posts(user_questions: list[str], search) -> list:
+    """Reddit search results per question, searching no wider than needed.
+
+    search(questions, num_of_posts) returns results per question. Each
+    REDDIT_DISCOVERY_POSTS size after the first is only tried for the
+    questions whose results so far have too few relevant posts; a failed
+    wider search keeps the narrower results.
+    """
+    sizes = REDDIT_DISCOVERY_POSTS or [75]
+    results = await search(user_questions, sizes[0])
+    set_attributes(num_of_posts=sizes[0])
+    for num_of_posts in sizes[1:]:
+        short = [
+            i for i, (user_question, reddit_results) in enumerate(zip(user_questions, results))
+            if _too_few_relevant_posts(user_question, reddit_results)
+        ]
+        if not short:
+            break
+        logger.info("Too few relevant Reddit posts for %d question(s); searching %d posts", len(short), num_of_posts)
+        wider = await search([user_questions[i] for i in short], num_of_posts)
+        for i, reddit_results in zip(short, wider):
+            if reddit_results is not None:
+                results[i] = reddit_results
+        set_attributes(num_of_posts=num_of_posts, expanded=len(short))
+    return results
+
+
+def _comment_limits(state: State, selected_urls) -> dict[str, int] | str:
+    """Per-thread comment_limit for selected_urls under REDDIT_COMMENT_BUDGET ("" if unset)."""
+    if REDDIT_COMMENT_BUDGET <= 0:
+        return ""
+    posts = (state.get("reddit_results") or {}).get("parsed_posts") or []
+    return allocate_comment_budget(posts, selected_urls, REDDIT_COMMENT_BUDGET)
+
+
+@traced_node("analyze_reddit_posts")
+async def aanalyze_reddit_posts(state: State):
+    if state.get("selected_reddit_urls") is not None:
+        return {}
+
     user_question = state.get("user_question", "")
     reddit_results = state.get("reddit_results", "")
 
     if not reddit_results:
         return {"selected_reddit_urls": []}
 
-    structured_llm = llm.with_structured_output(RedditURLAnalysis)
-    messages = get_reddit_url_analysis_messages(user_question, reddit_results)
+    if REDDIT_URL_SELECTION != "llm":
+        selected_urls, ambiguous = select_urls(
+            user_question, reddit_results.get("parsed_posts") or [], REDDIT_TOP_K
+        )
+        if not ambiguous or REDDIT_URL_SELECTION == "local":
+            set_attributes(selection="local", items=len(selected_urls))
+            logger.info("Selected URLs:\n%s", "\n".join(f"   {i}. {url}" for i, url in enumerate(selected_urls, 1)))
+            return {"selected_reddit_urls": selected_urls}
+        logger.info("Post titles don't settle the selection; asking the model to select threads")
+
+    selected_urls = await _aselect_urls_with_llm(user_question, reddit_results)
+    set_attributes(selection="llm", items=len(selected_urls))
+
+    return {"selected_reddit_urls": selected_urls}
+
+
+async def _aselect_urls_with_llm(user_question: str, reddit_results) -> list[str]:
+    compact_posts = compact_reddit_posts(reddit_results, SOURCE_TOKEN_BUDGETS["reddit_posts"])
+    report("reddit posts", reddit_results, compact_posts)
+
+    models = get_models()
+    messages = get_reddit_url_analysis_messages(user_question, compact_posts)
+
+    async def select_urls_with_llm():
+        analysis, _ = await models.ainvoke("selection", messages, schema=RedditURLAnalysis)
+        return analysis
 
     try:
-        analysis = structured_llm.invoke(messages)
+        analysis = await llm_replies.do(
+            llm_cache_key(f"{models.route_key('selection')}:RedditURLAnalysis", messages), select_urls_with_llm
+        )
         selected_urls = analysis.selected_urls
 
-        print("Selected URLs:")
-        for i, url in enumerate(selected_urls, 1):
-            print(f"   {i}. {url}")
+        logger.info("Selected URLs:\n%s", "\n".join(f"   {i}. {url}" for i, url in enumerate(selected_urls, 1)))
 
     except Exception as e:
-        print(e)
+        logger.error("Reddit URL selection failed: %s", e)
         selected_urls = []
 
-    return {"selected_reddit_urls": selected_urls}
+    return selected_urls
 
 
-def retrieve_reddit_posts(state: State):
-    print("Getting reddit post comments")
+def analyze_reddit_posts(state: State):
+    return run_sync(aanalyze_reddit_posts(state))
+
+
+@traced_node("retrieve_reddit_posts")
+async def aretrieve_reddit_posts(state: State):
+    if state.get("reddit_post_data") is not None:
+        return {}
+
+    logger.info("Getting reddit post comments")
 
     selected_urls = state.get("selected_reddit_urls", [])
 
     if not selected_urls:
         return {"reddit_post_data": []}
 
-    print(f"Processing {len(selected_urls)} Reddit URLs")
+    logger.info("Processing %d Reddit URLs", len(selected_urls))
 
-    reddit_post_data = reddit_post_retrieval(selected_urls)
+    if REDDIT_THREADS_PER_SNAPSHOT > 0:
+        return await _aretrieve_reddit_posts_progressively(state, selected_urls)
+
+    reddit_post_data = await areddit_post_retrieval(selected_urls, comment_limit=_comment_limits(state, selected_urls))
 
     if reddit_post_data:
-        print(f"Successfully got {len(reddit_post_data)} posts")
+        logger.info("Successfully got %d comments", reddit_post_data.get("total_retrieved", 0))
     else:
-        print("Failed to get post data")
+        logger.warning("Failed to get post data")
         reddit_post_data = []
 
-    print(reddit_post_data)
+    set_attributes(items=len((reddit_post_data or {}).get("comments") or []))
+    logger.debug("Reddit post data: %s", reddit_post_data)
     return {"reddit_post_data": reddit_post_data}
 
 
-def analyze_google_results(state: State):
-    print("Analyzing google search results")
+async def _aretrieve_reddit_posts_progressively(state: State, selected_urls):
+    """Condense each batch of threads while the slower ones are still downloading.
 
+    Batches that arrive after REDDIT_COMMENTS_DEADLINE are not condensed,
+    and condensing calls still running when retrieval ends get
+    REDDIT_CONDENSE_GRACE seconds to finish. Batches without notes by then
+    are passed on as compacted comments instead, so the final analysis waits
+    on a condensing call for at most the grace period.
+    """
     user_question = state.get("user_question", "")
-    google_results = state.get("google_results", "")
 
-    messages = get_google_analysis_messages(user_question, google_results)
-    reply = llm.invoke(messages)
+    async def condense(comments):
+        compact_comments = compact_reddit_comments(comments, SOURCE_TOKEN_BUDGETS["reddit_comments"])
+        messages = get_reddit_comments_summary_messages(user_question, compact_comments)
+        return await _acached_llm_reply(state, messages, role="condense")
+
+    loop = asyncio.get_running_loop()
+    stop_at = None if REDDIT_COMMENTS_DEADLINE is None else loop.time() + REDDIT_COMMENTS_DEADLINE
+    batches = []
+    async for thread_urls, batch in aiter_reddit_post_retrieval(
+        selected_urls,
+        threads_per_snapshot=REDDIT_THREADS_PER_SNAPSHOT,
+        deadline=REDDIT_COMMENTS_DEADLINE,
+        min_threads=REDDIT_MIN_THREADS,
+        comment_limit=_comment_limits(state, selected_urls),
+    ):
+        logger.info("Got %d comments from %d threads", len(batch), len(thread_urls))
+        if not batch:
+            continue
+        # Past the deadline the analysis starts as soon as retrieval ends, so
+        # a condensing call started now would be paid for and then dropped.
+        late_batch = stop_at is not None and loop.time() >= stop_at
+        batches.append((batch, None if late_batch else asyncio.create_task(condense(batch))))
+
+    in_flight = [task for _, task in batches if task is not None and not task.done()]
+    if in_flight and REDDIT_CONDENSE_GRACE > 0:
+        await asyncio.wait(in_flight, timeout=REDDIT_CONDENSE_GRACE)
+
+    notes = []
+    late = []
+    for batch, task in batches:
+        if task is not None and task.done() and not task.exception():
+            notes.append(task.result())
+            continue
+        if task is not None and task.done():
+            logger.error("Condensing Reddit comments failed: %s", task.exception())
+        elif task is not None:
+            logger.info("Condensing %d Reddit comments overran the grace period; using them compacted", len(batch))
+            task.cancel()
+        late.append(batch)
+    if late:
+        notes.append(compact_reddit_comments(CommentBatch.concat(late), SOURCE_TOKEN_BUDGETS["reddit_comments"]))
+
+    comments = CommentBatch.concat(batch for batch, _ in batches)
+    set_attributes(items=len(comments), batches=len(batches), condensed_batches=len(notes) - bool(late))
+    reddit_post_data = {"comments": comments, "total_retrieved": len(comments)} if comments else []
+    return {"reddit_post_data": reddit_post_data, "reddit_comment_notes": notes}
 
-    return {"google_analysis": reply.content}
 
+def retrieve_reddit_posts(state: State):
+    return run_sync(aretrieve_reddit_posts(state))
 
-def analyze_bing_results(state: State):
-    print("Analyzing bing search results")
+
+@traced_node("analyze_google_results")
+async def aanalyze_google_results(state: State):
+    logger.info("Analyzing google search results")
 
     user_question = state.get("user_question", "")
-    bing_results = state.get("bing_results", "")
+    google_results, _ = merge_serp_results(state.get("google_results"), state.get("bing_results"))
 
-    messages = get_bing_analysis_messages(user_question, bing_results)
-    reply = llm.invoke(messages)
+    compact_results = await _aserp_input(state, google_results, "google")
+    report("google results", state.get("google_results"), compact_results)
 
-    return {"bing_analysis": reply.content}
+    messages = get_google_analysis_messages(user_question, compact_results)
+    google_analysis = await _acached_llm_reply(state, messages)
 
+    return {"google_analysis": google_analysis}
+
+
+def analyze_google_results(state: State):
+    return run_sync(aanalyze_google_results(state))
 
-def analyze_reddit_results(state: State):
-    print("Analyzing reddit search results")
+
+@traced_node("analyze_bing_results")
+async def aanalyze_bing_results(state: State):
+    logger.info("Analyzing bing search results")
+
+    user_question = state.get("user_question", "")
+    if state.get("bing_results") is not None and not state["bing_results"].get("organic"):
+        logger.info("No Bing results; skipping the Bing analysis")
+        return {"bing_analysis": NO_BING_RESULTS}
+    _, bing_results = merge_serp_results(state.get("google_results"), state.get("bing_results"))
+    if bing_results is not None and not bing_results.get("organic"):
+        logger.info("No Bing-only results; skipping the Bing analysis")
+        return {"bing_analysis": NO_BING_ONLY_RESULTS}
+
+    compact_results = await _aserp_input(state, bing_results, "bing")
+    report("bing results", state.get("bing_results"), compact_results)
+
+    messages = get_bing_analysis_messages(user_question, compact_results)
+    bing_analysis = await _acached_llm_reply(state, messages)
+
+    return {"bing_analysis": bing_analysis}
+
+
+def analyze_bing_results(state: State):
+    return run_sync(aanalyze_bing_results(state))
+
+
+@traced_node("analyze_reddit_results")
+async def aanalyze_reddit_results(state: State):
+    logger.info("Analyzing reddit search results")
 
     user_question = state.get("user_question", "")
     reddit_results = state.get("reddit_results", "")
     reddit_post_data = state.get("reddit_post_data", "")
+    reddit_comment_notes = state.get("reddit_comment_notes")
 
-    messages = get_reddit_analysis_messages(user_question, reddit_results, reddit_post_data)
-    reply = llm.invoke(messages)
+    compact_posts = compact_reddit_posts(reddit_results, SOURCE_TOKEN_BUDGETS["reddit_posts"])
+    if reddit_comment_notes:
+        # Progressive retrieval already condensed the comments batch by batch.
+        compact_comments = "\n\n".join(reddit_comment_notes)
+    else:
+        compact_comments = await _areddit_comments_input(state, reddit_post_data)
+    report("reddit posts", reddit_results, compact_posts)
+    report("reddit comments", reddit_post_data, compact_comments)
 
-    return {"reddit_analysis": reply.content}
+    messages = get_reddit_analysis_messages(user_question, compact_posts, compact_comments)
+    reddit_analysis = await _acached_llm_reply(state, messages)
 
+    return {"reddit_analysis": reddit_analysis}
+
+
+def analyze_reddit_results(state: State):
+    return run_sync(aanalyze_reddit_results(state))
 
-def synthesize_analyses(state: State):
-    print("Combine all results together")
+
+@traced_node("synthesize_analyses")
+async def asynthesize_analyses(state: State):
+    logger.info("Combining all results together")
 
     user_question = state.get("user_question", "")
     google_analysis = state.get("google_analysis", "")
@@ -161,78 +570,389 @@ def synthesize_analyses(state: State):
         user_question, google_analysis, bing_analysis, reddit_analysis
     )
 
-    reply = llm.invoke(messages)
-    final_answer = reply.content
+    final_answer = await _acached_llm_reply(state, messages, role="synthesis", stream=True)
 
     return {"final_answer": final_answer, "messages": [{"role": "assistant", "content": final_answer}]}
 
 
+def synthesize_analyses(state: State):
+    return run_sync(asynthesize_analyses(state))
+
+
+class WebOutput(TypedDict):
+    google_results: str | None
+    bing_results: str | None
+    google_analysis: str | None
+    bing_analysis: str | None
+
+
+class RedditOutput(TypedDict):
+    reddit_results: str | None
+    selected_reddit_urls: list[str] | None
+    reddit_post_data: list | None
+    reddit_comment_notes: list[str] | None
+    reddit_analysis: str | None
+
+
+def _chain(output_schema, *nodes):
+    """Compile nodes into one sequential subgraph.
+
+    Each source pipeline runs as a single node of the research graph, so its
+    steps aren't held to the other pipelines' supersteps and
+    synthesize_analyses is the only point where they wait for each other.
+    """
+    builder = StateGraph(State, output_schema=output_schema)
+    previous = START
+    for name, func, afunc in nodes:
+        builder.add_node(name, RunnableLambda(func, afunc=afunc))
+        builder.add_edge(previous, name)
+        previous = name
+    builder.add_edge(previous, END)
+    return builder.compile()
+
+
+def _web_chain():
+    """Google and Bing as one subgraph: both searches, then both analyses.
+
+    The analyses share the searches' results through state (merged by
+    serp_merge.merge_serp_results), so neither engine is queried twice.
+    Google's analysis waits for Bing's search, a single SERP request issued
+    alongside its own, but not for Bing's analysis.
+    """
+    builder = StateGraph(State, output_schema=WebOutput)
+    for name, func, afunc in (
+        ("google_search", google_search, agoogle_search),
+        ("bing_search", bing_search, abing_search),
+        ("analyze_google_results", analyze_google_results, aanalyze_google_results),
+        ("analyze_bing_results", analyze_bing_results, aanalyze_bing_results),
+    ):
+        builder.add_node(name, RunnableLambda(func, afunc=afunc))
+    builder.add_edge(START, "google_search")
+    builder.add_edge(START, "bing_search")
+    builder.add_edge("google_search", "analyze_google_results")
+    builder.add_edge(["google_search", "bing_search"], "analyze_bing_results")
+    builder.add_edge("analyze_google_results", END)
+    builder.add_edge("analyze_bing_results", END)
+    return builder.compile()
+
+
+web_chain = _web_chain()
+reddit_chain = _chain(
+    RedditOutput,
+    ("reddit_search", reddit_search, areddit_search),
+    ("analyze_reddit_posts", analyze_reddit_posts, aanalyze_reddit_posts),
+    ("retrieve_reddit_posts", retrieve_reddit_posts, aretrieve_reddit_posts),
+    ("analyze_reddit_results", analyze_reddit_results, aanalyze_reddit_results),
+)
+
 graph_builder = StateGraph(State)
 
-graph_builder.add_node("google_search", google_search)
-graph_builder.add_node("bing_search", bing_search)
-graph_builder.add_node("reddit_search", reddit_search)
-graph_builder.add_node("analyze_reddit_posts", analyze_reddit_posts)
-graph_builder.add_node("retrieve_reddit_posts", retrieve_reddit_posts)
-graph_builder.add_node("analyze_google_results", analyze_google_results)
-graph_builder.add_node("analyze_bing_results", analyze_bing_results)
-graph_builder.add_node("analyze_reddit_results", analyze_reddit_results)
-graph_builder.add_node("synthesize_analyses", synthesize_analyses)
-
-graph_builder.add_edge(START, "google_search")
-graph_builder.add_edge(START, "bing_search")
-graph_builder.add_edge(START, "reddit_search")
-
-graph_builder.add_edge("google_search", "analyze_reddit_posts")
-graph_builder.add_edge("bing_search", "analyze_reddit_posts")
-graph_builder.add_edge("reddit_search", "analyze_reddit_posts")
-graph_builder.add_edge("analyze_reddit_posts", "retrieve_reddit_posts")
-
-graph_builder.add_edge("retrieve_reddit_posts", "analyze_google_results")
-graph_builder.add_edge("retrieve_reddit_posts", "analyze_bing_results")
-graph_builder.add_edge("retrieve_reddit_posts", "analyze_reddit_results")
-
-graph_builder.add_edge("analyze_google_results", "synthesize_analyses")
-graph_builder.add_edge("analyze_bing_results", "synthesize_analyses")
-graph_builder.add_edge("analyze_reddit_results", "synthesize_analyses")
+graph_builder.add_node("web", web_chain)
+graph_builder.add_node("reddit", reddit_chain)
+graph_builder.add_node("synthesize_analyses", RunnableLambda(synthesize_analyses, afunc=asynthesize_analyses))
+
+graph_builder.add_edge(START, "web")
+graph_builder.add_edge(START, "reddit")
+
+graph_builder.add_edge(["web", "reddit"], "synthesize_analyses")
 
 graph_builder.add_edge("synthesize_analyses", END)
 
 graph = graph_builder.compile()
 
+_SUBGRAPH_ENDS = (":__start__", ":__end__")
+_edges = {}
+for edge in graph.get_graph(xray=True).edges:
+    _edges.setdefault(edge.target, []).append(edge.source)
+
+
+def _upstream(node: str):
+    # Subgraph nodes are drawn as "web:google_search" (spans use the bare
+    # names), and a subgraph's entry and exit as "web:__start__" and
+    # "web:__end__"; look through those to the nodes they join.
+    for source in _edges.get(node, ()):
+        if source.endswith(_SUBGRAPH_ENDS):
+            yield from _upstream(source)
+        else:
+            yield source.split(":")[-1]
+
+
+NODE_DEPENDENCIES = {
+    target.split(":")[-1]: sorted(set(_upstream(target)))
+    for target in _edges
+    if not target.endswith(_SUBGRAPH_ENDS)
+}
+
+
+def trace_question(user_question: str):
+    return start_trace(user_question, NODE_DEPENDENCIES)
+
+
+def build_initial_state(user_question: str) -> State:
+    return {
+        "messages": [{"role": "user", "content": user_question}],
+        "user_question": user_question,
+        "google_results": None,
+        "bing_results": None,
+        "reddit_results": None,
+        "selected_reddit_urls": None,
+        "reddit_post_data": None,
+        "reddit_comment_notes": None,
+        "google_analysis": None,
+        "bing_analysis": None,
+        "reddit_analysis": None,
+        "final_answer": None,
+        "missing_sources": None,
+        "bypass_llm_cache": False,
+    }
+
+
+_durable_graph = None
+
+
+def durable_graph():
+    """The research graph, checkpointed to checkpoint.get_checkpointer()."""
+    global _durable_graph
+    saver = get_checkpointer()
+    if _durable_graph is None or _durable_graph.checkpointer is not saver:
+        _durable_graph = graph_builder.compile(checkpointer=saver)
+    return _durable_graph
+
+
+async def aresearch(user_question: str, thread_id: str | None = None) -> State:
+    """Answer a question.
+
+    With a thread_id the run is checkpointed after every step, and calling
+    again with the same thread_id (e.g. after a crash) continues it: finished
+    nodes are not run again, and a Reddit snapshot that was still being
+    polled is polled again rather than re-triggered. A finished run just
+    returns its final state.
+    """
+    if thread_id is None:
+        with trace_question(user_question):
+            return await graph.ainvoke(build_initial_state(user_question))
+
+    durable = durable_graph()
+    config = {"configurable": {"thread_id": thread_id}}
+    saved = await durable.aget_state(config)
+    if saved.values and not saved.next:
+        durable.checkpointer.mark_finished(thread_id)
+        return saved.values
+
+    with trace_question(user_question), durable_run(durable.checkpointer, thread_id):
+        if saved.values:
+            logger.info("Resuming research run %s at %s", thread_id, ", ".join(saved.next))
+            state = await durable.ainvoke(None, config)
+        else:
+            state = await durable.ainvoke(build_initial_state(user_question), config)
+    durable.checkpointer.mark_finished(thread_id)
+    return state
+
+
+async def aresume_research() -> dict[str, State]:
+    """Finish every checkpointed run that stopped part-way, by thread_id."""
+    durable = durable_graph()
+    unfinished = {}
+    for thread_id in durable.checkpointer.thread_ids(finished=False):
+        saved = await durable.aget_state({"configurable": {"thread_id": thread_id}})
+        if saved.next:
+            unfinished[thread_id] = saved.values.get("user_question") or ""
+        else:
+            # Finished before runs were marked, or stopped just after the last step.
+            durable.checkpointer.mark_finished(thread_id)
+    results = await asyncio.gather(
+        *(aresearch(user_question, thread_id) for thread_id, user_question in unfinished.items())
+    )
+    return dict(zip(unfinished, results))
+
+
+async def aresearch_batch(user_questions: list[str]) -> list[State]:
+    """Research several questions, sharing their Reddit snapshots.
+
+    All Reddit keyword searches go into one discovery snapshot and all
+    selected threads (deduplicated across questions) into one comments
+    snapshot; each question's graph then starts with its share of the
+    results in State and skips those steps. A question whose part of a
+    batch failed fetches on its own, as in aresearch().
+    """
+    states = [build_initial_state(user_question) for user_question in user_questions]
+
+    reddit_results = await _adiscover_reddit_posts(
+        user_questions, lambda questions, num_of_posts: areddit_search_batch(questions, num_of_posts=num_of_posts)
+    )
+    for state, results in zip(states, reddit_results):
+        state["reddit_results"] = results
+
+    selections = await asyncio.gather(
+        *(aanalyze_reddit_posts(state) for state in states if state["reddit_results"] is not None)
+    )
+    searched = [state for state in states if state["reddit_results"] is not None]
+    for state, selection in zip(searched, selections):
+        state.update(selection)
+
+    # A thread selected by several questions is fetched once, with the
+    # largest limit any of them gives it.
+    comment_limit = ""
+    for state in searched:
+        limits = _comment_limits(state, state["selected_reddit_urls"])
+        if limits:
+            comment_limit = comment_limit or {}
+            for url, limit in limits.items():
+                comment_limit[url] = max(limit, comment_limit.get(url, 0))
+    post_data = await areddit_post_retrieval_batch(
+        [state["selected_reddit_urls"] for state in searched], comment_limit=comment_limit
+    )
+    for state, data in zip(searched, post_data):
+        if data is not None:
+            state["reddit_post_data"] = data
+        elif not state["selected_reddit_urls"]:
+            state["reddit_post_data"] = []
+
+    async def finish(state: State) -> State:
+        with trace_question(state["user_question"]):
+            return await graph.ainvoke(state)
+
+    return await asyncio.gather(*(finish(state) for state in states))
+
+
+def research_batch(user_questions: list[str]) -> list[State]:
+    return run_sync(aresearch_batch(user_questions))
+
+
+async def aiter_answers(
+    user_question: str, policy: AnswerPolicy | None = None, on_event=None
+) -> AsyncIterator[State]:
+    """Yield the answer as soon as the policy allows, then the full one.
+
+    Once every source is either analyzed or past its deadline (and at least
+    policy.min_analyses are in), the answer is synthesized from what is
+    ready and yielded with missing_sources listing the rest. With
+    policy.refine the graph keeps running and its full answer is yielded
+    next; otherwise the run is cancelled. If everything is ready in time
+    only the full answer is yielded. on_event, if given, is awaited with
+    every (mode, chunk) of the graph's "updates" and "custom" streams.
+    """
+    policy = policy or AnswerPolicy()
+    answers: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_aproduce_answers(user_question, policy, on_event, answers))
+    try:
+        while True:
+            state = await answers.get()
+            if state is None:
+                break
+            yield state
+        await producer
+    finally:
+        producer.cancel()
+
+
+async def _aproduce_answers(user_question: str, policy: AnswerPolicy, on_event, answers: asyncio.Queue):
+    # Runs as its own task so the trace spans the whole run, not just the
+    # time between the consumer's iterations.
+    latest = build_initial_state(user_question)
+    changed = asyncio.Event()
+
+    async def run():
+        # With the subgraphs' own updates, an analysis counts as ready when it
+        # finishes, not when the rest of its pipeline does (Bing's, say,
+        # before Google's).
+        async for namespace, mode, chunk in graph.astream(
+            dict(latest), stream_mode=["updates", "custom"], subgraphs=True
+        ):
+            if on_event and not namespace:
+                await on_event(mode, chunk)
+            if mode == "updates":
+                for update in chunk.values():
+                    latest.update(update or {})
+                changed.set()
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with trace_question(user_question):
+        full = asyncio.create_task(run())
+        try:
+            while not full.done():
+                elapsed = loop.time() - started
+                ready = [source for source, key in ANALYSIS_SOURCES.items() if latest.get(key)]
+                waiting = [
+                    policy.deadline_for(source) - elapsed
+                    for source in ANALYSIS_SOURCES
+                    if source not in ready and policy.deadline_for(source) > elapsed
+                ]
+                if len(ready) == len(ANALYSIS_SOURCES) or (not waiting and len(ready) >= policy.min_analyses):
+                    break
+                next_deadline = min(waiting, default=math.inf)
+                changed.clear()
+                update = asyncio.create_task(changed.wait())
+                await asyncio.wait(
+                    {full, update},
+                    timeout=None if math.isinf(next_deadline) else next_deadline,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                update.cancel()
+
+            missing = [source for source, key in ANALYSIS_SOURCES.items() if not latest.get(key)]
+            if missing and not full.done():
+                logger.info("Answer deadline reached; answering without %s", ", ".join(missing))
+                with span("synthesize_early", kind="node", missing_sources=missing):
+                    messages = get_synthesis_messages(
+                        user_question,
+                        *(latest.get(key) or MISSING_ANALYSIS for key in ANALYSIS_SOURCES.values()),
+                    )
+                    early_answer = await _acached_llm_reply(latest, messages, role="synthesis")
+                await answers.put({**latest, "final_answer": early_answer, "missing_sources": missing})
+                if not policy.refine:
+                    return
+
+            await full
+            await answers.put(dict(latest))
+        finally:
+            full.cancel()
+            await answers.put(None)
+
+
+async def astream_research(state: State) -> str:
+    """Run the graph, printing per-node progress and answer tokens as they arrive."""
+    answer = []
+    with trace_question(state.get("user_question") or ""):
+        async for mode, chunk in graph.astream(state, stream_mode=["updates", "custom"]):
+            if mode == "custom" and "answer_token" in chunk:
+                if not answer:
+                    print("\nFinal Answer:")
+                print(chunk["answer_token"], end="", flush=True)
+                answer.append(chunk["answer_token"])
+            elif mode == "updates":
+                for node in chunk:
+                    print(f"[done] {node}")
+    if answer:
+        print("\n")
+    return "".join(answer)
+
 
 def run_chatbot():
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     print("Multi-Source Research Agent")
     print("Type 'exit' to quit\n")
 
-    while True:
-        user_input = input("Ask me anything: ")
-        if user_input.lower() == "exit":
-            print("Bye")
-            break
+    # One event loop for the whole session keeps the Bright Data connection
+    # pool alive between questions.
+    with asyncio.Runner() as runner:
+        while True:
+            user_input = input("Ask me anything: ")
+            if user_input.lower() == "exit":
+                print("Bye")
+                break
+
+            state = build_initial_state(user_input)
+
+            print("\nStarting parallel research process...")
+            print("Launching Google, Bing, and Reddit searches...\n")
+            runner.run(astream_research(state))
 
-        state = {
-            "messages": [{"role": "user", "content": user_input}],
-            "user_question": user_input,
-            "google_results": None,
-            "bing_results": None,
-            "reddit_results": None,
-            "selected_reddit_urls": None,
-            "reddit_post_data": None,
-            "google_analysis": None,
-            "bing_analysis": None,
-            "reddit_analysis": None,
-            "final_answer": None,
-        }
-
-        print("\nStarting parallel research process...")
-        print("Launching Google, Bing, and Reddit searches...\n")
-        final_state = graph.invoke(state)
-
-        if final_state.get("final_answer"):
-            print(f"\nFinal Answer:\n{final_state.get('final_answer')}\n")
-
-        print("-" * 80)
+            print("-" * 80)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from langchain.chat_models import init_chat_model
+from limits import ConcurrencyLimit, llm_calls
+from tracing import span, set_attributes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("MODEL_NAME", "gpt-4o")
+
+# Each step of the pipeline asks for a role rather than a model. A route is
+# the role's model followed by its fallbacks, tried in order when a call
+# fails; MODEL_<ROLE> overrides it as a comma-separated list.
+#   selection  picking Reddit threads (when the local ranker defers)
+#   condense   map-reduce and progressive-retrieval notes
+#   analysis   the per-source Google/Bing/Reddit analyses
+#   synthesis  the final answer
+DEFAULT_ROUTES = {
+    "selection": ["gpt-4o-mini", DEFAULT_MODEL],
+    "condense": ["gpt-4o-mini", DEFAULT_MODEL],
+    "analysis": ["gpt-4o-mini", DEFAULT_MODEL],
+    "synthesis": [DEFAULT_MODEL],
+}
+
+# USD per million input and output tokens, for the cost figures in stats()
+# and on llm.call spans. Models missing here are reported at zero cost.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _env_routes() -> Dict[str, List[str]]:
+    routes = {}
+    for role, default in DEFAULT_ROUTES.items():
+        value = os.getenv(f"MODEL_{role.upper()}")
+        routes[role] = _split(value) if value else list(dict.fromkeys(default))
+    return routes
+
+
+def _env_model_limits() -> Dict[str, int]:
+    # MODEL_MAX_INFLIGHT="gpt-4o=4,gpt-4o-mini=16"
+    limits = {}
+    for item in _split(os.getenv("MODEL_MAX_INFLIGHT", "")):
+        name, _, limit = item.partition("=")
+        limits[name.strip()] = int(limit)
+    return limits
+
+
+class ModelRegistry:
+    """Chat models by role, created on first use, with fallbacks and per-model limits.
+
+    Every call also takes a slot from the process-wide llm_calls limit. A
+    model that fails is skipped for the next one on the route, unless it
+    had already streamed part of its answer.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, List[str]]] = None,
+        model_limits: Optional[Dict[str, int]] = None,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.routes = {role: list(models) for role, models in (routes or _env_routes()).items()}
+        self.model_limits = dict(model_limits if model_limits is not None else _env_model_limits())
+        self.prices = dict(prices if prices is not None else MODEL_PRICES)
+        self._models: Dict[str, Any] = {}
+        self._limits: Dict[str, ConcurrencyLimit] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def route(self, role: str) -> List[str]:
+        return self.routes.get(role) or [DEFAULT_MODEL]
+
+    def route_key(self, role: str) -> str:
+        """Identifies the route in cache keys: same models, same answers."""
+        return ",".join(self.route(role))
+
+    def chat_model(self, name: str):
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                model = self._models[name] = init_chat_model(name)
+            return model
+
+    def limit(self, name: str) -> ConcurrencyLimit:
+        with self._lock:
+            limit = self._limits.get(name)
+            if limit is None:
+                limit = self._limits[name] = ConcurrencyLimit(f"model:{name}", self.model_limits.get(name))
+            return limit
+
+    def cost(self, name: str, input_tokens: int, output_tokens: int) -> float:
+        input_price, output_price = self.prices.get(name, (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    async def ainvoke(self, role: str, messages, write=None, schema=None) -> Tuple[Any, str]:
+        """Call the role's models in route order until one answers.
+
+        With write, the answer is streamed chunk by chunk as
+        {"answer_token": ...}; with schema, the reply is the structured
+        output. Returns the reply and the name of the model that gave it.
+        """
+        route = self.route(role)
+        for attempt, name in enumerate(route):
+            streamed = False
+            started = time.perf_counter()
+            try:
+                with span("llm.call", kind="client", model=name, role=role, attempt=attempt, streamed=bool(write)):
+                    async with llm_calls.slot(), self.limit(name).slot():
+                        model = self.chat_model(name)
+                        if schema is not None:
+                            # The parsed object carries no usage; the raw
+                            # message it was parsed from does.
+                            structured = await model.with_structured_output(schema, include_raw=True).ainvoke(messages)
+                            if structured["parsing_error"] is not None:
+                                raise structured["parsing_error"]
+                            reply, message = structured["parsed"], structured["raw"]
+                        elif write:
+                            reply = None
+                            async for chunk in model.astream(messages):
+                                if chunk.content:
+                                    streamed = True
+                                    write({"answer_token": chunk.content})
+                                reply = chunk if reply is None else reply + chunk
+                            message = reply
+                        else:
+                            reply = message = await model.ainvoke(messages)
+
+                    usage = getattr(message, "usage_metadata", None) or {}
+                    input_tokens = usage.get("input_tokens", 0)
+                    output_tokens = usage.get("output_tokens", 0)
+                    cost = self.cost(name, input_tokens, output_tokens)
+                    set_attributes(
+                        prompt_tokens=input_tokens,
+                        completion_tokens=output_tokens,
+                        cost_usd=round(cost, 6),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record(name, time.perf_counter() - started, failed=True)
+                if streamed or attempt == len(route) - 1:
+                    raise
+                logger.warning("Model %s failed for %s (%s); falling back to %s", name, role, e, route[attempt + 1])
+                continue
+
+            self._record(
+                name,
+                time.perf_counter() - started,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cost=cost,
+                fallback=attempt > 0,
+            )
+            return reply, name
+
+    def _record(
+        self,
+        name: str,
+        seconds: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cost: float = 0.0,
+        failed: bool = False,
+        fallback: bool = False,
+    ):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "calls": 0,
+                "failures": 0,
+                "fallback_calls": 0,
+                "seconds": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cost_usd": 0.0,
+            })
+            stats["calls"] += 1
+            stats["failures"] += failed
+            stats["fallback_calls"] += fallback
+            stats["seconds"] += seconds
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost_usd"] += cost
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-model call counts, latency, token usage and cost since start."""
+        with self._lock:
+            return {
+                name: dict(
+                    stats,
+                    seconds=round(stats["seconds"], 3),
+                    mean_seconds=round(stats["seconds"] / stats["calls"], 3) if stats["calls"] else 0.0,
+                    cost_usd=round(stats["cost_usd"], 6),
+                )
+                for name, stats in self._stats.items()
+            }
+
+
+_models: Optional[ModelRegistry] = None
+
+
+def get_models() -> ModelRegistry:
+    global _models
+    if _models is None:
+        _models = ModelRegistry()
+    return _models
+
+
+def configure_models(registry: ModelRegistry) -> ModelRegistry:
+    global _models
+    _models = registry
+    return _models
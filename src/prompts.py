@@ -1,13 +1,19 @@
-from typing import Dict, Any
-
-
-class PromptTemplates:
-    """Container for all prompt templates used in the research assistant."""
-
-    @staticmethod
-    def reddit_url_analysis_system() -> str:
-        """System prompt for analyzing Reddit URLs."""
-        return """You are an expert at analyzing social media content. Your task is to examine Reddit search results and identify the most relevant posts that would provide valuable additional information for answering the user's question.
+from typing import Dict, Any, List, Mapping
+
+# Prompt layout:
+# - every system prompt is a module-level constant, so its text and the
+#   message built from it are identical across requests;
+# - all fixed instructions live in the system prompt, and the user message
+#   carries only the variable content, question first, then the data.
+#
+# Provider-side prompt (prefix) caching does not apply at these sizes: the
+# system prompts are 107-150 tokens, and the question adds a few dozen more,
+# well short of PROVIDER_CACHE_MIN_TOKENS. Padding them to that length would
+# cost more in input tokens than the cache discount saves. The stable
+# prefix only matters if the prompts grow past it; token_report() says
+# which templates are cacheable.
+
+REDDIT_URL_ANALYSIS_SYSTEM = """You are an expert at analyzing social media content. Your task is to examine Reddit search results and identify the most relevant posts that would provide valuable additional information for answering the user's question.
 
 Analyze the provided Reddit results and identify URLs of posts that contain valuable information worth investigating further. Focus on posts that:
 - Directly relate to the user's question
@@ -17,101 +23,169 @@ Analyze the provided Reddit results and identify URLs of posts that contain valu
 
 Return a structured response with the selected URLs."""
 
+GOOGLE_ANALYSIS_SYSTEM = """You are an expert research analyst. Analyze the provided Google search results to extract key insights that answer the user's question.
+
+Focus on:
+- Main factual information and authoritative sources
+- Official websites, documentation, and reliable sources
+- Key statistics, dates, and verified information
+- Any conflicting information from different sources
+
+Provide a concise analysis highlighting the most relevant findings."""
+
+BING_ANALYSIS_SYSTEM = """You are an expert research analyst. Analyze the provided Bing search results to extract complementary insights that answer the user's question.
+
+Focus on:
+- Additional perspectives not covered in other sources
+- Technical details and documentation
+- News articles and recent developments
+- Microsoft ecosystem and enterprise perspectives
+
+Provide a concise analysis highlighting unique findings and perspectives that complement other search sources."""
+
+REDDIT_ANALYSIS_SYSTEM = """You are an expert at analyzing social media discussions. Analyze the provided Reddit content to extract community insights and user experiences.
+
+Focus on:
+- Real user experiences and testimonials
+- Community consensus and popular opinions
+- Practical tips and advice from users
+- Different perspectives and debates
+- Specific quotes from posts and comments (use quotation marks)
+
+IMPORTANT: When referencing specific content, directly quote it and mention the subreddit or context.
+Highlight both positive and negative experiences, controversies, and varying opinions."""
+
+SEARCH_RESULTS_SUMMARY_SYSTEM = """You are an expert research analyst. You will receive one chunk of web search results; other chunks are condensed separately and combined later.
+
+Extract, as compact notes:
+- Key facts, figures and dates, with the source URL they came from
+- Claims from official or authoritative sources
+- Any information that conflicts with other results
+
+Only include what is relevant to the user's question. Do not write an introduction or conclusion."""
+
+REDDIT_COMMENTS_SUMMARY_SYSTEM = """You are an expert at analyzing social media discussions. You will receive one batch of comments from Reddit threads; other batches are condensed separately and combined later.
+
+Extract, as compact notes:
+- Real user experiences and testimonials
+- Recurring opinions and points of disagreement
+- Practical tips and advice
+- Short direct quotes worth citing (use quotation marks)
+
+Only include what is relevant to the user's question. Do not write an introduction or conclusion."""
+
+SYNTHESIS_SYSTEM = """You are an expert research synthesizer. Combine the provided analyses from different sources to create a comprehensive, well-structured answer.
+
+Your task:
+- Synthesize insights from Google, Bing, and Reddit analyses
+- Identify common themes and conflicting information
+- Present a balanced view incorporating different perspectives
+- Structure the response logically with clear sections
+- Cite the source type (Google, Bing, Reddit) for key claims
+- Highlight any contradictions or uncertainties
+
+Create a comprehensive answer that addresses the user's question from multiple angles."""
+
+
+def _system_message(content: str) -> Mapping[str, str]:
+    return {"role": "system", "content": content}
+
+
+# Built once and shared by every request; treat them as read-only.
+SYSTEM_MESSAGES: Dict[str, Mapping[str, str]] = {
+    "reddit_url_analysis": _system_message(REDDIT_URL_ANALYSIS_SYSTEM),
+    "google_analysis": _system_message(GOOGLE_ANALYSIS_SYSTEM),
+    "bing_analysis": _system_message(BING_ANALYSIS_SYSTEM),
+    "reddit_analysis": _system_message(REDDIT_ANALYSIS_SYSTEM),
+    "search_results_summary": _system_message(SEARCH_RESULTS_SUMMARY_SYSTEM),
+    "reddit_comments_summary": _system_message(REDDIT_COMMENTS_SUMMARY_SYSTEM),
+    "synthesis": _system_message(SYNTHESIS_SYSTEM),
+}
+
+
+class PromptTemplates:
+    """Container for all prompt templates used in the research assistant."""
+
+    @staticmethod
+    def reddit_url_analysis_system() -> str:
+        """System prompt for analyzing Reddit URLs."""
+        return REDDIT_URL_ANALYSIS_SYSTEM
+
     @staticmethod
     def reddit_url_analysis_user(user_question: str, reddit_results: str) -> str:
         """User prompt for analyzing Reddit URLs."""
         return f"""User Question: {user_question}
 
-Reddit Results: {reddit_results}
-
-Please analyze these Reddit results and identify the most valuable posts for answering the user's question."""
+Reddit Results: {reddit_results}"""
 
     @staticmethod
     def google_analysis_system() -> str:
         """System prompt for analyzing Google search results."""
-        return """You are an expert research analyst. Analyze the provided Google search results to extract key insights that answer the user's question.
-
-Focus on:
-- Main factual information and authoritative sources
-- Official websites, documentation, and reliable sources
-- Key statistics, dates, and verified information
-- Any conflicting information from different sources
-
-Provide a concise analysis highlighting the most relevant findings."""
+        return GOOGLE_ANALYSIS_SYSTEM
 
     @staticmethod
     def google_analysis_user(user_question: str, google_results: str) -> str:
         """User prompt for analyzing Google search results."""
         return f"""Question: {user_question}
 
-Google Search Results: {google_results}
-
-Please analyze these Google results and extract the key insights that help answer the question."""
+Google Search Results: {google_results}"""
 
     @staticmethod
     def bing_analysis_system() -> str:
         """System prompt for analyzing Bing search results."""
-        return """You are an expert research analyst. Analyze the provided Bing search results to extract complementary insights that answer the user's question.
-
-Focus on:
-- Additional perspectives not covered in other sources
-- Technical details and documentation
-- News articles and recent developments
-- Microsoft ecosystem and enterprise perspectives
-
-Provide a concise analysis highlighting unique findings and perspectives."""
+        return BING_ANALYSIS_SYSTEM
 
     @staticmethod
     def bing_analysis_user(user_question: str, bing_results: str) -> str:
         """User prompt for analyzing Bing search results."""
         return f"""Question: {user_question}
 
-Bing Search Results: {bing_results}
-
-Please analyze these Bing results and extract insights that complement other search sources."""
+Bing Search Results: {bing_results}"""
 
     @staticmethod
     def reddit_analysis_system() -> str:
         """System prompt for analyzing Reddit discussions."""
-        return """You are an expert at analyzing social media discussions. Analyze the provided Reddit content to extract community insights and user experiences.
-
-Focus on:
-- Real user experiences and testimonials
-- Community consensus and popular opinions
-- Practical tips and advice from users
-- Different perspectives and debates
-- Specific quotes from posts and comments (use quotation marks)
-
-IMPORTANT: When referencing specific content, directly quote it and mention the subreddit or context.
-Highlight both positive and negative experiences, controversies, and varying opinions."""
+        return REDDIT_ANALYSIS_SYSTEM
 
     @staticmethod
     def reddit_analysis_user(
-        user_question: str, reddit_results: str, reddit_post_data: list
+        user_question: str, reddit_results: str, reddit_post_data: str
     ) -> str:
         """User prompt for analyzing Reddit discussions."""
         return f"""Question: {user_question}
 
 Reddit Search Results: {reddit_results}
 
-Detailed Reddit Post Data: {reddit_post_data}
+Detailed Reddit Post Data: {reddit_post_data}"""
 
-Please analyze this Reddit content and extract community insights, user experiences, and relevant discussions."""
+    @staticmethod
+    def search_results_summary_system() -> str:
+        """System prompt for condensing one chunk of search results."""
+        return SEARCH_RESULTS_SUMMARY_SYSTEM
 
     @staticmethod
-    def synthesis_system() -> str:
-        """System prompt for synthesizing all analyses."""
-        return """You are an expert research synthesizer. Combine the provided analyses from different sources to create a comprehensive, well-structured answer.
+    def search_results_summary_user(user_question: str, search_results: str) -> str:
+        """User prompt for condensing one chunk of search results."""
+        return f"""Question: {user_question}
 
-Your task:
-- Synthesize insights from Google, Bing, and Reddit analyses
-- Identify common themes and conflicting information
-- Present a balanced view incorporating different perspectives
-- Structure the response logically with clear sections
-- Cite the source type (Google, Bing, Reddit) for key claims
-- Highlight any contradictions or uncertainties
+Search Results: {search_results}"""
 
-Create a comprehensive answer that addresses the user's question from multiple angles."""
+    @staticmethod
+    def reddit_comments_summary_system() -> str:
+        """System prompt for condensing one batch of Reddit comments."""
+        return REDDIT_COMMENTS_SUMMARY_SYSTEM
+
+    @staticmethod
+    def reddit_comments_summary_user(user_question: str, reddit_comments: str) -> str:
+        """User prompt for condensing one batch of Reddit comments."""
+        return f"""Question: {user_question}
+
+Reddit Comments: {reddit_comments}"""
+
+    @staticmethod
+    def synthesis_system() -> str:
+        """System prompt for synthesizing all analyses."""
+        return SYNTHESIS_SYSTEM
 
     @staticmethod
     def synthesis_user(
@@ -127,9 +201,7 @@ Google Analysis: {google_analysis}
 
 Bing Analysis: {bing_analysis}
 
-Reddit Community Analysis: {reddit_analysis}
-
-Please synthesize these analyses into a comprehensive answer that addresses the question from multiple perspectives."""
+Reddit Community Analysis: {reddit_analysis}"""
 
 
 def create_message_pair(system_prompt: str, user_prompt: str) -> list[Dict[str, Any]]:
@@ -149,13 +221,17 @@ def create_message_pair(system_prompt: str, user_prompt: str) -> list[Dict[str,
     ]
 
 
+def _with_system(template: str, user_prompt: str) -> list[Mapping[str, Any]]:
+    return [SYSTEM_MESSAGES[template], {"role": "user", "content": user_prompt}]
+
+
 # Convenience functions for creating complete message arrays
 def get_reddit_url_analysis_messages(
     user_question: str, reddit_results: str
 ) -> list[Dict[str, Any]]:
     """Get messages for Reddit URL analysis."""
-    return create_message_pair(
-        PromptTemplates.reddit_url_analysis_system(),
+    return _with_system(
+        "reddit_url_analysis",
         PromptTemplates.reddit_url_analysis_user(user_question, reddit_results),
     )
 
@@ -164,8 +240,8 @@ def get_google_analysis_messages(
     user_question: str, google_results: str
 ) -> list[Dict[str, Any]]:
     """Get messages for Google results analysis."""
-    return create_message_pair(
-        PromptTemplates.google_analysis_system(),
+    return _with_system(
+        "google_analysis",
         PromptTemplates.google_analysis_user(user_question, google_results),
     )
 
@@ -174,31 +250,95 @@ def get_bing_analysis_messages(
     user_question: str, bing_results: str
 ) -> list[Dict[str, Any]]:
     """Get messages for Bing results analysis."""
-    return create_message_pair(
-        PromptTemplates.bing_analysis_system(),
+    return _with_system(
+        "bing_analysis",
         PromptTemplates.bing_analysis_user(user_question, bing_results),
     )
 
 
 def get_reddit_analysis_messages(
-    user_question: str, reddit_results: str, reddit_post_data: list
+    user_question: str, reddit_results: str, reddit_post_data: str
 ) -> list[Dict[str, Any]]:
     """Get messages for Reddit discussions analysis."""
-    return create_message_pair(
-        PromptTemplates.reddit_analysis_system(),
+    return _with_system(
+        "reddit_analysis",
         PromptTemplates.reddit_analysis_user(
             user_question, reddit_results, reddit_post_data
         ),
     )
 
 
+def get_search_results_summary_messages(
+    user_question: str, search_results: str
+) -> list[Dict[str, Any]]:
+    """Get messages for condensing one chunk of search results."""
+    return _with_system(
+        "search_results_summary",
+        PromptTemplates.search_results_summary_user(user_question, search_results),
+    )
+
+
+def get_reddit_comments_summary_messages(
+    user_question: str, reddit_comments: str
+) -> list[Dict[str, Any]]:
+    """Get messages for condensing one batch of Reddit comments."""
+    return _with_system(
+        "reddit_comments_summary",
+        PromptTemplates.reddit_comments_summary_user(user_question, reddit_comments),
+    )
+
+
 def get_synthesis_messages(
     user_question: str, google_analysis: str, bing_analysis: str, reddit_analysis: str
 ) -> list[Dict[str, Any]]:
     """Get messages for final synthesis."""
-    return create_message_pair(
-        PromptTemplates.synthesis_system(),
+    return _with_system(
+        "synthesis",
         PromptTemplates.synthesis_user(
             user_question, google_analysis, bing_analysis, reddit_analysis
         ),
-    )
\ No newline at end of file
+    )
+
+
+# Provider prompt caching (OpenAI) only kicks in for prefixes of 1024+ tokens;
+# none of the templates above reach it.
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+_USER_TEMPLATES = {
+    "reddit_url_analysis": lambda: PromptTemplates.reddit_url_analysis_user("", ""),
+    "google_analysis": lambda: PromptTemplates.google_analysis_user("", ""),
+    "bing_analysis": lambda: PromptTemplates.bing_analysis_user("", ""),
+    "reddit_analysis": lambda: PromptTemplates.reddit_analysis_user("", "", ""),
+    "search_results_summary": lambda: PromptTemplates.search_results_summary_user("", ""),
+    "reddit_comments_summary": lambda: PromptTemplates.reddit_comments_summary_user("", ""),
+    "synthesis": lambda: PromptTemplates.synthesis_user("", "", "", ""),
+}
+
+
+def token_report() -> List[Dict[str, Any]]:
+    """Static token cost of each template.
+
+    system_tokens is the shared, cacheable prefix; user_overhead_tokens the
+    fixed labels around the variable content of the user message.
+    """
+    from compaction import count_tokens
+
+    rows = []
+    for name, message in SYSTEM_MESSAGES.items():
+        system_tokens = count_tokens(message["content"])
+        rows.append({
+            "template": name,
+            "system_tokens": system_tokens,
+            "user_overhead_tokens": count_tokens(_USER_TEMPLATES[name]()),
+            "provider_cacheable": system_tokens >= PROVIDER_CACHE_MIN_TOKENS,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'template':<26} {'system':>7} {'user overhead':>14} {'cacheable':>10}")
+    for row in token_report():
+        print(
+            f"{row['template']:<26} {row['system_tokens']:>7} {row['user_overhead_tokens']:>14} "
+            f"{'yes' if row['provider_cacheable'] else 'no':>10}"
+        )
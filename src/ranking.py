@@ -0,0 +1,134 @@
+import re
+import math
+from collections import Counter
+from typing import Any, Dict, List, Sequence
+from cache import normalize_url
+
+STOPWORDS = frozenset(
+    """a an and are as at be best but by can do does for from get has have how i if in
+    is it its me my of on or should so than that the their them there these this to
+    vs was what when where which who why will with worth would you your""".split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with a light plural strip."""
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25:
+    """Okapi BM25 over a small, fixed set of documents (post titles)."""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tokenize(doc)) for doc in documents]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+
+    def scores(self, query: str) -> List[float]:
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        results = []
+        for doc, length in zip(self.docs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def rank_posts(
+    question: str, posts: Sequence[Dict[str, Any]], engagement_weight: float = 0.5
+) -> List[tuple[Dict[str, Any], float]]:
+    """Posts ordered by title relevance to the question, boosted by engagement.
+
+    Relevance is BM25 normalised to the best match. Engagement is the post's
+    comment count on a log scale, relative to the busiest post; it can lift
+    a relevant post by up to engagement_weight but never makes an
+    irrelevant one (score 0) rank.
+    """
+    posts = [post for post in posts if post.get("url")]
+    if not posts:
+        return []
+
+    relevance = BM25([post.get("title") or "" for post in posts]).scores(question)
+    top_relevance = max(relevance) or 1.0
+    busiest = max(math.log1p(post.get("num_comments") or 0) for post in posts) or 1.0
+
+    ranked = []
+    for post, score in zip(posts, relevance):
+        engagement = math.log1p(post.get("num_comments") or 0) / busiest
+        ranked.append((post, score / top_relevance * (1 + engagement_weight * engagement)))
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
+
+
+def select_urls(
+    question: str,
+    posts: Sequence[Dict[str, Any]],
+    k: int,
+    engagement_weight: float = 0.5,
+    min_margin: float = 0.05,
+) -> tuple[List[str], bool]:
+    """Top-k post URLs for the question, and whether the ranking is ambiguous.
+
+    The ranking is ambiguous when fewer than k posts share any term with the
+    question, or when the k-th and (k+1)-th posts score within min_margin
+    of each other (as a share of the best score): the titles can't tell
+    which of them belongs in the selection.
+    """
+    ranked = rank_posts(question, posts, engagement_weight)
+    selected: List[str] = []
+    scores: List[float] = []
+    runner_up = 0.0
+    for post, score in ranked:
+        if score <= 0:
+            break
+        url = post.get("url")
+        if url in selected:
+            continue
+        if len(selected) == k:
+            runner_up = score
+            break
+        selected.append(url)
+        scores.append(score)
+    if len(selected) < k or not selected:
+        return selected, len(selected) < k
+    return selected, scores[-1] - runner_up < min_margin * scores[0]
+
+
+def allocate_comment_budget(posts: Sequence[Dict[str, Any]], urls: Sequence[str], budget: int) -> Dict[str, int]:
+    """Split a total comment budget into a comment_limit per thread URL.
+
+    Water-filling over the threads' comment counts: threads smaller than
+    an equal share get what they have, and what they leave over is shared
+    among the larger ones. Threads without a known count are treated as
+    large. Every thread gets at least one comment, since a limit of 0
+    would mean no limit. Keys are normalized URLs.
+    """
+    counts = {normalize_url(post.get("url")): post.get("num_comments") for post in posts if post.get("url")}
+    threads = list(dict.fromkeys(normalize_url(url) for url in urls))
+    demand = {url: counts.get(url) if counts.get(url) is not None else math.inf for url in threads}
+
+    limits: Dict[str, int] = {}
+    remaining = budget
+    for i, url in enumerate(sorted(threads, key=lambda url: demand[url])):
+        share = remaining // (len(threads) - i)
+        limits[url] = max(1, int(min(demand[url], share)))
+        remaining -= limits[url]
+    return {url: limits[url] for url in threads}
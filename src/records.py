@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, Sequence
+
+
+def _field(record, name: str, default: Any = None) -> Any:
+    # Lets the prompt builders and rankers read records and plain dicts
+    # (fixtures, old cache entries) the same way.
+    return getattr(record, name) if name in record._fields else default
+
+
+class SerpHit(NamedTuple):
+    """One organic search result, reduced to what the prompts use."""
+
+    link: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+
+    get = _field
+
+    @classmethod
+    def from_hit(cls, hit: Mapping[str, Any]) -> "SerpHit":
+        return cls(
+            hit.get("link") or hit.get("url"),
+            hit.get("title"),
+            hit.get("description") or hit.get("snippet"),
+        )
+
+    @classmethod
+    def from_value(cls, value: Any) -> "SerpHit":
+        """Rebuild a hit from a cached value: a JSON row or an older dict."""
+        return cls.from_hit(value) if isinstance(value, Mapping) else cls(*value)
+
+
+class RedditPost(NamedTuple):
+    title: Optional[str]
+    url: Optional[str]
+    num_comments: Optional[int]
+    num_upvotes: Optional[int]
+
+    get = _field
+
+    @classmethod
+    def from_post(cls, post: Mapping[str, Any]) -> "RedditPost":
+        return cls(post.get("title"), post.get("url"), post.get("num_comments"), post.get("num_upvotes"))
+
+    @classmethod
+    def from_value(cls, value: Any) -> "RedditPost":
+        return cls.from_post(value) if isinstance(value, Mapping) else cls(*value)
+
+
+class Comment(NamedTuple):
+    comment_id: Optional[str]
+    content: Optional[str]
+    date: Optional[str]
+
+    get = _field
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class CommentBatch:
+    """Reddit comments stored column by column.
+
+    One sequence per field instead of one dict per comment: a few pointers
+    per comment in memory, and field names written once per batch (not per
+    comment) when a checkpoint or cache entry is serialized. Iterating
+    yields Comment records.
+    """
+
+    comment_id: Sequence[Optional[str]] = ()
+    content: Sequence[Optional[str]] = ()
+    date: Sequence[Optional[str]] = ()
+
+    # The checkpoint serializer hands batches back with list columns.
+    # Comparing and hashing the columns as tuples makes such a batch equal
+    # the original without converting every column on every load.
+    def _columns(self) -> tuple:
+        return tuple(self.comment_id), tuple(self.content), tuple(self.date)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CommentBatch):
+            return NotImplemented
+        return self._columns() == other._columns()
+
+    def __hash__(self) -> int:
+        return hash(self._columns())
+
+    def __len__(self) -> int:
+        return len(self.comment_id)
+
+    def __iter__(self) -> Iterator[Comment]:
+        return map(Comment, self.comment_id, self.content, self.date)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "CommentBatch":
+        """Build a batch from (comment_id, content, date) rows."""
+        columns = tuple(zip(*rows))
+        return cls(*columns) if columns else cls()
+
+    @classmethod
+    def concat(cls, batches: Iterable["CommentBatch"]) -> "CommentBatch":
+        batches = [batch for batch in batches if batch]
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            tuple(value for batch in batches for value in batch.comment_id),
+            tuple(value for batch in batches for value in batch.content),
+            tuple(value for batch in batches for value in batch.date),
+        )
+
+    def to_columns(self) -> Dict[str, list]:
+        """JSON-ready form, for the result cache."""
+        return {"comment_id": list(self.comment_id), "content": list(self.content), "date": list(self.date)}
+
+    @classmethod
+    def from_value(cls, value: Any) -> "CommentBatch":
+        """Rebuild a batch from to_columns() output or an older list of comment dicts."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, Mapping):
+            return cls(value["comment_id"], value["content"], value["date"])
+        return cls.from_rows(
+            (comment.get("comment_id"), comment.get("content"), comment.get("date")) for comment in value
+        )
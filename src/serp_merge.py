@@ -0,0 +1,72 @@
+import logging
+from typing import Any, Dict, List, Optional
+from cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def _result_key(hit: Dict[str, Any]) -> Optional[str]:
+    link = hit.get("link") or hit.get("url")
+    if not link:
+        return None
+    url = normalize_url(link)
+    return url.replace("://www.", "://", 1)
+
+
+def _organic_by_key(results: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    hits = {}
+    for hit in (results or {}).get("organic") or []:
+        key = _result_key(hit)
+        if key and key not in hits:
+            hits[key] = hit
+    return hits
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """Score each key by sum(1 / (k + rank)) over the rankings it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def merge_serp_results(
+    google_results: Optional[Dict[str, Any]],
+    bing_results: Optional[Dict[str, Any]],
+    k: int = 60,
+) -> tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Split Google and Bing results into non-overlapping views.
+
+    Hits returned by both engines are analyzed once: they go to the Google
+    view, ahead of the Google-only hits, ordered by reciprocal rank fusion.
+    The Bing view keeps only Bing-only hits, which is what the Bing analysis
+    prompt asks for (perspectives not covered by other sources).
+    """
+    if not google_results or not bing_results:
+        return google_results, bing_results
+
+    google_hits = _organic_by_key(google_results)
+    bing_hits = _organic_by_key(bing_results)
+    scores = reciprocal_rank_fusion([list(google_hits), list(bing_hits)], k)
+
+    def by_score(keys):
+        return sorted(keys, key=lambda key: scores[key], reverse=True)
+
+    shared = by_score(key for key in google_hits if key in bing_hits)
+    google_only = by_score(key for key in google_hits if key not in bing_hits)
+    bing_only = by_score(key for key in bing_hits if key not in google_hits)
+
+    google_view = {
+        "knowledge": google_results.get("knowledge", {}),
+        "organic": [google_hits[key] for key in shared + google_only],
+    }
+    bing_view = {
+        "knowledge": bing_results.get("knowledge", {}),
+        "organic": [bing_hits[key] for key in bing_only],
+    }
+    logger.info(
+        "Merged search results: %d shared, %d Google-only, %d Bing-only",
+        len(shared), len(google_only), len(bing_only),
+    )
+    return google_view, bing_view
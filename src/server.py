@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+from pydantic import ValidationError
+from main import graph, build_initial_state, trace_question, aiter_answers, AnswerPolicy
+
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "32"))
+MAX_FINISHED_JOBS = 1000
+
+
+class ResearchJob:
+    def __init__(self, question: str, policy: Optional[AnswerPolicy] = None):
+        self.job_id = uuid.uuid4().hex
+        self.question = question
+        self.policy = policy
+        self.status = "queued"
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.final_answer: Optional[str] = None
+        self.missing_sources: Optional[List[str]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Condition()
+
+    async def emit(self, event: Dict[str, Any]):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.finished = time.time()
+            self.events.append({"type": "end", "status": self.status})
+            # Finished jobs are kept around (up to MAX_FINISHED_JOBS), so drop
+            # the per-token events and keep the answer as one event instead.
+            # Followers already reading keep the list they started on.
+            self.events = self._without_tokens(self.events)
+            self._changed.notify_all()
+
+    def _without_tokens(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kept = [event for event in events if event["type"] != "token"]
+        if len(kept) < len(events) and not any(event["type"] == "answer" for event in kept):
+            kept.insert(-1, {"type": "answer", "content": self.final_answer, "missing_sources": []})
+        return kept
+
+    async def follow(self):
+        """Yield every event from the start, then new ones until the job ends."""
+        position = 0
+        async with self._changed:
+            events = self.events
+        while True:
+            async with self._changed:
+                while position == len(events) and self.finished is None:
+                    await self._changed.wait()
+                pending = events[position:]
+                done = self.finished is not None
+            for event in pending:
+                yield event
+            position += len(pending)
+            if done and position == len(events):
+                return
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "question": self.question,
+            "status": self.status,
+            "final_answer": self.final_answer,
+            "missing_sources": self.missing_sources,
+            "error": self.error,
+            "completed_nodes": [e["node"] for e in self.events if e["type"] == "node"],
+        }
+
+
+class JobManager:
+    """Runs research jobs on the compiled graph with a cap on concurrent runs.
+
+    LLM and Bright Data concurrency are capped separately through
+    limits.llm_calls and limits.snapshots.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = MAX_CONCURRENT_JOBS):
+        self.jobs: Dict[str, ResearchJob] = {}
+        self._slots = asyncio.Semaphore(max_concurrent_jobs)
+        self._tasks = set()
+
+    def submit(self, question: str, policy: Optional[AnswerPolicy] = None) -> ResearchJob:
+        job = ResearchJob(question, policy)
+        self.jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._prune()
+        return job
+
+    async def _run(self, job: ResearchJob):
+        async with self._slots:
+            job.status = "running"
+            try:
+                if job.policy is None:
+                    with trace_question(job.question):
+                        async for mode, chunk in graph.astream(
+                            build_initial_state(job.question), stream_mode=["updates", "custom"]
+                        ):
+                            await self._forward(job, mode, chunk)
+                else:
+                    # A deadline policy may answer before the graph finishes;
+                    # each answer is emitted as its own event.
+                    async for state in aiter_answers(
+                        job.question, job.policy, lambda mode, chunk: self._forward(job, mode, chunk)
+                    ):
+                        job.final_answer = state["final_answer"]
+                        job.missing_sources = state.get("missing_sources")
+                        await job.emit({
+                            "type": "answer",
+                            "content": job.final_answer,
+                            "missing_sources": job.missing_sources or [],
+                        })
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+
+        await job.finish()
+
+    @staticmethod
+    async def _forward(job: ResearchJob, mode: str, chunk: Dict[str, Any]):
+        if mode == "custom" and "answer_token" in chunk:
+            await job.emit({"type": "token", "content": chunk["answer_token"]})
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if update and update.get("final_answer"):
+                    job.final_answer = update["final_answer"]
+                await job.emit({"type": "node", "node": node})
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        finished.sort(key=lambda job: job.finished)
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.job_id]
+
+    @property
+    def running(self) -> int:
+        return sum(job.status == "running" for job in self.jobs.values())
+
+
+def _wants_stream(scope) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("stream", [""])[-1] == "true"
+
+
+async def _read_json(receive) -> Any:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return json.loads(body or b"{}")
+
+
+async def _send_json(send, status: int, payload: Any):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_events(send, job: ResearchJob):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+        ],
+    })
+    async for event in job.follow():
+        data = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        await send({"type": "http.response.body", "body": data.encode(), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+class ResearchApp:
+    """ASGI app.
+
+    POST /research                {"question": ..., "policy": {...}?} -> 202 {"job_id", ...}
+    POST /research?stream=true    same, but streams the job's events (SSE)
+    GET  /research/{job_id}       job status and final answer
+    GET  /research/{job_id}/events  server-sent events: node progress, answer tokens
+    GET  /healthz
+    """
+
+    def __init__(self):
+        self._manager: Optional[JobManager] = None
+
+    @property
+    def manager(self) -> JobManager:
+        # Created lazily so its semaphore belongs to the server's event loop.
+        if self._manager is None:
+            self._manager = JobManager()
+        return self._manager
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        parts = [part for part in scope["path"].split("/") if part]
+
+        if method == "GET" and parts == ["healthz"]:
+            return await _send_json(send, 200, {"status": "ok", "jobs_running": self.manager.running})
+
+        if method == "POST" and parts == ["research"]:
+            try:
+                body = await _read_json(receive)
+                question = body.get("question")
+            except (ValueError, AttributeError):
+                body, question = {}, None
+            if not question or not isinstance(question, str):
+                return await _send_json(send, 400, {"error": "Body must be JSON with a 'question' string"})
+            try:
+                policy = AnswerPolicy(**body["policy"]) if body.get("policy") else None
+            except (TypeError, ValidationError) as e:
+                return await _send_json(send, 400, {"error": f"Invalid policy: {e}"})
+
+            job = self.manager.submit(question, policy)
+            if _wants_stream(scope):
+                return await _send_events(send, job)
+            return await _send_json(send, 202, {
+                "job_id": job.job_id,
+                "status_url": f"/research/{job.job_id}",
+                "events_url": f"/research/{job.job_id}/events",
+            })
+
+        if method == "GET" and len(parts) in (2, 3) and parts[0] == "research":
+            job = self.manager.jobs.get(parts[1])
+            if job is None:
+                return await _send_json(send, 404, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return await _send_json(send, 200, job.summary())
+            if parts[2] == "events":
+                return await _send_events(send, job)
+
+        await _send_json(send, 404, {"error": "Not found"})
+
+
+app = ResearchApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")))
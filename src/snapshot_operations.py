@@ -1,74 +1,387 @@
-import os
+import json
+import math
+import asyncio
 import time
-import requests
+import logging
+import weakref
+import threading
+import contextlib
+import contextvars
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional
+from brightdata_client import get_client, run_sync
+from tracing import span, set_attributes
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-def poll_snapshot_status(
-    snapshot_id: str, max_attempts: int = 60, delay: int = 5
-) -> bool:
-    api_key = os.getenv("BRIGHTDATA_API_KEY")
-    progress_url = f"https://api.brightdata.com/datasets/v3/progress/{snapshot_id}"
-    headers = {"Authorization": f"Bearer {api_key}"}
 
-    for attempt in range(max_attempts):
-        try:
-            print(
-                f"⏳ Checking snapshot progress... (attempt {attempt + 1}/{max_attempts})"
+class CompletionEstimator:
+    """Learns how long snapshots of each dataset usually take to complete.
+
+    Keeps an exponentially weighted moving average per dataset id so the
+    poller can skip checks that would almost certainly say "running".
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._estimates: Dict[str, float] = {}
+
+    def estimate(self, dataset_id: Optional[str]) -> Optional[float]:
+        return self._estimates.get(dataset_id)
+
+    def record(self, dataset_id: Optional[str], seconds: float):
+        if dataset_id is None:
+            return
+        previous = self._estimates.get(dataset_id)
+        if previous is None:
+            self._estimates[dataset_id] = seconds
+        else:
+            self._estimates[dataset_id] = (
+                self.alpha * seconds + (1 - self.alpha) * previous
             )
 
-            response = requests.get(progress_url, headers=headers)
+
+completion_estimator = CompletionEstimator()
+
+
+class SnapshotStats:
+    """Duration and payload size of every snapshot, per operation.
+
+    Sizes are what was actually downloaded (streamed or whole), so they
+    show the effect of fetch sizing (posts per search, comments per
+    thread) on the bill and on transfer time.
+    """
+
+    def __init__(self):
+        self._operations: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float, inputs: int, bytes: int, items: int):
+        with self._lock:
+            stats = self._operations.setdefault(operation, {
+                "snapshots": 0,
+                "inputs": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+                "bytes": 0,
+                "items": 0,
+            })
+            stats["snapshots"] += 1
+            stats["inputs"] += inputs
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["bytes"] += bytes
+            stats["items"] += items
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                operation: dict(
+                    stats,
+                    seconds=round(stats["seconds"], 3),
+                    max_seconds=round(stats["max_seconds"], 3),
+                    mean_seconds=round(stats["seconds"] / stats["snapshots"], 3),
+                    mean_bytes=stats["bytes"] // stats["snapshots"],
+                )
+                for operation, stats in self._operations.items()
+            }
+
+
+snapshot_stats = SnapshotStats()
+
+_download_usage: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "download_usage", default=None
+)
+
+
+@contextlib.contextmanager
+def track_snapshot(operation: str, inputs: int):
+    """Record the snapshot taken inside the block in snapshot_stats."""
+    usage = {"bytes": 0, "items": 0}
+    token = _download_usage.set(usage)
+    started = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        _download_usage.reset(token)
+        snapshot_stats.record(operation, time.perf_counter() - started, inputs, usage["bytes"], usage["items"])
+
+
+def _count_download(bytes: int, items: int):
+    usage = _download_usage.get()
+    if usage is not None:
+        usage["bytes"] += bytes
+        usage["items"] += items
+
+
+def _first_poll_delay(dataset_id: Optional[str], initial_delay: float) -> float:
+    estimate = completion_estimator.estimate(dataset_id)
+    if estimate is None:
+        return initial_delay
+    # Check a little before the expected completion, then fall back to
+    # short, growing intervals.
+    return max(initial_delay, 0.7 * estimate)
+
+
+class _PendingSnapshot:
+    __slots__ = (
+        "snapshot_id", "dataset_id", "started", "deadline",
+        "next_check", "delay", "max_delay", "backoff", "waiters", "checks",
+    )
+
+    def __init__(self, snapshot_id, dataset_id, timeout, initial_delay, max_delay, backoff):
+        now = time.monotonic()
+        self.snapshot_id = snapshot_id
+        self.dataset_id = dataset_id
+        self.started = now
+        self.deadline = now + timeout
+        self.next_check = min(now + _first_poll_delay(dataset_id, initial_delay), self.deadline)
+        self.delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.waiters: List[asyncio.Future] = []
+        self.checks = 0
+
+    def schedule_next(self, now: float):
+        self.next_check = min(now + self.delay, self.deadline)
+        self.delay = min(self.delay * self.backoff, self.max_delay)
+
+    def resolve(self, result: bool):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+
+class SnapshotPoller:
+    """Single background task that polls every outstanding snapshot.
+
+    Callers register a snapshot id and await the result; the poller keeps
+    one schedule for all of them, starts each due check as its own task
+    with bounded concurrency, and resolves each waiter when its snapshot is
+    ready, failed, or past its deadline. A check that takes longer than
+    check_timeout counts as a failed check, and a slow one never holds up
+    the others. Concurrent waiters on the same snapshot id share one entry.
+    """
+
+    def __init__(self, max_concurrent_checks: int = 20, check_timeout: float = 10.0):
+        self.check_timeout = check_timeout
+        self._pending: Dict[str, _PendingSnapshot] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent_checks)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._checks: set[asyncio.Task] = set()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def wait(
+        self,
+        snapshot_id: str,
+        dataset_id: Optional[str] = None,
+        timeout: float = 300.0,
+        initial_delay: float = 1.0,
+        max_delay: float = 5.0,
+        backoff: float = 1.2,
+    ) -> bool:
+        entry = self._pending.get(snapshot_id)
+        if entry is None:
+            entry = _PendingSnapshot(
+                snapshot_id, dataset_id, timeout, initial_delay, max_delay, backoff
+            )
+            self._pending[snapshot_id] = entry
+            self._wakeup.set()
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry.waiters.append(waiter)
+        if self._task is None or self._task.done():
+            # Fresh context: the shared task must not inherit the first
+            # caller's trace.
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+        result = await waiter
+        set_attributes(progress_checks=entry.checks)
+        return result
+
+    async def _run(self):
+        while self._pending:
+            self._wakeup.clear()
+            now = time.monotonic()
+            for snapshot_id, entry in list(self._pending.items()):
+                if all(waiter.done() for waiter in entry.waiters):
+                    del self._pending[snapshot_id]
+                elif entry.next_check <= now:
+                    # In flight until the check reschedules or finishes it.
+                    entry.next_check = math.inf
+                    task = asyncio.create_task(self._check(entry))
+                    self._checks.add(task)
+                    task.add_done_callback(self._check_done)
+            if not self._pending:
+                break
+
+            next_check = min(entry.next_check for entry in self._pending.values())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if next_check == math.inf else next_check - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def _check_done(self, task: asyncio.Task):
+        self._checks.discard(task)
+        self._wakeup.set()
+
+    async def _check(self, entry: _PendingSnapshot):
+        progress_url = (
+            f"/datasets/v3/progress/{entry.snapshot_id}"
+        )
+        elapsed = time.monotonic() - entry.started
+        status = None
+        entry.checks += 1
+        try:
+            logger.debug("Checking snapshot %s (%.1fs elapsed)", entry.snapshot_id, elapsed)
+
+            async with self._semaphore:
+                response = await asyncio.wait_for(get_client().get(progress_url), self.check_timeout)
             response.raise_for_status()
 
-            progress_data = response.json()
-            status = progress_data.get("status")
-
-            if status == "ready":
-                print("✅ Snapshot completed!")
-                return True
-            elif status == "failed":
-                print("❌ Snapshot failed")
-                return False
-            elif status == "running":
-                print("🔄 Still processing...")
-                time.sleep(delay)
-            else:
-                print(f"❓ Unknown status: {status}")
-                time.sleep(delay)
+            status = response.json().get("status")
+            if status not in ("ready", "failed", "running"):
+                logger.warning("Unknown status for snapshot %s: %s", entry.snapshot_id, status)
 
+        except asyncio.TimeoutError:
+            logger.warning("Progress check for snapshot %s timed out after %.1fs", entry.snapshot_id, self.check_timeout)
         except Exception as e:
-            print(f"⚠️ Error checking progress: {e}")
-            time.sleep(delay)
+            logger.warning("Error checking progress of snapshot %s: %s", entry.snapshot_id, e)
 
-    print("⏰ Timeout waiting for snapshot completion")
-    return False
+        now = time.monotonic()
+        if status == "ready":
+            logger.info("Snapshot %s completed after %.1fs", entry.snapshot_id, now - entry.started)
+            completion_estimator.record(entry.dataset_id, now - entry.started)
+            self._finish(entry, True)
+        elif status == "failed":
+            logger.warning("Snapshot %s failed", entry.snapshot_id)
+            self._finish(entry, False)
+        elif now >= entry.deadline:
+            logger.warning("Timed out waiting for snapshot %s", entry.snapshot_id)
+            self._finish(entry, False)
+        else:
+            entry.schedule_next(now)
 
+    def _finish(self, entry: _PendingSnapshot, result: bool):
+        self._pending.pop(entry.snapshot_id, None)
+        entry.resolve(result)
 
-def download_snapshot(
+
+_pollers = weakref.WeakKeyDictionary()
+
+
+def get_poller() -> SnapshotPoller:
+    """Return the shared poller for the running event loop."""
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = SnapshotPoller()
+        _pollers[loop] = poller
+    return poller
+
+
+async def apoll_snapshot_status(
+    snapshot_id: str,
+    dataset_id: Optional[str] = None,
+    timeout: float = 300.0,
+    initial_delay: float = 1.0,
+    max_delay: float = 5.0,
+    backoff: float = 1.2,
+) -> bool:
+    with span("brightdata.poll", kind="client", snapshot_id=snapshot_id, dataset_id=dataset_id):
+        ready = await get_poller().wait(
+            snapshot_id, dataset_id, timeout, initial_delay, max_delay, backoff
+        )
+        set_attributes(ready=ready)
+        return ready
+
+
+def poll_snapshot_status(
+    snapshot_id: str,
+    dataset_id: Optional[str] = None,
+    timeout: float = 300.0,
+    initial_delay: float = 1.0,
+    max_delay: float = 5.0,
+    backoff: float = 1.2,
+) -> bool:
+    return run_sync(
+        apoll_snapshot_status(
+            snapshot_id, dataset_id, timeout, initial_delay, max_delay, backoff
+        )
+    )
+
+
+async def adownload_snapshot(
     snapshot_id: str, format: str = "json"
 ) -> Optional[List[Dict[Any, Any]]]:
-    api_key = os.getenv("BRIGHTDATA_API_KEY")
     download_url = (
-        f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}?format={format}"
+        f"/datasets/v3/snapshot/{snapshot_id}?format={format}"
     )
-    headers = {"Authorization": f"Bearer {api_key}"}
 
-    try:
-        print("📥 Downloading snapshot data...")
+    with span("brightdata.download", kind="client", snapshot_id=snapshot_id):
+        try:
+            response = await get_client().get(download_url)
+            response.raise_for_status()
 
-        response = requests.get(download_url, headers=headers)
-        response.raise_for_status()
+            data = response.json()
+            items = len(data) if isinstance(data, list) else 1
+            set_attributes(bytes=len(response.content), items=items)
+            _count_download(len(response.content), items)
+            logger.info("Downloaded %d items from snapshot %s", items, snapshot_id)
 
-        data = response.json()
-        print(
-            f"🎉 Successfully downloaded {len(data) if isinstance(data, list) else 1} items"
-        )
+            return data
 
-        return data
+        except Exception as e:
+            logger.error("Error downloading snapshot %s: %s", snapshot_id, e)
+            return None
 
-    except Exception as e:
-        print(f"❌ Error downloading snapshot: {e}")
-        return None
\ No newline at end of file
+
+def download_snapshot(
+    snapshot_id: str, format: str = "json"
+) -> Optional[List[Dict[Any, Any]]]:
+    return run_sync(adownload_snapshot(snapshot_id, format))
+
+
+async def astream_snapshot(
+    snapshot_id: str, fields: Optional[Iterable[str]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield a ready snapshot's records one at a time as they arrive.
+
+    Downloads the JSON Lines format and parses each line as soon as it is
+    received, so memory stays bounded by one record rather than the whole
+    body. With fields given, each record is projected to just those keys
+    (missing ones become None) before it is yielded.
+
+    Byte and record counts, plus the time to the first record, are added to
+    the caller's current span (an async generator can't hold its own span
+    open across yields).
+    """
+    download_url = f"/datasets/v3/snapshot/{snapshot_id}?format=jsonl"
+    fields = tuple(fields) if fields is not None else None
+
+    started = time.perf_counter()
+    items = 0
+    received = 0
+    try:
+        async with get_client().stream("GET", download_url) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                received += len(line) + 1
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if fields is not None:
+                    record = {field: record.get(field) for field in fields}
+                if items == 0:
+                    set_attributes(first_record_seconds=time.perf_counter() - started)
+                items += 1
+                yield record
+    finally:
+        set_attributes(bytes=received, items=items)
+        _count_download(received, items)
+        logger.info("Streamed %d items from snapshot %s", items, snapshot_id)
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import logging
+import contextlib
+import contextvars
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = dict(attributes)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Field names follow the OpenTelemetry span JSON encoding.
+        return {
+            "name": self.name,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "kind": self.kind,
+            "startTimeUnixNano": int(self.start * 1e9),
+            "endTimeUnixNano": int((self.end or time.time()) * 1e9),
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """All spans recorded while answering one research question."""
+
+    def __init__(self, question: str, dependencies: Optional[Dict[str, List[str]]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.question = question
+        self.dependencies = dependencies or {}
+        self.spans: List[Span] = []
+
+    def node_spans(self) -> List[Span]:
+        return [span for span in self.spans if span.kind == "node" and span.end]
+
+    def critical_path(self) -> List[Span]:
+        """Walk back from the last node to finish, each time to the upstream
+        node that finished last (the one the node was actually waiting on).
+
+        Upstream nodes come from the graph's edges when dependencies were
+        given, otherwise any node that finished before this one started.
+        """
+        nodes = sorted(self.node_spans(), key=lambda span: span.end)
+        if not nodes:
+            return []
+        path = [nodes[-1]]
+        while True:
+            current = path[-1]
+            if self.dependencies:
+                upstream = set(self.dependencies.get(current.name, ()))
+                before = [span for span in nodes if span.name in upstream]
+            else:
+                before = [span for span in nodes if span.end <= current.start + 1e-3]
+            before = [span for span in before if span not in path]
+            if not before:
+                break
+            path.append(max(before, key=lambda span: span.end))
+        return list(reversed(path))
+
+    def summary(self) -> str:
+        path = self.critical_path()
+        if not path:
+            return "No nodes recorded"
+        total = path[-1].end - path[0].start
+        lines = [f"Critical path ({total:.2f}s):"]
+        for span in path:
+            lines.append(f"  {span.name:<24} {span.duration:7.2f}s")
+
+        by_model: Dict[str, List[Span]] = {}
+        for span in self.spans:
+            if span.name == "llm.call" and span.end:
+                by_model.setdefault(span.attributes.get("model", "?"), []).append(span)
+        if by_model:
+            lines.append("LLM calls by model:")
+            for model, calls in sorted(by_model.items()):
+                seconds = sum(call.duration for call in calls)
+                cost = sum(call.attributes.get("cost_usd", 0.0) for call in calls)
+                lines.append(f"  {model:<24} {len(calls):3d} calls {seconds:7.2f}s  ${cost:.4f}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "question": self.question,
+            "spans": [span.to_dict() for span in self.spans],
+            "criticalPath": [span.name for span in self.critical_path()],
+        }
+
+    def export(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.trace_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+
+@contextlib.contextmanager
+def start_trace(question: str, dependencies: Optional[Dict[str, List[str]]] = None):
+    """Collect spans for one question; exported to RESEARCH_TRACE_DIR if set."""
+    trace = Trace(question, dependencies)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        logger.info(trace.summary())
+        directory = os.getenv("RESEARCH_TRACE_DIR")
+        if directory:
+            logger.info("Trace written to %s", trace.export(directory))
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, kind, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = repr(e)
+        raise
+    finally:
+        current.end = time.time()
+        _current_span.reset(token)
+
+
+def set_attributes(**attributes):
+    """Attach attributes to the innermost open span, if tracing is active."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def traced_node(name: str):
+    """Record a graph node's async implementation as a "node" span."""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(state, *args, **kwargs):
+            with span(name, kind="node"):
+                result = await func(state, *args, **kwargs)
+                set_attributes(updated_keys=sorted(result or {}))
+                return result
+
+        return wrapper
+
+    return decorator
@@ -1,34 +1,45 @@
 from dotenv import load_dotenv
-import os
-import requests
+import time
+import asyncio
+import logging
+import httpx
 from urllib.parse import quote_plus
-from snapshot_operations import download_snapshot, poll_snapshot_status
+from brightdata_client import get_client, run_sync
+from limits import snapshots, fetches
+from cache import get_cache, make_key, normalize_query, normalize_url
+from checkpoint import pending_snapshot, remember_snapshot, forget_snapshot
+from records import Comment, CommentBatch, RedditPost, SerpHit
+from snapshot_operations import adownload_snapshot, apoll_snapshot_status, astream_snapshot, track_snapshot
+from tracing import span, set_attributes
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 dataset_id = "gd_lvz8ah06191smkebj4"
 
-def _make_api_request(url, **kwargs):
-    api_key = os.getenv("BRIGHTDATA_API_KEY")
+COMMENT_FIELDS = ("comment_id", "comment", "date_posted", "post_url", "url")
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+async def _amake_api_request(url, **kwargs):
+    with span("brightdata.request", kind="client", url=url):
+        try:
+            response = await get_client().post(url, **kwargs)
+            set_attributes(status_code=response.status_code, bytes=len(response.content))
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error("API request failed: %s", e)
+            return None
+        except Exception as e:
+            logger.error("Unknown error: %s", e)
+            return None
 
-    try:
-        response = requests.post(url, headers=headers, **kwargs)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed: {e}")
-        return None
-    except Exception as e:
-        print(f"Unknown error: {e}")
-        return None
 
+def _make_api_request(url, **kwargs):
+    return run_sync(_amake_api_request(url, **kwargs))
 
-def serp_search(query, engine="google"):
+
+async def aserp_search(query, engine="google"):
     if engine == "google":
         base_url = "https://www.google.com/search"
     elif engine == "bing":
@@ -36,7 +47,14 @@ def serp_search(query, engine="google"):
     else:
         raise ValueError(f"Unknown engine {engine}")
 
-    url = "https://api.brightdata.com/request"
+    cache = get_cache()
+    cache_key = make_key("serp", engine=engine, query=normalize_query(query))
+    cached = await cache.aget("serp", cache_key)
+    set_attributes(cache_hit=cached is not None)
+    if cached is not None:
+        return _serp_from_cache(cached)
+
+    url = "/request"
 
     payload = {
         "zone": "ai_agent2",
@@ -44,35 +62,114 @@ def serp_search(query, engine="google"):
         "format": "raw"
     }
 
-    full_response = _make_api_request(url, json=payload)
+    full_response = await fetches.do(cache_key, _amake_api_request, url, json=payload)
     if not full_response:
         return None
 
     extracted_data = {
         "knowledge": full_response.get("knowledge", {}),
-        "organic": full_response.get("organic", []),
+        "organic": [SerpHit.from_hit(hit) for hit in full_response.get("organic") or []],
     }
+    cache.set("serp", cache_key, extracted_data)
     return extracted_data
 
 
-def _trigger_and_download_snapshot(trigger_url, params, data, operation_name="operation"):
-    trigger_result = _make_api_request(trigger_url, params=params, json=data)
-    if not trigger_result:
-        return None
+# The result cache stores records as JSON rows; these turn a cached value
+# back into records.
+def _serp_from_cache(cached):
+    return {**cached, "organic": [SerpHit.from_value(hit) for hit in cached.get("organic") or []]}
 
-    snapshot_id = trigger_result.get("snapshot_id")
-    if not snapshot_id:
-        return None
 
-    if not poll_snapshot_status(snapshot_id):
+def _reddit_results_from_cache(cached):
+    return {**cached, "parsed_posts": [RedditPost.from_value(post) for post in cached.get("parsed_posts") or []]}
+
+
+def serp_search(query, engine="google"):
+    return run_sync(aserp_search(query, engine))
+
+
+async def _atrigger_and_download_snapshot(
+    trigger_url, params, data, operation_name="operation", stream_with=None, fields=None
+):
+    """Trigger a snapshot, wait for it and download it.
+
+    With stream_with set, the snapshot is streamed as JSON Lines instead of
+    loaded whole: stream_with is awaited with an async iterator of records
+    (projected to fields, if given) and its result is returned.
+    """
+    with span("brightdata.snapshot", kind="client", operation=operation_name, inputs=len(data)):
+        queued = time.perf_counter()
+        async with snapshots.slot():
+            set_attributes(queue_seconds=time.perf_counter() - queued)
+            with track_snapshot(operation_name, len(data)):
+                return await _atrigger_and_download(trigger_url, params, data, stream_with, fields)
+
+
+async def _atrigger_and_download(trigger_url, params, data, stream_with=None, fields=None):
+    # In a durable run (main.aresearch with a thread_id) the snapshot is
+    # recorded as soon as it is triggered, so a resumed run picks it up
+    # again instead of paying for a new one.
+    request_key = make_key("snapshot", trigger_url=trigger_url, params=params, data=data)
+    snapshot_id = pending_snapshot(request_key)
+    if snapshot_id:
+        logger.info("Resuming snapshot %s", snapshot_id)
+        set_attributes(resumed=True, snapshot_id=snapshot_id)
+    else:
+        trigger_result = await _amake_api_request(trigger_url, params=params, json=data)
+        if not trigger_result:
+            return None
+
+        snapshot_id = trigger_result.get("snapshot_id")
+        if not snapshot_id:
+            return None
+        remember_snapshot(request_key, snapshot_id)
+
+    # Kept in the ledger if this is cancelled, so a shutdown mid-poll
+    # resumes it too.
+    result = await _acollect_snapshot(snapshot_id, params, stream_with, fields)
+    forget_snapshot(request_key)
+    return result
+
+
+async def _acollect_snapshot(snapshot_id, params, stream_with=None, fields=None):
+    if not await apoll_snapshot_status(snapshot_id, dataset_id=params.get("dataset_id")):
         return None
 
-    raw_data = download_snapshot(snapshot_id)
+    if stream_with is not None:
+        try:
+            return await stream_with(astream_snapshot(snapshot_id, fields))
+        except Exception as e:
+            logger.error("Error streaming snapshot %s: %s", snapshot_id, e)
+            return None
+
+    raw_data = await adownload_snapshot(snapshot_id)
     return raw_data
 
 
-def reddit_search_api(keyword, date="All time", sort_by="Hot", num_of_posts=75):
-    trigger_url = "https://api.brightdata.com/datasets/v3/trigger"
+def _reddit_search_key(keyword, date, sort_by, num_of_posts):
+    return make_key(
+        "reddit_search",
+        keyword=normalize_query(keyword),
+        date=date,
+        sort_by=sort_by,
+        num_of_posts=num_of_posts,
+    )
+
+
+def _parse_reddit_posts(raw_data):
+    parsed_data = [RedditPost.from_post(post) for post in raw_data]
+    return {"parsed_posts": parsed_data, "total_found": len(parsed_data)}
+
+
+async def areddit_search_api(keyword, date="All time", sort_by="Hot", num_of_posts=75):
+    cache = get_cache()
+    cache_key = _reddit_search_key(keyword, date, sort_by, num_of_posts)
+    cached = await cache.aget("reddit_search", cache_key)
+    set_attributes(cache_hit=cached is not None)
+    if cached is not None:
+        return _reddit_results_from_cache(cached)
+
+    trigger_url = "/datasets/v3/trigger"
 
     params = {
         "dataset_id": "gd_lvz8ah06191smkebj4",
@@ -90,29 +187,258 @@ def reddit_search_api(keyword, date="All time", sort_by="Hot", num_of_posts=75):
         }
     ]
 
-    raw_data = _trigger_and_download_snapshot(
-        trigger_url, params, data, operation_name="reddit"
+    raw_data = await fetches.do(
+        cache_key,
+        _atrigger_and_download_snapshot,
+        trigger_url, params, data, operation_name="reddit",
     )
 
     if not raw_data:
         return None
 
-    parsed_data = []
-    for post in raw_data:
-        parsed_post = {
-            "title": post.get("title"),
-            "url": post.get("url")
+    result = _parse_reddit_posts(raw_data)
+    cache.set("reddit_search", cache_key, result)
+    return result
+
+
+async def areddit_search_batch(keywords, date="All time", sort_by="Hot", num_of_posts=75):
+    """areddit_search_api() for several keywords with a single discovery snapshot.
+
+    Returns one result per keyword, in order (None where the keyword could
+    not be searched). Discovered posts are matched back to their keyword
+    through the discovery_input Bright Data attaches to each record.
+    """
+    cache = get_cache()
+    keys = {}
+    for keyword in keywords:
+        keys.setdefault(normalize_query(keyword), (keyword, _reddit_search_key(keyword, date, sort_by, num_of_posts)))
+
+    results = {}
+    for normalized, (_, cache_key) in keys.items():
+        cached = await cache.aget("reddit_search", cache_key)
+        if cached is not None:
+            results[normalized] = _reddit_results_from_cache(cached)
+
+    missing = {normalized: keyword for normalized, (keyword, _) in keys.items() if normalized not in results}
+    set_attributes(cached_keywords=len(results), fetched_keywords=len(missing))
+    if missing:
+        params = {
+            "dataset_id": "gd_lvz8ah06191smkebj4",
+            "include_errors": "true",
+            "type": "discover_new",
+            "discover_by": "keyword"
         }
-        parsed_data.append(parsed_post)
+        data = [
+            {
+                "keyword": keyword,
+                "date": date,
+                "sort_by": sort_by,
+                "num_of_posts": num_of_posts,
+            }
+            for keyword in missing.values()
+        ]
+        raw_data = await _atrigger_and_download_snapshot(
+            "/datasets/v3/trigger", params, data, operation_name="reddit batch"
+        ) or []
+
+        posts_by_keyword = {}
+        for post in raw_data:
+            discovery_input = post.get("discovery_input") or post.get("input") or {}
+            normalized = normalize_query(discovery_input.get("keyword") or "")
+            if normalized not in missing and len(missing) == 1:
+                normalized = next(iter(missing))
+            posts_by_keyword.setdefault(normalized, []).append(post)
+
+        for normalized in missing:
+            if normalized in posts_by_keyword:
+                results[normalized] = _parse_reddit_posts(posts_by_keyword[normalized])
+                cache.set("reddit_search", keys[normalized][1], results[normalized])
+
+    return [results.get(normalize_query(keyword)) for keyword in keywords]
 
-    return {"parsed_posts": parsed_data, "total_found": len(parsed_data)}
 
+def reddit_search_api(keyword, date="All time", sort_by="Hot", num_of_posts=75):
+    return run_sync(areddit_search_api(keyword, date, sort_by, num_of_posts))
 
-def reddit_post_retrieval(urls, days_back=10, load_all_replies=False, comment_limit=""):
+
+def _thread_comment_limit(comment_limit, url):
+    # comment_limit is either one limit for every thread or a
+    # {thread_url: limit} mapping (see main._comment_limits); "" is no limit.
+    if isinstance(comment_limit, dict):
+        return comment_limit.get(url, "")
+    return comment_limit
+
+
+async def _aretrieve_comments_by_url(urls, days_back, load_all_replies, comment_limit):
+    """Return ({thread_url: comments}, unattributed) for urls, or None on failure.
+
+    Comments are cached per thread URL, so a batch only triggers a snapshot
+    for the threads that are not cached yet.
+    """
+    cache = get_cache()
+    options = {
+        "days_back": days_back,
+        "load_all_replies": load_all_replies,
+    }
+    if isinstance(comment_limit, dict):
+        comment_limit = {normalize_url(url): limit for url, limit in comment_limit.items()}
+    limits = {
+        normalize_url(url): _thread_comment_limit(comment_limit, normalize_url(url))
+        for url in urls
+    }
+    cache_keys = {
+        url: make_key("reddit_comments", url=url, comment_limit=limit, **options)
+        for url, limit in limits.items()
+    }
+
+    comments_by_url = {}
+    for url, cache_key in cache_keys.items():
+        cached = await cache.aget("reddit_comments", cache_key)
+        if cached is not None:
+            comments_by_url[url] = CommentBatch.from_value(cached)
+
+    missing_urls = [url for url in cache_keys if url not in comments_by_url]
+    set_attributes(cached_urls=len(comments_by_url), fetched_urls=len(missing_urls))
+    unattributed = CommentBatch()
+    if missing_urls:
+        missing_limits = {url: limits[url] for url in missing_urls}
+        batch_key = make_key("reddit_comments", urls=sorted(missing_urls), comment_limit=missing_limits, **options)
+        fetched = await fetches.do(
+            batch_key, _afetch_reddit_comments, missing_urls, comment_limit=missing_limits, **options
+        )
+        if fetched is None and not comments_by_url:
+            return None
+
+        if fetched is not None:
+            fetched_by_url, unattributed = fetched
+            # Only trust per-URL grouping if the snapshot records could be
+            # matched back to the requested threads at all.
+            if fetched_by_url:
+                for url in missing_urls:
+                    comments_by_url[url] = fetched_by_url.get(url, CommentBatch())
+                    cache.set("reddit_comments", cache_keys[url], comments_by_url[url].to_columns())
+
+    ordered = {url: comments_by_url[url] for url in cache_keys if url in comments_by_url}
+    return ordered, unattributed
+
+
+def _flatten_comments(comments_by_url, unattributed):
+    return CommentBatch.concat([*comments_by_url.values(), unattributed])
+
+
+async def areddit_post_retrieval(urls, days_back=10, load_all_replies=False, comment_limit=""):
     if not urls:
         return None
 
-    trigger_url = "https://api.brightdata.com/datasets/v3/trigger"
+    retrieved = await _aretrieve_comments_by_url(urls, days_back, load_all_replies, comment_limit)
+    if retrieved is None:
+        return None
+
+    parsed_comments = _flatten_comments(*retrieved)
+    return {"comments": parsed_comments, "total_retrieved": len(parsed_comments)}
+
+
+async def areddit_post_retrieval_batch(url_lists, days_back=10, load_all_replies=False, comment_limit=""):
+    """areddit_post_retrieval() for several URL lists with a single comments snapshot.
+
+    The URLs are deduplicated across lists, fetched together and handed
+    back per list, in order (None for an empty list or a failed fetch).
+    Comments that can't be matched to a thread are only kept when there is
+    a single list to give them to.
+    """
+    url_lists = [[normalize_url(url) for url in urls or []] for urls in url_lists]
+    all_urls = list(dict.fromkeys(url for urls in url_lists for url in urls))
+    if not all_urls:
+        return [None for _ in url_lists]
+
+    set_attributes(requested_urls=sum(len(urls) for urls in url_lists), unique_urls=len(all_urls))
+    retrieved = await _aretrieve_comments_by_url(all_urls, days_back, load_all_replies, comment_limit)
+    if retrieved is None:
+        return [None for _ in url_lists]
+
+    comments_by_url, unattributed = retrieved
+    requesters = [urls for urls in url_lists if urls]
+    if unattributed and len(requesters) > 1:
+        logger.warning("Dropping %d Reddit comments that match none of the batched threads", len(unattributed))
+        unattributed = CommentBatch()
+
+    results = []
+    for urls in url_lists:
+        if not urls:
+            results.append(None)
+            continue
+        parsed_comments = _flatten_comments(
+            {url: comments_by_url.get(url, CommentBatch()) for url in dict.fromkeys(urls)}, unattributed
+        )
+        results.append({"comments": parsed_comments, "total_retrieved": len(parsed_comments)})
+    return results
+
+
+async def aiter_reddit_post_retrieval(
+    urls,
+    threads_per_snapshot=1,
+    deadline=None,
+    min_threads=1,
+    days_back=10,
+    load_all_replies=False,
+    comment_limit="",
+):
+    """Retrieve comments in parallel smaller snapshots, yielding each as it completes.
+
+    urls are split into snapshots of threads_per_snapshot threads each, all
+    triggered at once. Yields (thread_urls, comments) per finished snapshot.
+    After deadline seconds, stops as soon as at least min_threads threads
+    have arrived; snapshots still outstanding are abandoned. deadline=None
+    waits for every snapshot, which matches areddit_post_retrieval() but
+    lets callers start on early threads.
+    """
+    urls = list(dict.fromkeys(normalize_url(url) for url in urls or []))
+    if not urls:
+        return
+
+    loop = asyncio.get_running_loop()
+    stop_at = None if deadline is None else loop.time() + deadline
+    groups = {}
+    for start in range(0, len(urls), threads_per_snapshot):
+        group = urls[start:start + threads_per_snapshot]
+        task = asyncio.create_task(
+            _aretrieve_comments_by_url(group, days_back, load_all_replies, comment_limit)
+        )
+        groups[task] = group
+
+    pending = set(groups)
+    arrived = 0
+    try:
+        while pending:
+            timeout = None
+            if stop_at is not None and arrived >= min_threads:
+                timeout = stop_at - loop.time()
+                if timeout <= 0:
+                    break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is not None:
+                    logger.error("Reddit comments snapshot failed: %s", task.exception())
+                    continue
+                if task.result() is None:
+                    continue
+                arrived += len(groups[task])
+                yield groups[task], _flatten_comments(*task.result())
+    finally:
+        if pending:
+            skipped = sum(len(groups[task]) for task in pending)
+            logger.warning(
+                "Reddit comments deadline reached; proceeding without %d of %d threads",
+                skipped, len(urls),
+            )
+        for task in pending:
+            task.cancel()
+
+
+async def _afetch_reddit_comments(urls, days_back, load_all_replies, comment_limit):
+    trigger_url = "/datasets/v3/trigger"
 
     params = {
         "dataset_id": "gd_lvzdpsdlw09j6t702",
@@ -124,24 +450,49 @@ def reddit_post_retrieval(urls, days_back=10, load_all_replies=False, comment_li
             "url": url,
             "days_back": days_back,
             "load_all_replies": load_all_replies,
-            "comment_limit": comment_limit
+            "comment_limit": _thread_comment_limit(comment_limit, url)
         }
         for url in urls
     ]
 
-    raw_data = _trigger_and_download_snapshot(
-        trigger_url, params, data, operation_name="reddit comments"
+    async def group_by_thread(records):
+        comments_by_url = {}
+        unattributed = []
+        async for comment in records:
+            parsed_comment = Comment(comment["comment_id"], comment["comment"], comment["date_posted"])
+            # Comment records may carry the thread URL or their own permalink,
+            # which is nested under the thread URL.
+            record_url = normalize_url(comment["post_url"] or comment["url"] or "")
+            thread_url = next(
+                (
+                    url for url in urls
+                    if record_url == url or record_url.startswith(url + "/")
+                ),
+                None,
+            )
+            if thread_url:
+                comments_by_url.setdefault(thread_url, []).append(parsed_comment)
+            else:
+                unattributed.append(parsed_comment)
+
+        if not comments_by_url and not unattributed:
+            return None
+        return (
+            {url: CommentBatch.from_rows(comments) for url, comments in comments_by_url.items()},
+            CommentBatch.from_rows(unattributed),
+        )
+
+    # Threads with load_all_replies can produce tens of MB of snapshot; only
+    # the fields below are kept from each record as it is parsed.
+    return await _atrigger_and_download_snapshot(
+        trigger_url, params, data,
+        operation_name="reddit comments",
+        stream_with=group_by_thread,
+        fields=COMMENT_FIELDS,
     )
-    if not raw_data:
-        return None
 
-    parsed_comments = []
-    for comment in raw_data:
-        parsed_comment = {
-            "comment_id": comment.get("comment_id"),
-            "content": comment.get("comment"),
-            "date": comment.get("date_posted"),
-        }
-        parsed_comments.append(parsed_comment)
 
-    return {"comments": parsed_comments, "total_retrieved": len(parsed_comments)}
\ No newline at end of file
+def reddit_post_retrieval(urls, days_back=10, load_all_replies=False, comment_limit=""):
+    return run_sync(
+        areddit_post_retrieval(urls, days_back, load_all_replies, comment_limit)
+    )
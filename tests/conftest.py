@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "recordings.json")
+
+
+@pytest.fixture(scope="session")
+def recordings():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def fake_model(recordings, monkeypatch):
+    """benchmarks/fake_backend.FakeChatModel behind every role, with the LLM response cache off."""
+    import models
+    from cache import LLMResponseCache, configure_llm_cache
+    from fake_backend import FakeChatModel, LatencyProfile
+
+    model = FakeChatModel(recordings=recordings, latency=LatencyProfile(scale=0.1))
+    monkeypatch.setattr(models, "init_chat_model", lambda *args, **kwargs: model)
+    models.configure_models(models.ModelRegistry())
+    configure_llm_cache(LLMResponseCache(max_entries=0))
+    return model
+
+
+@pytest.fixture
+def fake_backend(recordings, monkeypatch):
+    """The fake Bright Data server with fast snapshots, an empty result cache and no learned estimates."""
+    import snapshot_operations
+    from brightdata_client import configure_client
+    from cache import ResultCache, configure_cache
+    from fake_backend import FakeBrightDataServer, LatencyProfile
+
+    configure_cache(ResultCache())
+    monkeypatch.setattr(snapshot_operations, "completion_estimator", snapshot_operations.CompletionEstimator())
+    with FakeBrightDataServer(recordings, LatencyProfile(scale=0.02)) as server:
+        configure_client(base_url=server.url, api_key="test")
+        yield server
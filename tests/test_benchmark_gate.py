@@ -0,0 +1,36 @@
+import copy
+
+from run_benchmark import compare
+
+LEVEL = {
+    "throughput_per_s": 1.0,
+    "peak_memory_mb": 1.0,
+    "end_to_end": {"p50": 4.0, "p95": 5.0},
+    "nodes": {"retrieve_reddit_posts": {"p50": 2.0, "p95": 2.5}},
+}
+BASELINE = {"levels": {"1": LEVEL, "16": copy.deepcopy(LEVEL)}}
+
+
+def slower(level: str, path: tuple, seconds: float) -> dict:
+    results = copy.deepcopy(BASELINE)
+    stats = results["levels"][level]
+    for key in path[:-1]:
+        stats = stats[key]
+    stats[path[-1]] += seconds
+    return results
+
+
+def gate(results):
+    return compare(results, BASELINE, tolerance=0.25, min_delta=0.1, gate_nodes_up_to=1)
+
+
+def test_node_latency_is_gated_only_without_overlapping_runs():
+    node = ("nodes", "retrieve_reddit_posts", "p50")
+    assert gate(slower("1", node, 1.0)) == ["concurrency 1: retrieve_reddit_posts.p50 2.0 -> 3.0"]
+    assert gate(slower("16", node, 1.0)) == []
+
+
+def test_end_to_end_latency_and_throughput_are_gated_at_every_level():
+    assert gate(slower("16", ("end_to_end", "p50"), 2.0)) == ["concurrency 16: end_to_end.p50 4.0 -> 6.0"]
+    assert gate(slower("16", ("throughput_per_s",), -0.5)) == ["concurrency 16: throughput_per_s 1.0 -> 0.5"]
+    assert gate(slower("16", ("end_to_end", "p50"), 0.9)) == []
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+
+from fake_backend import FakeBrightDataServer, LatencyProfile
+from brightdata_client import BrightDataClient, configure_client, get_client
+from web_operations import _make_api_request
+
+FAST = {"serp": {"median": 0.001, "sigma": 0.1}}
+
+
+def test_sync_wrapper_closes_its_pool(recordings, monkeypatch):
+    clients = []
+    client = BrightDataClient._client
+
+    def spy(self):
+        clients.append(client(self))
+        return clients[-1]
+
+    monkeypatch.setattr(BrightDataClient, "_client", spy)
+    with FakeBrightDataServer(recordings, LatencyProfile(FAST)) as server:
+        configure_client(base_url=server.url, api_key="test")
+        for _ in range(3):
+            assert _make_api_request("/request", json={"url": "https://www.google.com/search?q=x"})
+
+    assert len({id(c) for c in clients}) == 3
+    assert all(c.is_closed for c in clients)
+
+
+def test_busy_pool_reuses_its_connections(recordings):
+    async def burst():
+        slots = asyncio.Semaphore(64)
+
+        async def one():
+            async with slots:
+                (await get_client().post("/request", json={"url": "https://www.bing.com/search?q=x"})).raise_for_status()
+
+        await asyncio.gather(*(one() for _ in range(200)))
+        await get_client().aclose()
+
+    with FakeBrightDataServer(recordings, LatencyProfile(FAST)) as server:
+        configure_client(base_url=server.url, api_key="test", max_connections=20)
+        asyncio.run(burst())
+        assert server.request_counts["connections"] <= 20
+
+
+def _failing_client(monkeypatch, error):
+    """A client whose every attempt raises error; returns it and the attempts made."""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.method)
+        raise error("simulated", request=request)
+
+    client = BrightDataClient(base_url="http://bright.test", api_key="test", backoff_base=0.001)
+    monkeypatch.setattr(
+        client, "_client", lambda: httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    )
+    return client, attempts
+
+
+def test_trigger_that_timed_out_reading_is_not_retried(monkeypatch):
+    client, attempts = _failing_client(monkeypatch, httpx.ReadTimeout)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(client.post("/datasets/v3/trigger", json=[{"url": "https://www.reddit.com/r/x/"}]))
+
+    assert attempts == ["POST"]
+
+
+def test_post_that_never_connected_is_retried(monkeypatch):
+    client, attempts = _failing_client(monkeypatch, httpx.ConnectError)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(client.post("/datasets/v3/trigger", json=[]))
+
+    assert len(attempts) == client.max_retries + 1
+
+
+def test_get_is_retried_after_a_read_timeout(monkeypatch):
+    client, attempts = _failing_client(monkeypatch, httpx.ReadTimeout)
+
+    async def stream():
+        async with client.stream("GET", "/datasets/v3/snapshot/s_1"):
+            pass
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(stream())
+
+    assert attempts == ["GET"] * (client.max_retries + 1)
@@ -0,0 +1,105 @@
+import time
+import sqlite3
+import asyncio
+import threading
+
+from cache import LLMResponseCache, MemoryLRU, ResultCache, SQLiteStore
+from prompts import get_google_analysis_messages
+
+
+def rows(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT key, last_access FROM cache").fetchall())
+
+
+def test_disk_tier_reads_queued_and_committed_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteStore(path)
+    store.set("k", {"organic": [1, 2]}, time.time() + 60)
+    assert store.get("k")[1] == {"organic": [1, 2]}
+
+    store.flush()
+    assert SQLiteStore(path).get("k")[1] == {"organic": [1, 2]}
+
+
+def test_expired_rows_are_skipped_and_swept(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteStore(path)
+    store.set("old", "value", time.time() - 1)
+    store.set("new", "value", time.time() + 60)
+    assert store.get("old") is None
+
+    store.set("next", "value", time.time() + 60)
+    store.flush()
+    assert set(rows(path)) == {"new", "next"}
+
+
+def test_eviction_drops_least_recently_used_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SQLiteStore(path, max_entries=100, evict_batch=20)
+    expires_at = time.time() + 60
+    for i in range(100):
+        store.set(f"k{i}", i, expires_at)
+    store.flush()
+    store.get("k0")
+    store.flush()
+
+    store.set("k100", 100, expires_at)
+    store.flush()
+    kept = rows(path)
+    assert len(kept) == 100 - 20
+    assert "k0" in kept and "k100" in kept and "k1" not in kept
+
+
+def test_lookups_use_indexes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteStore(path)
+    with sqlite3.connect(path) as conn:
+        plans = [
+            " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+            for query in (
+                "DELETE FROM cache WHERE expires_at <= 0",
+                "SELECT key FROM cache ORDER BY last_access LIMIT 10",
+            )
+        ]
+    assert "cache_expires_at" in plans[0]
+    assert "cache_last_access" in plans[1]
+
+
+def test_aget_reads_the_disk_off_the_event_loop(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    cache = ResultCache(MemoryLRU(), store)
+    cache.set("serp", "k", {"organic": []})
+    cache.memory = MemoryLRU()
+    threads = []
+    get = store.get
+
+    def spy(key):
+        threads.append(threading.current_thread())
+        return get(key)
+
+    store.get = spy
+    assert asyncio.run(cache.aget("serp", "k")) == {"organic": []}
+    assert threads and threads[0] is not threading.main_thread()
+    # Promoted to the memory tier.
+    assert cache.memory.get("k")[1] == {"organic": []}
+
+
+RESULTS = "\n".join(f"{i}. Laptop review {i} (https://example.com/{i})\n   Battery, weight, price and screen." for i in range(40))
+
+
+def test_near_duplicates_match_on_the_question_over_the_same_data():
+    cache = LLMResponseCache(near_duplicate_threshold=0.6)
+    cache.set("gpt-4o-mini", get_google_analysis_messages("Which laptop has the longest battery life?", RESULTS), "battery")
+
+    reworded = get_google_analysis_messages("Which laptop has the longest battery life, in your experience?", RESULTS)
+    other_question = get_google_analysis_messages("Which laptop is cheapest?", RESULTS)
+    other_results = get_google_analysis_messages(
+        "Which laptop has the longest battery life?", RESULTS.replace("Laptop review", "Phone review")
+    )
+
+    assert cache.get("gpt-4o-mini", reworded) == "battery"
+    # Shared results made the whole prompts look alike before.
+    assert cache.get("gpt-4o-mini", other_question) is None
+    assert cache.get("gpt-4o-mini", other_results) is None
+    assert cache.stats()["near_hits"] == 1
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import subprocess
+
+import pytest
+
+import main
+import checkpoint
+import snapshot_operations
+from brightdata_client import configure_client
+from cache import ResultCache, configure_cache
+from checkpoint import SQLiteCheckpointSaver
+from fake_backend import FakeBrightDataServer, LatencyProfile
+
+QUESTION = "Which laptop lasts longest?"
+
+
+RESUME_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "checkpoint_resume.py")
+
+
+@pytest.fixture
+def saver(tmp_path, monkeypatch):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setattr(checkpoint, "_checkpointer", saver)
+    monkeypatch.setattr(main, "REDDIT_URL_SELECTION", "local")
+    return saver
+
+
+def pending_rows(saver, thread_id):
+    return saver._conn.execute(
+        "SELECT request_key FROM pending_snapshots WHERE thread_id = ?", (thread_id,)
+    ).fetchall()
+
+
+def test_finished_run_is_marked_and_its_ledger_cleared(saver, fake_backend, fake_model):
+    # Stands in for a comments snapshot abandoned at the deadline.
+    saver.remember_snapshot("done", "abandoned-request", "s_abandoned")
+
+    state = asyncio.run(main.aresearch(QUESTION, thread_id="done"))
+
+    assert state["final_answer"]
+    assert saver.thread_ids(finished=True) == ["done"]
+    assert saver.thread_ids(finished=False) == []
+    assert pending_rows(saver, "done") == []
+
+
+def test_resume_skips_finished_runs_without_loading_them(saver, fake_backend, fake_model, monkeypatch):
+    asyncio.run(main.aresearch(QUESTION, thread_id="done"))
+    loaded = []
+    get_tuple = saver.aget_tuple
+
+    async def counting_get_tuple(config):
+        loaded.append(config["configurable"]["thread_id"])
+        return await get_tuple(config)
+
+    monkeypatch.setattr(saver, "aget_tuple", counting_get_tuple)
+
+    assert asyncio.run(main.aresume_research()) == {}
+    assert loaded == []
+
+
+def test_resume_marks_runs_finished_before_marking_existed(saver, fake_backend, fake_model):
+    asyncio.run(main.aresearch(QUESTION, thread_id="old"))
+    with saver._conn:
+        saver._conn.execute("DELETE FROM finished_runs")
+
+    assert asyncio.run(main.aresume_research()) == {}
+    assert saver.thread_ids(finished=False) == []
+
+
+def test_run_killed_mid_poll_resumes_without_a_second_trigger(saver, tmp_path, fake_model, recordings, monkeypatch):
+    fast = {"median": 0.05, "sigma": 0.0}
+    latency = LatencyProfile({
+        "serp": fast, "trigger": fast, "progress": fast, "download": fast, "reddit_search_ready": fast,
+        "reddit_comments_ready": {"median": 3.0, "sigma": 0.0},
+    })
+    configure_cache(ResultCache())
+    monkeypatch.setattr(snapshot_operations, "completion_estimator", snapshot_operations.CompletionEstimator())
+    with FakeBrightDataServer(recordings, latency) as server:
+        # The durable run (thread "resume-check") in a process of its own,
+        # killed while it polls the comments snapshot.
+        child = subprocess.Popen(
+            [sys.executable, RESUME_SCRIPT, "--child", server.url, str(tmp_path / "checkpoints.sqlite3")],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while not server.request_counts.get("trigger_comments"):
+            assert child.poll() is None, "the run exited before triggering the comments snapshot"
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        time.sleep(0.5)
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        killed = dict(server.request_counts)
+
+        configure_client(base_url=server.url, api_key="test")
+        resumed = asyncio.run(main.aresume_research())
+
+    assert list(resumed) == ["resume-check"]
+    assert resumed["resume-check"]["final_answer"]
+    assert resumed["resume-check"]["reddit_post_data"]["comments"]
+    assert server.request_counts["trigger_comments"] == killed["trigger_comments"] == 1
+    assert server.request_counts["serp"] == killed["serp"]
+    assert saver.thread_ids(finished=False) == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import main
+from limits import SingleFlight
+from cache import ResultCache, configure_cache
+
+
+def test_identical_questions_share_every_upstream_call(fake_backend, fake_model):
+    async def ask(question, times):
+        return await asyncio.gather(
+            *(main.graph.ainvoke(main.build_initial_state(question)) for _ in range(times))
+        )
+
+    [single] = asyncio.run(ask("Which laptop lasts longest?", 1))
+    requests, calls = dict(fake_backend.request_counts), fake_model.calls
+
+    configure_cache(ResultCache())
+    fake_backend.request_counts.clear()
+    states = asyncio.run(ask("Which laptop has the best keyboard?", 50))
+
+    assert all(state["final_answer"] == single["final_answer"] for state in states)
+    # One SERP request per engine, one trigger and one download per snapshot.
+    assert fake_backend.request_counts["serp"] == requests["serp"] == 2
+    for endpoint in ("trigger", "trigger_keywords", "trigger_urls", "download"):
+        assert fake_backend.request_counts[endpoint] == requests[endpoint]
+    assert fake_model.calls - calls == calls
+
+
+def test_sync_invoke_searches_each_engine_once(fake_backend, fake_model):
+    # The sync node wrappers each run their own event loop, so requests
+    # can't be coalesced across nodes; the analyses read both engines'
+    # results from state.
+    state = main.graph.invoke(main.build_initial_state("Which laptop lasts longest?"))
+
+    assert state["google_analysis"] and state["bing_analysis"]
+    assert fake_backend.request_counts["serp"] == 2
+
+
+def test_shared_call_is_cancelled_with_its_last_waiter():
+    finished = []
+
+    async def work(key):
+        await asyncio.sleep(0.1)
+        finished.append(key)
+        return key
+
+    async def run():
+        flight = SingleFlight("test")
+        kept = asyncio.create_task(flight.do("kept", work, "kept"))
+        dropped = asyncio.create_task(flight.do("kept", work, "kept"))
+        lone = asyncio.create_task(flight.do("lone", work, "lone"))
+        await asyncio.sleep(0.01)
+        dropped.cancel()
+        lone.cancel()
+        result = await kept
+        await asyncio.sleep(0.2)
+        return result
+
+    assert asyncio.run(run()) == "kept"
+    assert finished == ["kept"]
+
+
+def test_caller_after_the_last_waiter_left_starts_a_new_call():
+    started = []
+
+    async def work(key):
+        started.append(key)
+        await asyncio.sleep(0.05)
+        return key
+
+    async def run():
+        flight = SingleFlight("test")
+        first = asyncio.create_task(flight.do("key", work, "key"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        # The shared task has been cancelled but hasn't finished unwinding yet.
+        return await flight.do("key", work, "key")
+
+    assert asyncio.run(run()) == "key"
+    assert started == ["key", "key"]
@@ -0,0 +1,25 @@
+import logging
+
+from compaction import count_tokens, report
+
+
+class Payload:
+    rendered = 0
+
+    def __str__(self):
+        Payload.rendered += 1
+        return "Battery lasts all day. " * 100
+
+
+def test_report_leaves_the_raw_payload_alone_below_info(caplog):
+    caplog.set_level(logging.WARNING, logger="compaction")
+    report("google results", Payload(), "compacted")
+    assert Payload.rendered == 0
+
+
+def test_report_logs_the_raw_and_compacted_token_counts_at_info(caplog):
+    caplog.set_level(logging.INFO, logger="compaction")
+    report("google results", Payload(), "Battery lasts all day.")
+
+    raw, compacted = count_tokens(str(Payload())), count_tokens("Battery lasts all day.")
+    assert f"Compacted google results: {raw} -> {compacted} tokens" in caplog.text
@@ -0,0 +1,208 @@
+import time
+import asyncio
+
+import pytest
+
+import main
+import prompts
+from cache import ResultCache, LLMResponseCache, configure_cache, configure_llm_cache
+
+SEARCH_SECONDS = {"google": 0.1, "bing": 0.2}
+REDDIT_SEARCH_SECONDS = 0.5
+REDDIT_RETRIEVAL_SECONDS = 0.6
+ANALYSIS_SECONDS = {"google_analysis": 1.0, "bing_analysis": 0.3, "reddit_analysis": 0.2}
+SYNTHESIS_SECONDS = 0.1
+
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    configure_cache(ResultCache())
+    configure_llm_cache(LLMResponseCache(max_entries=0))
+    monkeypatch.setattr(main, "REDDIT_URL_SELECTION", "local")
+    monkeypatch.setattr(main, "REDDIT_THREADS_PER_SNAPSHOT", 0)
+    monkeypatch.setattr(main, "REDDIT_DISCOVERY_POSTS", [75])
+
+    async def serp_search(query, engine="google"):
+        await asyncio.sleep(SEARCH_SECONDS[engine])
+        return {"knowledge": {}, "organic": [
+            {"link": f"https://{engine}.example/{i}", "title": f"{engine} hit {i}", "description": query}
+            for i in range(3)
+        ]}
+
+    async def reddit_search_api(keyword, num_of_posts=75, **kwargs):
+        await asyncio.sleep(REDDIT_SEARCH_SECONDS)
+        posts = [
+            {"title": f"{keyword} thread {i}", "url": f"https://www.reddit.com/r/test/comments/{i}/",
+             "num_comments": 10, "num_upvotes": 10}
+            for i in range(3)
+        ]
+        return {"parsed_posts": posts, "total_found": len(posts)}
+
+    async def reddit_post_retrieval(urls, **kwargs):
+        await asyncio.sleep(REDDIT_RETRIEVAL_SECONDS)
+        return {"comments": [{"comment_id": "c1", "content": "Works well.", "date": "2025-01-01"}], "total_retrieved": 1}
+
+    async def call_llm(role, messages, write=None):
+        if role == "synthesis":
+            await asyncio.sleep(SYNTHESIS_SECONDS)
+        else:
+            template = next(
+                name for name, message in prompts.SYSTEM_MESSAGES.items() if message is messages[0]
+            )
+            await asyncio.sleep(ANALYSIS_SECONDS.get(template, 0.0))
+        return f"{role} reply"
+
+    monkeypatch.setattr(main, "aserp_search", serp_search)
+    monkeypatch.setattr(main, "areddit_search_api", reddit_search_api)
+    monkeypatch.setattr(main, "areddit_post_retrieval", reddit_post_retrieval)
+    monkeypatch.setattr(main, "_acall_llm", call_llm)
+
+
+def test_wall_time_is_the_slowest_source(stubbed):
+    # Both analyses start once both searches are in.
+    web = max(SEARCH_SECONDS.values()) + max(ANALYSIS_SECONDS["google_analysis"], ANALYSIS_SECONDS["bing_analysis"])
+    reddit = REDDIT_SEARCH_SECONDS + REDDIT_RETRIEVAL_SECONDS + ANALYSIS_SECONDS["reddit_analysis"]
+    slowest = max(web, reddit) + SYNTHESIS_SECONDS
+
+    started = time.perf_counter()
+    state = asyncio.run(main.graph.ainvoke(main.build_initial_state("Which laptop lasts longest?")))
+    elapsed = time.perf_counter() - started
+
+    assert state["final_answer"] == "synthesis reply"
+    assert state["google_analysis"] and state["bing_analysis"] and state["reddit_analysis"]
+    # Lockstep steps would add the Google analysis to the Reddit chain (about 2.4s).
+    assert slowest <= elapsed < slowest + 0.25
+
+
+def test_node_dependencies_follow_each_source_chain():
+    assert main.NODE_DEPENDENCIES["analyze_google_results"] == ["google_search"]
+    assert main.NODE_DEPENDENCIES["analyze_bing_results"] == ["bing_search", "google_search"]
+    assert main.NODE_DEPENDENCIES["retrieve_reddit_posts"] == ["analyze_reddit_posts"]
+    assert sorted(main.NODE_DEPENDENCIES["synthesize_analyses"]) == [
+        "analyze_bing_results", "analyze_google_results", "analyze_reddit_results",
+    ]
+
+
+def test_google_analysis_does_not_wait_for_the_bing_analysis(stubbed, monkeypatch):
+    monkeypatch.setitem(ANALYSIS_SECONDS, "bing_analysis", 1.5)
+
+    async def run():
+        with main.trace_question("Which laptop lasts longest?") as trace:
+            await main.graph.ainvoke(main.build_initial_state("Which laptop lasts longest?"))
+        return {span.name: span for span in trace.node_spans()}
+
+    spans = asyncio.run(run())
+    assert spans["analyze_google_results"].start < spans["bing_search"].end + 0.05
+    assert spans["analyze_google_results"].end < spans["analyze_bing_results"].end
+
+
+def test_bing_analysis_skipped_when_google_has_every_hit(stubbed, monkeypatch):
+    calls = []
+    call_llm = main._acall_llm
+
+    async def serp_search(query, engine="google"):
+        return {"knowledge": {}, "organic": [
+            {"link": f"https://www.example.com/{i}", "title": f"hit {i}", "description": query} for i in range(3)
+        ]}
+
+    async def counting_call_llm(role, messages, write=None):
+        calls.append(messages[0])
+        return await call_llm(role, messages, write)
+
+    monkeypatch.setattr(main, "aserp_search", serp_search)
+    monkeypatch.setattr(main, "_acall_llm", counting_call_llm)
+
+    state = asyncio.run(main.graph.ainvoke(main.build_initial_state("Which laptop lasts longest?")))
+
+    assert state["bing_analysis"] == main.NO_BING_ONLY_RESULTS
+    assert prompts.SYSTEM_MESSAGES["bing_analysis"] not in calls
+    assert prompts.SYSTEM_MESSAGES["google_analysis"] in calls
+
+
+def test_bing_analysis_says_when_bing_found_nothing(stubbed, monkeypatch):
+    serp_search = main.aserp_search
+
+    async def no_bing_hits(query, engine="google"):
+        if engine == "bing":
+            return {"knowledge": {}, "organic": []}
+        return await serp_search(query, engine)
+
+    monkeypatch.setattr(main, "aserp_search", no_bing_hits)
+
+    state = asyncio.run(main.graph.ainvoke(main.build_initial_state("Which laptop lasts longest?")))
+
+    assert state["bing_analysis"] == main.NO_BING_RESULTS
+
+
+def _answers(policy):
+    """(seconds after the start, state) for each answer aiter_answers yields."""
+    async def run():
+        started = time.perf_counter()
+        answers = [
+            (time.perf_counter() - started, state)
+            async for state in main.aiter_answers("Which laptop lasts longest?", policy)
+        ]
+        # Give a cancelled run the time it would have needed to finish.
+        await asyncio.sleep(1.0)
+        return answers
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def finished_calls(stubbed, monkeypatch):
+    """Roles and prompt templates of the LLM calls that ran to completion."""
+    calls = []
+    call_llm = main._acall_llm
+
+    async def recording_call_llm(role, messages, write=None):
+        reply = await call_llm(role, messages, write)
+        calls.append(role if role == "synthesis" else next(
+            name for name, message in prompts.SYSTEM_MESSAGES.items() if message is messages[0]
+        ))
+        return reply
+
+    monkeypatch.setattr(main, "_acall_llm", recording_call_llm)
+    return calls
+
+
+def test_early_answer_lists_the_late_sources_then_refines(finished_calls):
+    # Bing is analyzed at 0.5s, Google at 1.1s and Reddit at 1.3s.
+    answers = _answers(main.AnswerPolicy(deadline=0.7, min_analyses=1, refine=True))
+
+    [(early_at, early), (full_at, full)] = answers
+    assert early["missing_sources"] == ["google", "reddit"]
+    assert early["bing_analysis"] and not early["google_analysis"] and not early["reddit_analysis"]
+    assert early["final_answer"] == "synthesis reply"
+    assert 0.7 <= early_at < 0.7 + SYNTHESIS_SECONDS + 0.15
+    assert full["missing_sources"] is None
+    assert full["google_analysis"] and full["reddit_analysis"]
+    assert 1.3 + SYNTHESIS_SECONDS <= full_at < 1.3 + SYNTHESIS_SECONDS + 0.25
+    assert finished_calls.count("synthesis") == 2
+
+
+def test_early_answer_without_refine_cancels_the_run(finished_calls):
+    answers = _answers(main.AnswerPolicy(deadline=0.7, min_analyses=1, refine=False))
+
+    [(_, early)] = answers
+    assert early["missing_sources"] == ["google", "reddit"]
+    # Neither the late analyses nor the full synthesis ran to completion.
+    assert "google_analysis" not in finished_calls
+    assert "reddit_analysis" not in finished_calls
+    assert finished_calls.count("synthesis") == 1
+
+
+def test_early_answer_waits_for_min_analyses(finished_calls):
+    # Past the deadline at 0.3s only Bing is in; the second analysis (Google) arrives at 1.1s.
+    answers = _answers(main.AnswerPolicy(deadline=0.3, min_analyses=2, refine=False))
+
+    [(early_at, early)] = answers
+    assert early["missing_sources"] == ["reddit"]
+    assert 1.1 <= early_at < 1.1 + SYNTHESIS_SECONDS + 0.15
+
+
+def test_no_early_answer_when_every_source_is_in_time(finished_calls):
+    [(_, full)] = _answers(main.AnswerPolicy(deadline=5.0, min_analyses=1, refine=True))
+
+    assert full["missing_sources"] is None
+    assert finished_calls.count("synthesis") == 1
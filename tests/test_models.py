@@ -0,0 +1,26 @@
+import asyncio
+
+import main
+from models import get_models
+
+
+def test_structured_output_records_its_token_usage(fake_model):
+    models = get_models()
+    messages = main.get_reddit_url_analysis_messages("Which laptop lasts longest?", "- Battery life thread (url)")
+
+    analysis, name = asyncio.run(models.ainvoke("selection", messages, schema=main.RedditURLAnalysis))
+
+    assert isinstance(analysis, main.RedditURLAnalysis)
+    stats = models.stats()[name]
+    assert stats["input_tokens"] > 0 and stats["output_tokens"] > 0
+    assert stats["cost_usd"] > 0
+
+
+def test_fake_chat_model_answers_sync_calls_like_async_ones(fake_model, recordings):
+    messages = main.get_reddit_url_analysis_messages("Which laptop lasts longest?", "- Battery life thread (url)")
+
+    assert fake_model.invoke(messages).content == asyncio.run(fake_model.ainvoke(messages)).content
+    assert fake_model.invoke(messages).content == recordings["llm"]["analysis"]
+    selection = fake_model.with_structured_output(main.RedditURLAnalysis).invoke(messages)
+    assert selection.selected_urls == recordings["llm"]["url_selection"]
+    assert fake_model.calls == 4
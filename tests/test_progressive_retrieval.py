@@ -0,0 +1,154 @@
+import time
+import asyncio
+
+import pytest
+
+import main
+import web_operations
+from records import CommentBatch
+
+URLS = [f"https://www.reddit.com/r/test/comments/{i}" for i in range(3)]
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    """Per-thread snapshot delays (seconds, in URLS order) and the threads whose snapshot was cancelled."""
+    delays = {}
+    cancelled = []
+
+    async def retrieve(urls, days_back, load_all_replies, comment_limit):
+        (url,) = urls
+        try:
+            await asyncio.sleep(delays[url])
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return {url: CommentBatch.from_rows([(f"c{url[-1]}", f"Comment on {url}", "2025-01-01")])}, CommentBatch()
+
+    monkeypatch.setattr(web_operations, "_aretrieve_comments_by_url", retrieve)
+
+    def set_delays(*seconds):
+        delays.update(zip(URLS, seconds))
+
+    return set_delays, cancelled
+
+
+async def _collect(**kwargs):
+    started = time.perf_counter()
+    groups = [urls async for urls, _ in web_operations.aiter_reddit_post_retrieval(URLS, **kwargs)]
+    return groups, time.perf_counter() - started
+
+
+def test_every_snapshot_is_yielded_as_it_arrives(snapshots):
+    set_delays, cancelled = snapshots
+    set_delays(0.2, 0.1, 0.3)
+
+    groups, elapsed = asyncio.run(_collect())
+
+    assert groups == [[URLS[1]], [URLS[0]], [URLS[2]]]
+    assert cancelled == []
+    assert elapsed < 0.4
+
+
+def test_deadline_abandons_the_outstanding_snapshots(snapshots):
+    set_delays, cancelled = snapshots
+    set_delays(0.05, 0.1, 5.0)
+
+    groups, elapsed = asyncio.run(_collect(deadline=0.2))
+
+    assert groups == [[URLS[0]], [URLS[1]]]
+    assert cancelled == [URLS[2]]
+    assert elapsed < 0.3
+
+
+def test_deadline_waits_for_min_threads(snapshots):
+    set_delays, cancelled = snapshots
+    set_delays(0.05, 0.4, 5.0)
+
+    groups, elapsed = asyncio.run(_collect(deadline=0.1, min_threads=2))
+
+    assert groups == [[URLS[0]], [URLS[1]]]
+    assert cancelled == [URLS[2]]
+    assert 0.4 <= elapsed < 0.5
+
+
+@pytest.fixture
+def condensing(snapshots, monkeypatch):
+    """Progressive retrieval, one thread per snapshot; calls["seconds"] is how long each condensing call takes."""
+    monkeypatch.setattr(main, "REDDIT_THREADS_PER_SNAPSHOT", 1)
+    monkeypatch.setattr(main, "REDDIT_COMMENTS_DEADLINE", None)
+    monkeypatch.setattr(main, "REDDIT_MIN_THREADS", 1)
+    monkeypatch.setattr(main, "REDDIT_CONDENSE_GRACE", 2.0)
+    calls = {"started": 0, "cancelled": 0, "seconds": 0.1}
+
+    async def condense(state, messages, role="analysis", stream=False):
+        calls["started"] += 1
+        try:
+            await asyncio.sleep(calls["seconds"])
+        except asyncio.CancelledError:
+            calls["cancelled"] += 1
+            raise
+        return "condensed notes"
+
+    monkeypatch.setattr(main, "_acached_llm_reply", condense)
+    return snapshots[0], calls
+
+
+def _retrieve():
+    started = time.perf_counter()
+    update = asyncio.run(main._aretrieve_reddit_posts_progressively({"user_question": "Which laptop?"}, URLS))
+    return update, time.perf_counter() - started
+
+
+def test_every_batch_is_condensed_when_all_arrive(condensing):
+    set_delays, calls = condensing
+    set_delays(0.1, 0.2, 0.3)
+
+    update, elapsed = _retrieve()
+
+    # The last batch's call finishes within the grace period instead of being dropped.
+    assert update["reddit_comment_notes"] == ["condensed notes"] * 3
+    assert calls == {"started": 3, "cancelled": 0, "seconds": 0.1}
+    assert update["reddit_post_data"]["total_retrieved"] == 3
+    assert 0.4 <= elapsed < 0.5
+
+
+def test_batches_after_the_deadline_are_not_condensed(condensing, monkeypatch):
+    set_delays, calls = condensing
+    monkeypatch.setattr(main, "REDDIT_COMMENTS_DEADLINE", 0.2)
+    monkeypatch.setattr(main, "REDDIT_MIN_THREADS", 2)
+    set_delays(0.05, 0.4, 5.0)
+
+    update, _ = _retrieve()
+
+    notes = update["reddit_comment_notes"]
+    assert calls["started"] == 1 and calls["cancelled"] == 0
+    assert notes[0] == "condensed notes"
+    assert len(notes) == 2 and "Comment on " + URLS[1] in notes[1]
+    assert update["reddit_post_data"]["total_retrieved"] == 2
+
+
+def test_deadline_keeps_the_condensed_batches(condensing, monkeypatch):
+    set_delays, calls = condensing
+    monkeypatch.setattr(main, "REDDIT_COMMENTS_DEADLINE", 0.3)
+    set_delays(0.05, 0.1, 5.0)
+
+    update, elapsed = _retrieve()
+
+    assert update["reddit_comment_notes"] == ["condensed notes"] * 2
+    assert calls["started"] == 2 and calls["cancelled"] == 0
+    assert elapsed < 0.4
+
+
+def test_condensing_past_the_grace_period_falls_back_to_comments(condensing, monkeypatch):
+    set_delays, calls = condensing
+    monkeypatch.setattr(main, "REDDIT_CONDENSE_GRACE", 0.1)
+    calls["seconds"] = 5.0
+    set_delays(0.05, 0.1, 0.15)
+
+    update, elapsed = _retrieve()
+
+    assert calls["started"] == 3 and calls["cancelled"] == 3
+    assert len(update["reddit_comment_notes"]) == 1
+    assert all("Comment on " + url in update["reddit_comment_notes"][0] for url in URLS)
+    assert elapsed < 0.4
@@ -0,0 +1,75 @@
+import asyncio
+
+import main
+from ranking import select_urls
+
+QUESTION = "Which mechanical keyboard switches are quietest?"
+
+
+def _posts(titles):
+    return [
+        {"title": title, "url": f"https://www.reddit.com/r/keyboards/comments/{i}/", "num_comments": 10}
+        for i, title in enumerate(titles)
+    ]
+
+
+# The first two titles match every term; the next two tie on two terms.
+TIED_AT_THE_CUTOFF = _posts([
+    "Quietest mechanical keyboard switches?",
+    "Mechanical keyboard switches: which are quietest",
+    "Quietest keyboard for an office",
+    "Quietest keyboard I have owned",
+    "Favourite keycap sets",
+])
+
+SEPARATED_AT_THE_CUTOFF = _posts([
+    "Quietest mechanical keyboard switches?",
+    "Mechanical keyboard switches: which are quietest",
+    "Quiet keyboard for an office",
+    "Favourite keycap sets",
+])
+
+
+def test_clear_cutoff_is_not_ambiguous():
+    selected, ambiguous = select_urls(QUESTION, SEPARATED_AT_THE_CUTOFF, k=2)
+
+    assert selected == [post["url"] for post in SEPARATED_AT_THE_CUTOFF[:2]]
+    assert not ambiguous
+
+
+def test_near_tie_at_the_cutoff_is_ambiguous():
+    selected, ambiguous = select_urls(QUESTION, TIED_AT_THE_CUTOFF, k=3)
+
+    assert len(selected) == 3
+    assert ambiguous
+
+
+def test_too_few_matching_titles_is_ambiguous():
+    selected, ambiguous = select_urls(QUESTION, SEPARATED_AT_THE_CUTOFF, k=4)
+
+    assert len(selected) == 3
+    assert ambiguous
+
+
+def test_hybrid_selection_asks_the_model_on_a_near_tie(monkeypatch):
+    asked = []
+
+    async def select_with_llm(user_question, reddit_results):
+        asked.append(user_question)
+        return [TIED_AT_THE_CUTOFF[3]["url"]]
+
+    monkeypatch.setattr(main, "REDDIT_URL_SELECTION", "hybrid")
+    monkeypatch.setattr(main, "REDDIT_TOP_K", 3)
+    monkeypatch.setattr(main, "_aselect_urls_with_llm", select_with_llm)
+    state = {"user_question": QUESTION, "reddit_results": {"parsed_posts": TIED_AT_THE_CUTOFF}}
+
+    update = asyncio.run(main.aanalyze_reddit_posts(state))
+
+    assert asked == [QUESTION]
+    assert update == {"selected_reddit_urls": [TIED_AT_THE_CUTOFF[3]["url"]]}
+
+    monkeypatch.setattr(main, "REDDIT_TOP_K", 2)
+    update = asyncio.run(main.aanalyze_reddit_posts(state))
+
+    assert asked == [QUESTION]
+    assert update == {"selected_reddit_urls": [post["url"] for post in TIED_AT_THE_CUTOFF[:2]]}
@@ -0,0 +1,24 @@
+from checkpoint import SQLiteCheckpointSaver
+from records import CommentBatch
+
+ROWS = [("t1_a", "Battery lasts all day.", "2025-01-01"), ("t1_b", None, "2025-01-02")]
+
+
+def test_comment_batch_survives_the_checkpoint_serializer(tmp_path):
+    serde = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3")).serde
+    batch = CommentBatch.from_rows(ROWS)
+
+    loaded = serde.loads_typed(serde.dumps_typed({"comments": batch}))["comments"]
+
+    assert isinstance(loaded, CommentBatch)
+    assert loaded == batch
+    assert hash(loaded) == hash(batch)
+    assert list(loaded) == list(batch)
+
+
+def test_comment_batch_equality_ignores_the_column_type():
+    batch = CommentBatch(["t1_a", "t1_b"], ["Battery lasts all day.", None], ["2025-01-01", "2025-01-02"])
+
+    assert batch == CommentBatch.from_rows(ROWS)
+    assert hash(batch) == hash(CommentBatch.from_rows(ROWS))
+    assert batch != CommentBatch.from_rows(ROWS[:1])
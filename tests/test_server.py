@@ -0,0 +1,38 @@
+import asyncio
+
+from server import JobManager, _wants_stream
+
+
+def test_finished_jobs_keep_the_answer_but_not_its_tokens(fake_backend, fake_model, recordings):
+    async def run():
+        manager = JobManager()
+        job = manager.submit("Which laptop lasts longest?")
+        live = [event async for event in job.follow()]
+        late = [event async for event in job.follow()]
+        return job, live, late
+
+    job, live, late = asyncio.run(run())
+
+    answer = recordings["llm"]["synthesis"]
+    assert job.status == "done" and job.final_answer == answer
+    # A follower reading while the job ran got every token.
+    assert "".join(event["content"] for event in live if event["type"] == "token") == answer
+    # The job keeps the answer as one event once it finishes.
+    assert not any(event["type"] == "token" for event in job.events)
+    assert late == job.events
+    assert [event for event in late if event["type"] == "answer"] == [
+        {"type": "answer", "content": answer, "missing_sources": []}
+    ]
+    assert late[-1] == {"type": "end", "status": "done"}
+    assert [event for event in late if event["type"] == "node"] == [
+        event for event in live if event["type"] == "node"
+    ]
+
+
+def test_only_an_exact_stream_parameter_streams():
+    def wants(query):
+        return _wants_stream({"query_string": query})
+
+    assert wants(b"stream=true") and wants(b"debug=1&stream=true")
+    assert not wants(b"") and not wants(b"stream=false") and not wants(b"stream=trueish")
+    assert not wants(b"nostream=true") and not wants(b"tag=stream=true")
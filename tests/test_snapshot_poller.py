@@ -0,0 +1,130 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import snapshot_operations
+from brightdata_client import configure_client, get_client
+from fake_backend import FakeBrightDataServer, LatencyProfile
+from snapshot_operations import CompletionEstimator, SnapshotPoller, apoll_snapshot_status
+
+PROGRESS_SECONDS = 0.01
+READY_IN = 1.0
+POLL = {"initial_delay": 0.2, "max_delay": 0.5, "backoff": 1.5}
+
+
+@pytest.fixture
+def server(recordings, monkeypatch):
+    monkeypatch.setattr(snapshot_operations, "completion_estimator", CompletionEstimator())
+    latency = LatencyProfile({"progress": {"median": PROGRESS_SECONDS, "sigma": 0.1}})
+    with FakeBrightDataServer(recordings, latency) as server:
+        configure_client(base_url=server.url, api_key="test")
+        yield server
+
+
+async def _poll_round(server, snapshots: int, waiters_per_snapshot: int = 1) -> list[float]:
+    """Add snapshots ready in READY_IN seconds; return how long after that each was resolved."""
+    ids = [server.add_snapshot("reddit_posts", READY_IN) for _ in range(snapshots)]
+    ready_at = time.monotonic() + READY_IN
+
+    async def poll(snapshot_id):
+        assert await apoll_snapshot_status(snapshot_id, "dataset", timeout=10, **POLL)
+        return time.monotonic() - ready_at
+
+    added = await asyncio.gather(*(poll(snapshot_id) for snapshot_id in ids for _ in range(waiters_per_snapshot)))
+    await get_client().aclose()
+    return added
+
+
+def test_added_latency_is_bounded_by_the_poll_interval(server):
+    added = asyncio.run(_poll_round(server, snapshots=5))
+
+    assert all(0 <= seconds < POLL["max_delay"] + 0.1 for seconds in added)
+    # Checks at 0.2s, 0.4s, 0.7s and 1.15s: one progress request per check and snapshot.
+    assert server.request_counts["progress"] == 5 * 4
+
+
+def test_waiters_on_one_snapshot_share_its_checks(server):
+    asyncio.run(_poll_round(server, snapshots=1, waiters_per_snapshot=10))
+
+    assert server.request_counts["progress"] == 4
+
+
+def test_estimate_skips_checks_that_would_say_running(server):
+    asyncio.run(_poll_round(server, snapshots=5))
+    first_round = server.request_counts["progress"]
+    estimate = snapshot_operations.completion_estimator.estimate("dataset")
+    assert READY_IN <= estimate < READY_IN + POLL["max_delay"] + 0.1
+
+    added = asyncio.run(_poll_round(server, snapshots=5))
+
+    # The first check comes at 0.7 * estimate, so the early ones are skipped.
+    assert server.request_counts["progress"] - first_round < first_round
+    assert all(0 <= seconds < POLL["max_delay"] + 0.1 for seconds in added)
+
+
+def test_progress_checks_per_snapshot_hold_at_200_snapshots(server, monkeypatch):
+    ratios = {}
+    for snapshots in (10, 200):
+        # Each round starts without an estimate, so both poll on the same schedule.
+        monkeypatch.setattr(snapshot_operations, "completion_estimator", CompletionEstimator())
+        before = server.request_counts.get("progress", 0)
+        asyncio.run(_poll_round(server, snapshots=snapshots))
+        ratios[snapshots] = (server.request_counts["progress"] - before) / snapshots
+
+    # At most the four scheduled checks per snapshot at either size: with
+    # 200 snapshots queued behind the poller's concurrency limit, checks
+    # come later rather than more often.
+    assert 0 < ratios[10] <= 4
+    assert 0 < ratios[200] <= 4
+
+
+class FakeProgressClient:
+    """Stands in for the Bright Data client: answers progress checks after PROGRESS_SECONDS.
+
+    Checks of a hung snapshot never answer.
+    """
+
+    def __init__(self):
+        self.ready_at = {}
+        self.hung = set()
+        self.checks = 0
+
+    async def get(self, url):
+        self.checks += 1
+        snapshot_id = url.rsplit("/", 1)[1]
+        if snapshot_id in self.hung:
+            await asyncio.Event().wait()
+        await asyncio.sleep(PROGRESS_SECONDS)
+        status = "ready" if time.monotonic() >= self.ready_at[snapshot_id] else "running"
+        return httpx.Response(200, json={"status": status}, request=httpx.Request("GET", url))
+
+
+def test_hung_check_does_not_stall_200_snapshots(monkeypatch):
+    client = FakeProgressClient()
+    monkeypatch.setattr(snapshot_operations, "get_client", lambda: client)
+    monkeypatch.setattr(snapshot_operations, "completion_estimator", CompletionEstimator())
+
+    async def run():
+        poller = SnapshotPoller(check_timeout=0.5)
+        started = time.monotonic()
+        client.hung.add("hung")
+        client.ready_at["hung"] = started
+        ready_in = {f"s_{i}": 0.5 + i / 200 for i in range(200)}
+        client.ready_at.update({snapshot_id: started + seconds for snapshot_id, seconds in ready_in.items()})
+
+        async def poll(snapshot_id):
+            assert await poller.wait(snapshot_id, timeout=10, **POLL)
+            return time.monotonic() - client.ready_at[snapshot_id]
+
+        hung = asyncio.create_task(poller.wait("hung", timeout=2, **POLL))
+        added = await asyncio.gather(*(poll(snapshot_id) for snapshot_id in ready_in))
+        return added, await hung, time.monotonic() - started
+
+    added, hung_ready, elapsed = asyncio.run(run())
+
+    assert max(added) < POLL["max_delay"] + 0.1
+    # The hung snapshot fails at its own deadline, after its last check's timeout.
+    assert hung_ready is False
+    assert elapsed < 2 + 0.5 + 0.1
@@ -0,0 +1,60 @@
+import time
+import asyncio
+
+from langgraph.graph import StateGraph, START, END
+
+import main
+from fake_backend import LatencyProfile
+
+# Slow enough that the synthesis streams for about half a second.
+STREAMING = LatencyProfile(scale=0.5)
+
+
+def test_first_chunk_arrives_before_the_completion(fake_model, recordings):
+    fake_model.latency = STREAMING
+    messages = [{"role": "system", "content": "Answer."}, {"role": "user", "content": "Which laptop?"}]
+
+    async def synthesize(state):
+        return {"final_answer": await main._acached_llm_reply(state, messages, role="synthesis", stream=True)}
+
+    builder = StateGraph(main.State)
+    builder.add_node("synthesize", synthesize)
+    builder.add_edge(START, "synthesize")
+    builder.add_edge("synthesize", END)
+    graph = builder.compile()
+
+    async def run():
+        started = time.perf_counter()
+        arrivals = []
+        async for mode, chunk in graph.astream({"bypass_llm_cache": False}, stream_mode=["custom", "values"]):
+            if mode == "custom":
+                arrivals.append((time.perf_counter() - started, chunk["answer_token"]))
+            elif chunk.get("final_answer"):
+                final_answer = chunk["final_answer"]
+        return arrivals, final_answer, time.perf_counter() - started
+
+    arrivals, final_answer, elapsed = asyncio.run(run())
+
+    assert final_answer == recordings["llm"]["synthesis"]
+    assert "".join(token for _, token in arrivals) == final_answer
+    assert len(arrivals) > 10
+    assert arrivals[0][0] < elapsed / 2
+
+
+def test_astream_research_prints_tokens_as_they_arrive(fake_backend, fake_model, recordings, monkeypatch):
+    fake_model.latency = STREAMING
+    printed = []
+
+    def record(*args, end="\n", flush=False):
+        printed.append((time.perf_counter(), "".join(map(str, args)), end))
+
+    monkeypatch.setattr(main, "print", record, raising=False)
+
+    answer = asyncio.run(main.astream_research(main.build_initial_state("Which laptop lasts longest?")))
+    finished = time.perf_counter()
+
+    assert answer == recordings["llm"]["synthesis"]
+    tokens = [(at, text) for at, text, end in printed if end == ""]
+    assert "".join(text for _, text in tokens) == answer
+    assert len(tokens) > 10
+    assert finished - tokens[0][0] > 0.2